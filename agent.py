@@ -0,0 +1,205 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from typing import TypedDict, Annotated, NotRequired
+
+from langgraph.graph.message import add_messages
+from langchain_core.messages import AIMessage, AnyMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import START, StateGraph
+from langgraph.prebuilt import tools_condition
+
+from metrics import instrument_tool, node_timer, record_cache, record_llm
+from retriever import batched_tool_node
+
+# Generate the AgentState and Agent graph
+class AgentState(TypedDict):
+    messages: Annotated[list[AnyMessage], add_messages]
+    # Rolling summary of the messages that no longer fit the prompt budget
+    context_summary: NotRequired[str]
+    context_summarized: NotRequired[int]
+    context_report: NotRequired[dict]
+
+def build_alfred(chat_with_tools, tools, checkpointer=None, context_window=None, llm_cache=None, scheduler=None, router=None, compactor=None):
+    """Compile Alfred's assistant/tools graph around a tool-bound chat model.
+
+    The nodes are async, so running the graph with ainvoke/astream lets ToolNode execute
+    independent tool calls from one turn concurrently. Node, tool and model timings,
+    token usage and cache hits are reported to the metrics module. Optional parts:
+
+    - checkpointer: keeps each thread_id's conversation, tool results included, in the
+      graph state, so callers only send the new message each turn.
+    - context_window: a ConversationWindow that trims what the model sees without
+      dropping anything from that state.
+    - llm_cache: an LLMCache that answers repeated prompts without calling the model.
+    - scheduler: an LLMScheduler that queues, paces and retries model calls shared
+      with other sessions.
+    - router: an IntentRouter that runs first and sends obvious requests straight to
+      their tool, saving a model call.
+    - compactor: a ToolOutputCompactor that shrinks tool results to their budgets
+      before the assistant (and every later prompt) sees them.
+    """
+    async def call_model(messages, session):
+        if llm_cache is not None:
+            key = llm_cache.key(chat_with_tools, messages)
+            response = await asyncio.to_thread(llm_cache.get, key)
+            record_cache("llm", response is not None)
+            if response is not None:
+                return response
+        if scheduler is not None:
+            # The scheduler times the call itself, leaving out queueing and retry backoff
+            response = await scheduler.ainvoke(chat_with_tools, messages, session=session)
+        else:
+            start = time.perf_counter()
+            response = await chat_with_tools.ainvoke(messages)
+            record_llm(time.perf_counter() - start, response)
+        if llm_cache is not None:
+            await asyncio.to_thread(llm_cache.set, key, response)
+        return response
+
+    async def assistant(state: AgentState, config: RunnableConfig):
+        with node_timer("assistant"):
+            messages = state["messages"]
+            update = {}
+            if context_window is not None:
+                context = {key: state[key] for key in ("context_summary", "context_summarized") if key in state}
+                messages, report = await context_window.build(messages, context)
+                update = {**context, "context_report": report}
+            return {
+                "messages": [await call_model(messages, config["configurable"].get("thread_id", "default"))],
+                **update,
+            }
+
+    # Every tool run is timed and its result size recorded
+    tool_node = batched_tool_node([instrument_tool(tool) for tool in tools])
+
+    async def run_tools(state: AgentState, config: RunnableConfig):
+        with node_timer("tools"):
+            return await tool_node.ainvoke(state, config)
+
+    async def compact(state: AgentState):
+        with node_timer("compact"):
+            # Results the next prompt won't carry verbatim, because they are in the summary
+            # or about to be folded into it, no longer count as present
+            if context_window is not None:
+                since = context_window.fold_boundary(state["messages"], state)
+            else:
+                since = state.get("context_summarized", 0)
+            replaced, _ = compactor.compact(state["messages"], since=since)
+            return {"messages": replaced}
+
+    async def route(state: AgentState):
+        with node_timer("router"):
+            message = router.route(state["messages"])
+            return {"messages": [message]} if message is not None else {}
+
+    def after_route(state: AgentState) -> str:
+        last = state["messages"][-1]
+        return "tools" if isinstance(last, AIMessage) and last.tool_calls else "assistant"
+
+    # The graph
+    builder = StateGraph(AgentState)
+
+    # Define nodes: these do the work
+    builder.add_node("assistant", assistant)
+    builder.add_node("tools", run_tools)
+    if router is not None:
+        builder.add_node("router", route)
+    if compactor is not None:
+        builder.add_node("compact", compact)
+
+    # Define edges: these determine how the control flow moves
+    if router is not None:
+        # Obvious requests go straight to their tool; everything else to the assistant
+        builder.add_edge(START, "router")
+        builder.add_conditional_edges("router", after_route, ["tools", "assistant"])
+    else:
+        builder.add_edge(START, "assistant")
+    builder.add_conditional_edges(
+        "assistant",
+        # If the latest message requires a tool, route to tools
+        # Otherwise, provide a direct response
+        tools_condition,
+    )
+    if compactor is not None:
+        # Tool results are trimmed once, on their way into the conversation
+        builder.add_edge("tools", "compact")
+        builder.add_edge("compact", "assistant")
+    else:
+        builder.add_edge("tools", "assistant")
+
+    return builder.compile(checkpointer=checkpointer)
+
+def make_checkpointer(backend: str = os.getenv("ALFRED_MEMORY_BACKEND", "memory"), path: str = os.getenv("ALFRED_MEMORY_PATH", "alfred_memory.sqlite")):
+    """Create the checkpointer that stores conversation state per thread_id.
+
+    "memory" keeps threads in process memory; "sqlite" stores them in a local SQLite file
+    so conversations survive restarts.
+    """
+    if backend == "sqlite":
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        # The saver and its connection belong to the background loop that will run the graph
+        async def connect():
+            return AsyncSqliteSaver(await aiosqlite.connect(path))
+
+        return run_sync(connect())
+    if backend == "memory":
+        return InMemorySaver()
+    raise ValueError(f"Unknown memory backend {backend!r}, expected 'memory' or 'sqlite'")
+
+def thread_config(thread_id: str) -> dict:
+    """Graph config that selects a conversation thread in the checkpointer."""
+    return {"configurable": {"thread_id": thread_id}}
+
+# One long-lived event loop shared by every caller in the process, so async HTTP clients
+# keep their connection pools between turns and across Streamlit sessions
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return Alfred's background event loop, starting it on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="alfred-event-loop", daemon=True).start()
+    return _loop
+
+def run_sync(coro):
+    """Run a coroutine on the background event loop and block until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+def iterate_sync(async_iterable):
+    """Iterate an async iterable from synchronous code, driving it on the background loop.
+
+    Items are handed over through a queue as soon as they are produced, so callers such
+    as the Streamlit script thread can render them while the graph is still running.
+    """
+    items = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in async_iterable:
+                items.put((item, None))
+        except BaseException as e:
+            items.put((None, e))
+        finally:
+            items.put((done, None))
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_event_loop())
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        future.cancel()
@@ -1,18 +1,17 @@
 import streamlit as st
+import math
 import os
-from typing import TypedDict, Annotated
-import requests
-import random
+import time
+import uuid
 
-from langgraph.graph.message import add_messages
-from langchain_core.messages import AnyMessage, HumanMessage, AIMessage
-from langgraph.prebuilt import ToolNode
-from langgraph.graph import START, StateGraph
-from langgraph.prebuilt import tools_condition
-from langchain_groq import ChatGroq
-from langchain.tools import Tool
+import warmup
+from metrics import metrics, traced_stream, traced_turn
+from prompts import SYSTEM_PROMPT
 
-from retriever import guest_info_tool
+# Alfred's heavy imports (LangChain, the guest index, the graph) happen in warmup, in the
+# background, so the page shell renders at once. This is a no-op if serve.py already
+# started it when the server booted.
+warmup.start()
 
 # Set page config
 st.set_page_config(
@@ -59,179 +58,219 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Web Search Tool - Simplified fallback version for deployment
-def web_search_fallback(query: str) -> str:
-    """Fallback web search function for deployment environments."""
-    return f"I apologize, but web search is currently unavailable in this deployment environment. However, I can help you with guest information and weather queries. Your search query was: '{query}'"
+def build_turn_input(alfred, user_message, config):
+    """Build the graph input for a turn: just the new message, plus the system message on a new thread.
 
-web_search_tool = Tool(
-    name="web_search",
-    func=web_search_fallback,
-    description="Search the web for current information about people, events, or topics. Currently unavailable in this deployment."
-)
+    Earlier messages, including tool results, are already in the checkpointed thread state.
+    """
+    from langchain_core.messages import HumanMessage
+    from agent import run_sync
 
-# Weather Tool
-WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "292f64290fcb8e22685c42af72a3beb1")
+    state = run_sync(alfred.aget_state(config))
+    messages = [] if state.values.get("messages") else [HumanMessage(content=SYSTEM_PROMPT)]
+    return {"messages": messages + [HumanMessage(content=user_message)]}
 
-def get_fireworks_advice(condition: str, wind_kmh: float) -> str:
-    """Generate fireworks advice based on weather conditions."""
-    if condition in ["Clear", "Sunny"] and wind_kmh < 15:
-        return " Perfect conditions for fireworks! 🎆"
-    elif condition in ["Clouds"] and wind_kmh < 20:
-        return " Good conditions for fireworks with some clouds. 🌤️"
-    elif wind_kmh >= 20:
-        return f" Caution advised for fireworks due to strong winds ({wind_kmh} km/h). 💨"
-    elif condition in ["Rain", "Drizzle", "Thunderstorm"]:
-        return " Fireworks should be postponed due to precipitation. ⛈️"
-    elif condition in ["Snow", "Mist", "Fog"]:
-        return " Poor visibility conditions for fireworks. 🌫️"
-    else:
-        return " Weather conditions are marginal for fireworks. 🌤️"
+def record_context_report(alfred, config):
+    """Keep the latest prompt budget report from the thread state for the sidebar."""
+    from agent import run_sync
 
-def get_realistic_dummy_weather(location: str) -> str:
-    """Generate realistic dummy weather data based on location."""
-    location_patterns = {
-        "london": {"base_temp": 12, "conditions": ["Cloudy", "Rainy", "Partly Cloudy", "Clear"]},
-        "paris": {"base_temp": 15, "conditions": ["Clear", "Cloudy", "Partly Cloudy", "Rainy"]},
-        "new york": {"base_temp": 18, "conditions": ["Clear", "Cloudy", "Partly Cloudy", "Windy"]},
-        "tokyo": {"base_temp": 20, "conditions": ["Clear", "Cloudy", "Humid", "Partly Cloudy"]},
-        "miami": {"base_temp": 28, "conditions": ["Sunny", "Partly Cloudy", "Thunderstorm", "Clear"]},
-        "seattle": {"base_temp": 14, "conditions": ["Rainy", "Cloudy", "Drizzle", "Partly Cloudy"]},
-        "los angeles": {"base_temp": 24, "conditions": ["Sunny", "Clear", "Partly Cloudy", "Hazy"]},
-        "chicago": {"base_temp": 16, "conditions": ["Windy", "Clear", "Cloudy", "Partly Cloudy"]},
-    }
-    
-    default_pattern = {"base_temp": 18, "conditions": ["Clear", "Cloudy", "Partly Cloudy", "Rainy"]}
-    pattern = location_patterns.get(location.lower(), default_pattern)
-    
-    temp_c = pattern["base_temp"] + random.randint(-8, 8)
-    condition = random.choice(pattern["conditions"])
-    humidity = random.randint(40, 85)
-    wind_kmh = random.randint(5, 25)
-    
-    condition_descriptions = {
-        "Clear": "Clear Sky", "Sunny": "Sunny", "Cloudy": "Overcast Clouds",
-        "Partly Cloudy": "Partly Cloudy", "Rainy": "Light Rain", "Drizzle": "Light Drizzle",
-        "Thunderstorm": "Thunderstorm", "Windy": "Clear and Windy", "Humid": "Clear and Humid",
-        "Hazy": "Hazy", "Snow": "Light Snow", "Mist": "Misty"
-    }
-    
-    description = condition_descriptions.get(condition, condition)
-    fireworks_advice = get_fireworks_advice(condition, wind_kmh)
-    
-    return f"Weather in {location}: {description}, {temp_c}°C, Humidity: {humidity}%, Wind: {wind_kmh} km/h.{fireworks_advice} [Simulated data]"
+    report = run_sync(alfred.aget_state(config)).values.get("context_report")
+    if report:
+        st.session_state.context_report = report
+        st.session_state.tokens_saved_total = st.session_state.get("tokens_saved_total", 0) + report["saved_tokens"]
 
-def get_weather_info(location: str) -> str:
-    """Fetches weather information for a given location, with fallback to realistic dummy data."""
-    try:
-        base_url = "http://api.openweathermap.org/data/2.5/weather"
-        params = {"q": location, "appid": WEATHER_API_KEY, "units": "metric"}
-        response = requests.get(base_url, params=params, timeout=5)
-        
-        if response.status_code == 200:
-            weather_data = response.json()
-            temp_c = round(weather_data["main"]["temp"])
-            condition = weather_data["weather"][0]["main"]
-            description = weather_data["weather"][0]["description"].title()
-            humidity = weather_data["main"]["humidity"]
-            wind_speed = weather_data.get("wind", {}).get("speed", 0)
-            wind_kmh = round(wind_speed * 3.6, 1)
-            fireworks_advice = get_fireworks_advice(condition, wind_kmh)
-            return f"Weather in {location}: {description}, {temp_c}°C, Humidity: {humidity}%, Wind: {wind_kmh} km/h.{fireworks_advice}"
-    except Exception:
-        pass
+def get_alfred_response(alfred, user_message, thread_id):
+    """Get response from Alfred with conversation memory."""
+    from agent import run_sync, thread_config
+
+    config = thread_config(thread_id)
     
-    return get_realistic_dummy_weather(location)
+    # Get Alfred's response
+    response = run_sync(traced_turn(alfred.ainvoke(build_turn_input(alfred, user_message, config), config), thread_id))
+    record_context_report(alfred, config)
+    return response['messages'][-1].content
 
-weather_info_tool = Tool(
-    name="get_weather_info",
-    func=get_weather_info,
-    description="Fetches weather information for a given location and provides fireworks scheduling advice."
-)
+# Progress notes shown while a tool runs
+TOOL_PROGRESS = {
+    "guest_info_retriever": "👥 Consulting the guest list…",
+    "web_search": "🌐 Searching the web…",
+    "get_weather_info": "🌤️ Checking the weather…",
+}
 
-# Initialize Alfred
-@st.cache_resource
-def initialize_alfred():
-    """Initialize Alfred with all tools and configuration."""
-    # Get the Groq API token from environment variables
-    GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-    
-    if not GROQ_API_KEY:
-        st.error("⚠️ GROQ_API_KEY environment variable not set. Please set it to use Alfred.")
-        st.stop()
-    
-    # Generate the chat interface, including the tools
-    chat = ChatGroq(
-        model="gemma2-9b-it",
-        api_key=GROQ_API_KEY,
-        temperature=0.1,
-    )
-    
-    tools = [guest_info_tool, web_search_tool, weather_info_tool]
-    chat_with_tools = chat.bind_tools(tools)
-    
-    # Generate the AgentState and Agent graph
-    class AgentState(TypedDict):
-        messages: Annotated[list[AnyMessage], add_messages]
-    
-    def assistant(state: AgentState):
-        return {
-            "messages": [chat_with_tools.invoke(state["messages"])],
-        }
-    
-    # The graph
-    builder = StateGraph(AgentState)
-    
-    # Define nodes: these do the work
-    builder.add_node("assistant", assistant)
-    builder.add_node("tools", ToolNode(tools))
-    
-    # Define edges: these determine how the control flow moves
-    builder.add_edge(START, "assistant")
-    builder.add_conditional_edges(
-        "assistant",
-        # If the latest message requires a tool, route to tools
-        # Otherwise, provide a direct response
-        tools_condition,
-    )
-    builder.add_edge("tools", "assistant")
-    
-    alfred = builder.compile()
-    
-    return alfred
+def stream_alfred_response(alfred, user_message, thread_id):
+    """Stream Alfred's response as ("token", text), ("tool", name) and ("final", text) events."""
+    from langchain_core.messages import AIMessage
+    from agent import iterate_sync, thread_config
 
-def get_alfred_response(alfred, user_message, conversation_history):
-    """Get response from Alfred with conversation memory."""
-    # System message
-    system_message = HumanMessage(content="""You are Alfred, a sophisticated and polite butler assistant at an elegant gala event. You have access to:
-    1. A guest information system with details about gala attendees (guest_info_retriever)
-    2. Web search capabilities for current information (web_search)
-    3. Weather information for fireworks planning (get_weather_info)
+    config = thread_config(thread_id)
+    events = alfred.astream(build_turn_input(alfred, user_message, config), config, stream_mode=["messages", "updates"])
+    for mode, data in iterate_sync(traced_stream(events, thread_id)):
+        if mode == "messages":
+            chunk, metadata = data
+            if metadata.get("langgraph_node") == "assistant" and isinstance(chunk, AIMessage) and chunk.content:
+                yield "token", chunk.content
+        else:
+            # Routed turns make their tool call from the router node, not the assistant
+            for node in ("router", "assistant"):
+                if not data.get(node):
+                    continue
+                message = data[node]["messages"][-1]
+                if message.tool_calls:
+                    for tool_call in message.tool_calls:
+                        yield "tool", tool_call["name"]
+                else:
+                    yield "final", message.content
+    record_context_report(alfred, config)
+
+def render_message(message):
+    """Return the chat bubble HTML for a conversation message."""
+    if message["role"] == "user":
+        return f"""
+            <div class="chat-message user-message">
+                <strong>👤 You:</strong> {message["content"]}
+            </div>
+            """
+    return f"""
+            <div class="chat-message alfred-message">
+                <strong>🎩 Alfred:</strong> {message["content"]}
+            </div>
+            """
+
+# Number of messages rendered in full; older ones are paged on request
+HISTORY_WINDOW = int(os.getenv("ALFRED_HISTORY_WINDOW", "20"))
+
+def render_messages(messages):
+    """Render several messages as a single markdown element."""
+    if messages:
+        st.markdown("".join(render_message(message) for message in messages), unsafe_allow_html=True)
 
-    Your capabilities:
-    - Guest inquiries: Use guest_info_retriever for attendee information
-    - Current events/general info: Use web_search for up-to-date information  
-    - Weather/fireworks: Use get_weather_info to check conditions and provide fireworks scheduling advice
+def set_transcript_page(page):
+    st.session_state.transcript_page = page
 
-    Always respond in a refined, butler-like manner and maintain a professional, courteous tone befitting a distinguished butler.""")
+@st.fragment
+def render_transcript():
+    """Render the conversation: the latest messages in full, older ones a page at a time on request.
+
+    Paging only reruns this fragment, and the page never holds more than HISTORY_WINDOW
+    messages, so render cost stays flat as the conversation grows.
+    """
+    history = st.session_state.conversation_history
+    older = len(history) - HISTORY_WINDOW
+    if older > 0 and st.toggle(f"🕰️ Show {older} earlier messages", key="show_earlier_messages"):
+        pages = math.ceil(older / HISTORY_WINDOW)
+        page = min(st.session_state.get("transcript_page", pages - 1), pages - 1)
+        start = page * HISTORY_WINDOW
+        render_messages(history[start:min(start + HISTORY_WINDOW, older)])
+        
+        older_column, page_column, newer_column = st.columns([1, 2, 1])
+        older_column.button("◀ Older", disabled=page == 0, on_click=set_transcript_page, args=(page - 1,))
+        page_column.caption(f"Earlier messages, page {page + 1} of {pages}")
+        newer_column.button("Newer ▶", disabled=page == pages - 1, on_click=set_transcript_page, args=(page + 1,))
     
-    # Build message history
-    messages = [system_message]
-    for msg in conversation_history:
-        if msg["role"] == "user":
-            messages.append(HumanMessage(content=msg["content"]))
+    render_messages(history[-HISTORY_WINDOW:])
+
+def stream_into_chat(alfred, user_input):
+    """Write Alfred's answer into the page token by token and return the finished text."""
+    status = st.empty()
+    answer = st.empty()
+    text = ""
+    for kind, value in stream_alfred_response(alfred, user_input, st.session_state.thread_id):
+        if kind == "token":
+            text += value
+            answer.markdown(render_message({"role": "assistant", "content": text + "▌"}), unsafe_allow_html=True)
+        elif kind == "tool":
+            # Anything said before a tool call is superseded by the answer that follows it
+            text = ""
+            answer.empty()
+            status.info(TOOL_PROGRESS.get(value, f"🔧 Running {value}…"))
         else:
-            messages.append(AIMessage(content=msg["content"]))
-    
-    # Add current user message
-    messages.append(HumanMessage(content=user_message))
-    
-    # Get Alfred's response
-    response = alfred.invoke({"messages": messages})
-    return response['messages'][-1].content
+            text = value
+    status.empty()
+    answer.markdown(render_message({"role": "assistant", "content": text}), unsafe_allow_html=True)
+    return text
+
+def render_metrics_panel(panel):
+    """Show where the time went in this conversation's latest turn, plus process-wide dumps."""
+    turns = [turn for turn in metrics.recent_turns if turn["thread_id"] == st.session_state.thread_id]
+    if not turns:
+        return
+    turn = turns[-1]
+    with panel.container():
+        with st.expander("📊 Turn metrics"):
+            st.caption(
+                f"Last turn: {turn['seconds'] * 1000:.0f} ms, {turn['loop_iterations']} assistant calls, "
+                f"{turn['tokens']['prompt']} prompt / {turn['tokens']['completion']} completion tokens"
+            )
+            rows = [{"step": f"node: {name}", "calls": entry["calls"], "ms": round(entry["seconds"] * 1000, 1)} for name, entry in turn["nodes"].items()]
+            rows += [{"step": f"tool: {name}", "calls": entry["calls"], "ms": round(entry["seconds"] * 1000, 1), "result bytes": entry["result_bytes"]} for name, entry in turn["tools"].items()]
+            rows += [{"step": f"http: {name}", "calls": entry["calls"], "ms": round(entry["seconds"] * 1000, 1)} for name, entry in turn["http"].items()]
+            st.dataframe(rows, hide_index=True, width="stretch")
+            if turn["caches"]:
+                st.caption("Cache hits: " + ", ".join(f"{name} {entry['hits']}/{entry['hits'] + entry['misses']}" for name, entry in turn["caches"].items()))
+            cold_start = warmup.status()["phases_ms"]
+            if "total" in cold_start:
+                st.caption("Cold start: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in cold_start.items()))
+            compactor = warmup.compactor()
+            compacted = compactor.stats() if compactor is not None else None
+            if compacted and compacted["raw_tokens"]:
+                st.caption(
+                    f"Tool results since start: ~{compacted['saved_tokens']} of ~{compacted['raw_tokens']} tokens trimmed "
+                    f"({compacted['saved_tokens'] / compacted['raw_tokens']:.0%})"
+                )
+            if "last_run_seconds" in st.session_state:
+                st.caption(f"Previous page run: {st.session_state.last_run_seconds * 1000:.0f} ms")
+            st.download_button("⬇️ Prometheus metrics", metrics.prometheus_text(), file_name="alfred_metrics.prom", mime="text/plain")
+
+# Guest list admin; shown only when ALFRED_ADMIN_TOKEN is set, and only after entering it
+ADMIN_TOKEN = os.getenv("ALFRED_ADMIN_TOKEN")
+
+def render_guest_admin():
+    """Let the event staff add, correct and remove guests while the app keeps running."""
+    import tools
+
+    with st.expander("🛠️ Guest list admin"):
+        if st.text_input("Admin token", type="password", key="admin_token") != ADMIN_TOKEN:
+            return
+        status = st.empty()
+        
+        with st.form("upsert_guest", clear_on_submit=True):
+            name = st.text_input("Name")
+            relation = st.text_input("Relation")
+            description = st.text_area("Description")
+            email = st.text_input("Email")
+            if st.form_submit_button("Add or update guest") and name.strip():
+                existed = tools.guest_index.find(name.strip()) is not None
+                tools.upsert_guest({"name": name.strip(), "relation": relation, "description": description, "email": email})
+                st.success(f"{'Updated' if existed else 'Added'} {name.strip()}")
+        
+        with st.form("remove_guest", clear_on_submit=True):
+            name = st.text_input("Name of the guest to remove")
+            if st.form_submit_button("Remove guest") and name.strip():
+                if tools.remove_guest(name.strip()):
+                    st.success(f"Removed {name.strip()}")
+                else:
+                    st.warning(f"No guest named {name.strip()}")
+        
+        if st.button("💾 Save guest list snapshot", disabled=tools.guest_index.version == 0):
+            tools.save_guest_index()
+            st.success("Snapshot written; restarts and other workers will load it")
+        
+        index = tools.guest_index
+        status.caption(f"{len(index.live_docs())} guests, {index.version} changes since the snapshot")
+
+def turn_error_message(error: Exception) -> str:
+    """What to tell the guest when a turn fails."""
+    from llm_scheduler import is_rate_limited
+
+    if is_rate_limited(error):
+        # Still rate limited after the scheduler's retries
+        return "🎩 Alfred is attending to a great many guests at the moment. Please ask again in a minute."
+    return f"Alfred encountered an issue: {str(error)}"
 
 # Main App
 def main():
+    run_started = time.perf_counter()
+    
     # Header
     st.markdown('<h1 class="main-header">🎩 Alfred - Your Gala Butler</h1>', unsafe_allow_html=True)
     
@@ -259,63 +298,116 @@ def main():
         - "Should we have fireworks tonight?"
         """)
         
+        stream_responses = st.toggle("⚡ Stream responses", value=True)
+        
+        context_panel = st.empty()
+        metrics_panel = st.empty()
+        
         if st.button("🗑️ Clear Conversation"):
             st.session_state.conversation_history = []
+            st.session_state.thread_id = str(uuid.uuid4())
+            st.session_state.pop("context_report", None)
+            st.session_state.pop("transcript_page", None)
             st.rerun()
+        
+        # Filled in once Alfred (and with it the guest list) is ready
+        admin_panel = st.container()
     
     # Initialize session state
     if "conversation_history" not in st.session_state:
         st.session_state.conversation_history = []
+    if "thread_id" not in st.session_state:
+        st.session_state.thread_id = str(uuid.uuid4())
+    
+    # Chat interface
+    st.markdown("### 💬 Chat with Alfred")
     
-    # Initialize Alfred
+    # Initialize Alfred; usually already done by the prewarm, otherwise wait for it here
     try:
-        alfred = initialize_alfred()
+        with st.spinner("🎩 Alfred is getting ready..."):
+            alfred = warmup.alfred()
     except Exception as e:
         st.error(f"Failed to initialize Alfred: {str(e)}")
         st.stop()
     
-    # Chat interface
-    st.markdown("### 💬 Chat with Alfred")
+    if ADMIN_TOKEN:
+        with admin_panel:
+            render_guest_admin()
     
     # Display conversation history
-    for message in st.session_state.conversation_history:
-        if message["role"] == "user":
-            st.markdown(f"""
-            <div class="chat-message user-message">
-                <strong>👤 You:</strong> {message["content"]}
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown(f"""
-            <div class="chat-message alfred-message">
-                <strong>🎩 Alfred:</strong> {message["content"]}
-            </div>
-            """, unsafe_allow_html=True)
+    render_transcript()
     
     # User input
     user_input = st.chat_input("Ask Alfred anything about the gala...")
     
     if user_input:
-        # Add user message to history
+        # Add user message to history and show it straight away; new messages are drawn in
+        # place and the transcript picks them up on the next run, so no rerun is needed
         st.session_state.conversation_history.append({"role": "user", "content": user_input})
+        st.markdown(render_message(st.session_state.conversation_history[-1]), unsafe_allow_html=True)
         
-        # Get Alfred's response
-        with st.spinner("🎩 Alfred is thinking..."):
+        if stream_responses:
+            # Stream the answer in place
             try:
-                alfred_response = get_alfred_response(alfred, user_input, st.session_state.conversation_history[:-1])
-                
-                # Add Alfred's response to history
+                alfred_response = stream_into_chat(alfred, user_input)
                 st.session_state.conversation_history.append({"role": "assistant", "content": alfred_response})
-                
-                # Rerun to display the new messages
-                st.rerun()
-                
             except Exception as e:
-                st.error(f"Alfred encountered an issue: {str(e)}")
+                st.error(turn_error_message(e))
+        
+        else:
+            # Get Alfred's response
+            with st.spinner("🎩 Alfred is thinking..."):
+                try:
+                    alfred_response = get_alfred_response(alfred, user_input, st.session_state.thread_id)
+                    
+                    # Add Alfred's response to history
+                    st.session_state.conversation_history.append({"role": "assistant", "content": alfred_response})
+                    st.markdown(render_message(st.session_state.conversation_history[-1]), unsafe_allow_html=True)
+                    
+                except Exception as e:
+                    st.error(turn_error_message(e))
+    
+    # Prompt budget and cache reports for the latest turn
+    notes = []
+    report = st.session_state.get("context_report")
+    if report:
+        notes.append(
+            f"🧮 Last prompt: ~{report['prompt_tokens']} tokens, ~{report['saved_tokens']} saved "
+            f"(~{st.session_state.tokens_saved_total} saved this session, {report['summarized_messages']} messages summarized)"
+        )
+    llm_cache = warmup.llm_cache()
+    if llm_cache is not None:
+        stats = llm_cache.stats()
+        notes.append(f"💾 LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%}), {stats['entries']} stored")
+    router = warmup.router()
+    if router is not None:
+        routes = router.stats()
+        routed = sum(routes["routed"].values())
+        if routed:
+            # Each routed turn skipped one model call, so it saved about one call's latency
+            saved = routed * (metrics.mean("alfred_llm_seconds") or 0.0)
+            notes.append(f"🧭 Router: {routed} of {routed + routes['passed']} turns went straight to a tool (~{saved:.1f}s of model time saved)")
+    turns = [turn for turn in metrics.recent_turns if turn["thread_id"] == st.session_state.thread_id]
+    compaction = turns[-1]["compaction"] if turns else None
+    if compaction and compaction["saved_tokens"]:
+        notes.append(
+            f"✂️ Tool results: ~{compaction['saved_tokens']} of ~{compaction['raw_tokens']} tokens trimmed last turn "
+            f"(~{compaction['prompt_tokens_saved']} fewer prompt tokens)"
+        )
+    queue = warmup.scheduler().stats()
+    if queue["waiting"] or queue["retries"] or queue["coalesced"]:
+        notes.append(f"🚦 Model queue: {queue['waiting']} waiting, {queue['in_flight']} in flight, {queue['retries']} retries, {queue['coalesced']} coalesced")
+    if notes:
+        context_panel.caption("\n\n".join(notes))
+    render_metrics_panel(metrics_panel)
     
     # Footer
     st.markdown("---")
     st.markdown("*🎩 Alfred is powered by Groq's gemma2-9b-it model and LangGraph*")
+    
+    # Time the script run itself, so slow reruns show up next to slow turns
+    st.session_state.last_run_seconds = time.perf_counter() - run_started
+    metrics.observe("alfred_streamlit_run_seconds", st.session_state.last_run_seconds)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
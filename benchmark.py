@@ -0,0 +1,657 @@
+"""Offline benchmarks for Alfred.
+
+Builds the same graph as the Streamlit app, but with a scripted chat model and local
+stand-ins for web search and weather, over synthetic guest lists indexed into a
+temporary snapshot. Nothing touches Groq, the Hugging Face hub, DDGS or OpenWeatherMap.
+
+    python benchmark.py                          # full run, report in benchmark_report.json
+    python benchmark.py --sizes 100 10000 --turns 20 --output quick.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List
+
+from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from guest_index import build_snapshot
+from prompts import SYSTEM_PROMPT
+
+# Must match tools.DATASET_NAME; tools is only imported once the synthetic snapshot is in place
+DATASET_NAME = "agents-course/unit3-invitees"
+
+REPORT_VERSION = 3
+
+# The apps' prompt, so the context window sees realistic token counts
+SYSTEM_MESSAGE = HumanMessage(content=SYSTEM_PROMPT)
+
+FIRST_NAMES = ["Ada", "Nikola", "Marie", "Charles", "Grace", "Alan", "Emmy", "Michael", "Rosalind", "Isaac", "Albert", "Katherine"]
+LAST_NAMES = ["Lovelace", "Tesla", "Curie", "Babbage", "Hopper", "Turing", "Noether", "Faraday", "Franklin", "Newton", "Einstein", "Johnson"]
+RELATIONS = ["best friend", "colleague", "old rival", "business partner", "cousin", "mentor", "former student", "neighbor"]
+WORDS = (
+    "mathematician inventor physicist chemist pioneer computing electricity radium engines navy codes "
+    "algebra gardens poetry violin chess sailing astronomy orbits telescopes patents lectures"
+).split()
+
+
+def synthetic_guests(n: int, seed: int = 0) -> List[Document]:
+    """Generate n guest records shaped like the invitees dataset."""
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}"
+        description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 30)))
+        docs.append(Document(
+            page_content="\n".join([
+                f"Name: {name}",
+                f"Relation: {rng.choice(RELATIONS)}",
+                f"Description: {description}",
+                f"Email: {name.lower().replace(' ', '.')}@example.com",
+            ]),
+            metadata={"name": name},
+        ))
+    return docs
+
+
+def guest_queries(docs: List[Document], n: int, seed: int = 1) -> List[str]:
+    """Distinct guest questions: names, relations and topics, as the model would phrase them."""
+    rng = random.Random(seed)
+    queries = []
+    for i in range(n):
+        kind = i % 3
+        if kind == 0:
+            queries.append(rng.choice(docs).metadata["name"])
+        elif kind == 1:
+            queries.append(f"{rng.choice(RELATIONS)} {i}")
+        else:
+            queries.append(f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}")
+    return queries
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Offline stand-in for ChatGroq with a fixed script.
+
+    A guest message is answered with a call to each tool in tool_names (or directly
+    when it is empty), and tool results are answered with a short reply quoting them.
+    latency adds a fixed delay per call to mimic a remote model. Prompt sizes are
+    reported as usage metadata, estimated the way the context window counts them.
+    """
+
+    tool_names: List[str] = []
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _respond(self, messages) -> AIMessage:
+        from conversation import estimate_tokens
+
+        reply = self._reply(messages)
+        prompt_tokens = sum(estimate_tokens(str(message.content)) + 4 for message in messages)
+        reply.usage_metadata = {"input_tokens": prompt_tokens, "output_tokens": 0, "total_tokens": prompt_tokens}
+        return reply
+
+    def _reply(self, messages) -> AIMessage:
+        last = messages[-1]
+        if isinstance(last, HumanMessage) and self.tool_names:
+            return AIMessage(content="", tool_calls=[
+                {"name": name, "args": {"__arg1": str(last.content)}, "id": f"call_{uuid.uuid4().hex[:12]}"}
+                for name in self.tool_names
+            ])
+        if isinstance(last, ToolMessage):
+            return AIMessage(content=f"Certainly. {str(last.content)[:200]}")
+        return AIMessage(content="At your service.")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+
+def stub_tools():
+    """Alfred's tools with the network ones replaced by local stand-ins.
+
+    Guest lookups use the real retriever, which is local once the snapshot exists.
+    """
+    from langchain.tools import Tool
+    from retriever import guest_info_tool
+    from weather import get_realistic_dummy_weather
+
+    web_search_tool = Tool(
+        name="web_search",
+        func=lambda query: f"1. Result for {query}\n   Nothing of note.\n   Source: https://example.com",
+        description="Search the web for current information about people, events, or topics.",
+    )
+    weather_tool = Tool(
+        name="get_weather_info",
+        func=get_realistic_dummy_weather,
+        description="Fetches weather information for a given location and provides fireworks scheduling advice.",
+    )
+    return [guest_info_tool, web_search_tool, weather_tool]
+
+
+async def stub_summarize(summary: str, messages) -> str:
+    """Local summarizer for the conversation window: keeps the tail of the transcript."""
+    text = " ".join(str(message.content) for message in messages)
+    return (summary + " " + text)[-600:].strip()
+
+
+def build_bench_alfred(chat, context_tokens: int = 3000, router=None, compactor=None):
+    """Compile the graph the way initialize_alfred does, around an offline chat model."""
+    from agent import build_alfred, make_checkpointer
+    from conversation import ConversationWindow
+    from llm_scheduler import LLMScheduler
+
+    tools = stub_tools()
+    return build_alfred(
+        chat.bind_tools(tools),
+        tools,
+        checkpointer=make_checkpointer("memory"),
+        context_window=ConversationWindow(stub_summarize, token_budget=context_tokens),
+        # Limits far above what the benchmark sends, so only the scheduler's overhead is timed
+        scheduler=LLMScheduler(requests_per_minute=1e9, tokens_per_minute=1e12),
+        router=router,
+        compactor=compactor,
+    )
+
+
+def timings(samples: List[float]) -> dict:
+    """Summarize durations in seconds as milliseconds."""
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "min_ms": ordered[0] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def run_turn(alfred, thread_id: str, text: str, first: bool) -> float:
+    """Send one guest message the way the web app does and return the turn's wall time."""
+    from agent import run_sync, thread_config
+
+    messages = [SYSTEM_MESSAGE] if first else []
+    start = time.perf_counter()
+    run_sync(alfred.ainvoke({"messages": messages + [HumanMessage(content=text)]}, thread_config(thread_id)))
+    return time.perf_counter() - start
+
+
+def snapshot_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def cold_start_child() -> dict:
+    """Time each start-up phase in this (fresh) process; GUEST_INDEX_DIR points at a snapshot."""
+    phases = {}
+    start = time.perf_counter()
+    import tools  # noqa: F401  (maps the guest index snapshot)
+    phases["load_guest_index_s"] = time.perf_counter() - start
+
+    mark = time.perf_counter()
+    import agent  # noqa: F401
+    import retriever  # noqa: F401
+    import weather  # noqa: F401
+    phases["import_modules_s"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    alfred = build_bench_alfred(ScriptedChatModel(tool_names=["guest_info_retriever"]))
+    phases["build_graph_s"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    run_turn(alfred, "cold-start", "Ada Lovelace", first=True)
+    phases["first_turn_s"] = time.perf_counter() - mark
+    phases["total_s"] = time.perf_counter() - start
+    return phases
+
+
+def bench_cold_start(runs: int) -> dict:
+    """Start fresh interpreters and time them from exec to the first answered turn."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--cold-start-child"],
+            check=True, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout
+        phases = json.loads(output.strip().splitlines()[-1])
+        phases["process_s"] = time.perf_counter() - start
+        samples.append(phases)
+    return {
+        "runs": runs,
+        "phases_ms": {phase: timings([sample[phase] for sample in samples]) for phase in samples[0]},
+    }
+
+
+def process_memory() -> dict:
+    """Resident and anonymous (private, never shared) memory of this process; Linux only."""
+    values = {}
+    with open("/proc/self/smaps_rollup", encoding="utf-8") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                values[key] = int(value.split()[0]) * 1024
+    return {"rss_bytes": values["Rss"], "anonymous_bytes": values["Anonymous"]}
+
+
+def memory_child(path: str, mode: str) -> dict:
+    """Open a snapshot in this (fresh) process and measure what serving guest lookups costs.
+
+    Lookups go through GuestIndexRetriever, so the name index is counted too. "documents"
+    materializes every guest as a Document and builds the name index from them, as both
+    were held before the columnar store; "columnar" keeps the mapped store and name
+    tables and formats only the guests a lookup returns. The typo-tolerant name lookup
+    builds its table on first use, so memory is measured before and after one.
+    """
+    from guest_index import GuestIndexRetriever, open_snapshot
+    from name_index import NameIndex
+
+    before = process_memory()
+    index = open_snapshot(path)
+    if mode == "documents":
+        docs = list(index.docs)
+        index.__dict__["names"] = NameIndex(docs)
+    retriever = GuestIndexRetriever(index=index, k=3)
+    retriever.batch_relevant_documents(["chess", "radium engines", "violin poetry", "navy codes", index.docs[0].metadata["name"], "my mentor"])
+    after = process_memory()
+    # A misspelt name only the fuzzy lookup resolves
+    first, last, number = index.docs[0].metadata["name"].split()
+    retriever.invoke(f"{first} {last[:-1]}q {number}")
+    fuzzy = process_memory()
+    return {
+        "guests": len(index.docs),
+        "rss_bytes": after["rss_bytes"] - before["rss_bytes"],
+        "anonymous_bytes": after["anonymous_bytes"] - before["anonymous_bytes"],
+        "anonymous_with_fuzzy_bytes": fuzzy["anonymous_bytes"] - before["anonymous_bytes"],
+    }
+
+
+def bench_guest_memory(size: int, workdir: str) -> dict:
+    """Per-process memory of the guest list and name index, held as objects versus mapped columns."""
+    from guest_index import load_snapshot
+
+    root = os.path.join(workdir, f"guests-{size}")
+    index = load_snapshot(root, DATASET_NAME)
+    path = index.path if index is not None else build_snapshot(root, DATASET_NAME, synthetic_guests(size))
+    del index
+    results = {"guests": size}
+    for mode in ("documents", "columnar"):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--memory-child", path, mode],
+            check=True, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+    results["anonymous_saved_bytes"] = results["documents"]["anonymous_bytes"] - results["columnar"]["anonymous_bytes"]
+    print(
+        f"  {size:>9,} guests: {results['documents']['anonymous_bytes'] / 2**20:8.1f} MB as Documents, "
+        f"{results['columnar']['anonymous_bytes'] / 2**20:8.1f} MB columnar "
+        f"({results['columnar']['anonymous_with_fuzzy_bytes'] / 2**20:.1f} MB after a fuzzy name lookup)",
+        file=sys.stderr,
+    )
+    return results
+
+
+def bench_turn_overhead(samples: int, latency: float) -> dict:
+    """Time single turns on fresh threads and subtract the model's own time.
+
+    What is left is the cost of the graph itself: checkpointing, the context window,
+    routing, and the tools node (retrieval included for the tool turns).
+    """
+    from agent import run_sync
+    from retriever import guest_cache
+
+    chat = ScriptedChatModel(latency=latency)
+    model_call = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        run_sync(chat.ainvoke([SYSTEM_MESSAGE, HumanMessage(content="Good evening")]))
+        model_call.append(time.perf_counter() - start)
+    model_ms = timings(model_call)["p50_ms"]
+
+    scenarios = {
+        "direct_answer": ([], 1),
+        "guest_lookup": (["guest_info_retriever"], 2),
+        "all_tools": (["guest_info_retriever", "web_search", "get_weather_info"], 2),
+    }
+    results = {"model_call_ms": timings(model_call)}
+    for scenario, (tool_names, model_calls) in scenarios.items():
+        alfred = build_bench_alfred(ScriptedChatModel(tool_names=tool_names, latency=latency))
+        # Warm up imports and lazily created clients before timing
+        run_turn(alfred, f"warmup-{scenario}", "Ada Lovelace", first=True)
+        guest_cache.clear()
+        turns = [
+            run_turn(alfred, f"{scenario}-{i}", f"Tell me about guest {i}", first=True)
+            for i in range(samples)
+        ]
+        stats = timings(turns)
+        stats["model_calls"] = model_calls
+        stats["graph_overhead_ms"] = stats["p50_ms"] - model_calls * model_ms
+        results[scenario] = stats
+    return results
+
+
+# Requests the intent router must leave to the model
+ROUTER_NEGATIVES = [
+    "What's the weather like for the fireworks?", "Can we launch the fireworks in Paris tonight?",
+    "weather in Atlantis", "Is it going to rain?", "Tell me about my best friend", "Who is the president of France?",
+    "Tell me about Ada", "Who is the best chess player in history?", "What's the latest news about Tesla?",
+    "Good evening, Alfred", "Tell me about the gala", "Which guests like sailing?",
+]
+ROUTER_WEATHER = ["What's the weather in {city}?", "weather in {city}", "How is the weather in {city} tonight?", "{city} weather", "Is it raining in {city}?"]
+ROUTER_GUEST = ["Tell me about {name}", "{name}", "Who is {lower}?", "What do you know about {name}?"]
+
+
+def bench_router(samples: int, latency: float) -> dict:
+    """Check the intent router against labelled requests and time routed turns against model-picked ones."""
+    import tools
+    from router import GAZETTEER, guest_router
+
+    router = guest_router()
+    rng = random.Random(2)
+    cities = sorted(GAZETTEER)
+    names = [tools.guest_index.docs[i].metadata["name"] for i in rng.sample(range(len(tools.guest_index.docs)), 20)]
+    labelled = [(template.format(city=city.title()), ("get_weather_info", city)) for city in rng.sample(cities, 10) for template in ROUTER_WEATHER]
+    labelled += [(template.format(name=name, lower=name.lower()), ("guest_info_retriever", name.casefold())) for name in names for template in ROUTER_GUEST]
+    labelled += [(text, None) for text in ROUTER_NEGATIVES]
+
+    routed = correct = 0
+    for text, expected in labelled:
+        message = router.route([HumanMessage(content=text)])
+        if message is None:
+            continue
+        routed += 1
+        call = message.tool_calls[0]
+        correct += expected is not None and (call["name"], call["args"]["__arg1"].casefold()) == expected
+    positives = sum(expected is not None for _, expected in labelled)
+
+    # Routed turns go tools -> assistant (one model call); without the router the model picks the tool first
+    turns = {}
+    for label, graph_router in (("model_routed", None), ("intent_routed", router)):
+        alfred = build_bench_alfred(ScriptedChatModel(tool_names=["get_weather_info"], latency=latency), router=graph_router)
+        run_turn(alfred, f"warmup-{label}", "weather in Paris", first=True)
+        turns[label] = timings([run_turn(alfred, f"{label}-{i}", f"What's the weather in {cities[i % len(cities)].title()}?", first=True) for i in range(samples)])
+    result = {
+        "labelled": len(labelled),
+        "routed": routed,
+        "precision": correct / routed if routed else None,
+        "recall": correct / positives,
+        "turn_ms": turns,
+        "saved_ms_p50": turns["model_routed"]["p50_ms"] - turns["intent_routed"]["p50_ms"],
+        "model_calls_saved_per_routed_turn": 1,
+    }
+    print(f"  precision {result['precision']:.2%}, recall {result['recall']:.2%}, {result['saved_ms_p50']:.1f} ms saved per routed turn", file=sys.stderr)
+    return result
+
+
+def bench_compaction(turns: int, context_tokens: int) -> dict:
+    """Hold the same conversation with tool results verbatim and compacted, and compare prompt sizes.
+
+    Turns ask about a guest, follow up on the same guest, then ask by relation (three
+    records back), and every turn also checks the weather.
+    """
+    import tools
+    from agent import run_sync, thread_config
+    from compaction import ToolOutputCompactor
+    from metrics import metrics, traced_turn
+
+    rng = random.Random(3)
+    names = [tools.guest_index.docs[i].metadata["name"] for i in rng.sample(range(len(tools.guest_index.docs)), turns)]
+    questions = [
+        [f"Tell me about {name}", f"What else do you know about {name}?", f"Who is my {rng.choice(RELATIONS)}?"][i % 3]
+        for i, name in enumerate(names[i // 3] for i in range(turns))
+    ]
+    result = {"turns": turns}
+    for label, compactor in (("verbatim", None), ("compacted", ToolOutputCompactor())):
+        chat = ScriptedChatModel(tool_names=["guest_info_retriever", "get_weather_info"])
+        alfred = build_bench_alfred(chat, context_tokens, compactor=compactor)
+        prompt_tokens = []
+        for i in range(turns):
+            messages = [SYSTEM_MESSAGE] if i == 0 else []
+            message = HumanMessage(content=questions[i])
+            run_sync(traced_turn(alfred.ainvoke({"messages": messages + [message]}, thread_config(f"compaction-{label}")), f"compaction-{label}"))
+            prompt_tokens.append(metrics.recent_turns[-1]["tokens"]["prompt"])
+        result[label] = {
+            "prompt_tokens_total": sum(prompt_tokens),
+            "prompt_tokens_per_turn": statistics.fmean(prompt_tokens),
+            "prompt_tokens_last_turn": prompt_tokens[-1],
+        }
+    result["saved_fraction"] = 1 - result["compacted"]["prompt_tokens_total"] / result["verbatim"]["prompt_tokens_total"]
+    print(f"  {result['saved_fraction']:.1%} fewer prompt tokens over {turns} turns", file=sys.stderr)
+    return result
+
+
+def bench_multi_turn(turns: int, latency: float, context_tokens: int) -> dict:
+    """Hold one long conversation and record how turn latency grows with the history."""
+    from agent import run_sync, thread_config
+
+    alfred = build_bench_alfred(ScriptedChatModel(tool_names=["guest_info_retriever"], latency=latency), context_tokens)
+    latencies = [
+        run_turn(alfred, "multi-turn", f"Who is my colleague number {i}?", first=i == 0)
+        for i in range(turns)
+    ]
+    state = run_sync(alfred.aget_state(thread_config("multi-turn"))).values
+    window = max(1, min(10, turns // 2))
+    return {
+        "turns": turns,
+        "context_tokens": context_tokens,
+        "latencies_ms": [latency * 1000 for latency in latencies],
+        "first_turns_ms": timings(latencies[:window]),
+        "last_turns_ms": timings(latencies[-window:]),
+        "final_messages": len(state["messages"]),
+        "final_context": state.get("context_report"),
+    }
+
+
+def bench_extract_text(sizes: List[int], n_queries: int, workdir: str) -> list:
+    """Build a snapshot per corpus size and time extract_text on uncached and cached queries."""
+    import tools
+    from retriever import extract_text, extract_text_batch, guest_cache
+
+    results = []
+    for size in sizes:
+        docs = synthetic_guests(size)
+        queries = guest_queries(docs, n_queries)
+        root = os.path.join(workdir, f"guests-{size}")
+        start = time.perf_counter()
+        path = build_snapshot(root, DATASET_NAME, docs)
+        build_s = time.perf_counter() - start
+        del docs
+
+        tools.GUEST_INDEX_DIR = root
+        start = time.perf_counter()
+        tools.reload_guest_index()
+        load_s = time.perf_counter() - start
+
+        guest_cache.clear()
+        uncached = []
+        for query in queries:
+            mark = time.perf_counter()
+            extract_text(query)
+            uncached.append(time.perf_counter() - mark)
+        cached = []
+        for query in queries:
+            mark = time.perf_counter()
+            extract_text(query)
+            cached.append(time.perf_counter() - mark)
+        guest_cache.clear()
+        start = time.perf_counter()
+        extract_text_batch(queries)
+        batch_s = time.perf_counter() - start
+
+        results.append({
+            "guests": size,
+            "queries": n_queries,
+            "build_s": build_s,
+            "load_s": load_s,
+            "snapshot_bytes": snapshot_bytes(path),
+            "uncached_ms": timings(uncached),
+            "uncached_qps": n_queries / sum(uncached),
+            "cached_ms": timings(cached),
+            "cached_qps": n_queries / sum(cached),
+            "batch_qps": n_queries / batch_s,
+        })
+        print(
+            f"  {size:>9,} guests: {results[-1]['uncached_qps']:10.1f} q/s uncached, "
+            f"{results[-1]['cached_qps']:10.1f} q/s cached, {results[-1]['batch_qps']:10.1f} q/s batched",
+            file=sys.stderr,
+        )
+    return results
+
+
+def bench_sharded(size: int, n_queries: int, workers: List[int], workdir: str) -> dict:
+    """Time batched top-k scoring in process and sharded across worker processes."""
+    from guest_index import load_snapshot, tokenize
+    from sharded_index import ShardedGuestIndex
+
+    docs = synthetic_guests(size)
+    queries = [tokenize(query) for query in guest_queries(docs, n_queries)]
+    root = os.path.join(workdir, f"sharded-{size}")
+    build_snapshot(root, DATASET_NAME, docs)
+    del docs
+    index = load_snapshot(root, DATASET_NAME)
+
+    start = time.perf_counter()
+    expected = index.get_top_n_batch(queries, 3)
+    single_s = time.perf_counter() - start
+    results = {"guests": size, "queries": n_queries, "cpus": os.cpu_count(), "in_process_qps": n_queries / single_s, "workers": []}
+    for count in workers:
+        sharded = ShardedGuestIndex(index, workers=count)
+        # The first batch spawns the pool and maps the snapshot in every worker
+        start = time.perf_counter()
+        sharded.get_top_n_batch(queries[:1], 3)
+        warmup_s = time.perf_counter() - start
+        start = time.perf_counter()
+        found = sharded.get_top_n_batch(queries, 3)
+        sharded_s = time.perf_counter() - start
+        results["workers"].append({
+            "workers": count,
+            "warmup_s": warmup_s,
+            "qps": n_queries / sharded_s,
+            "speedup": single_s / sharded_s,
+            "matches_in_process": [[doc.page_content for doc in top] for top in found] == [[doc.page_content for doc in top] for top in expected],
+        })
+        print(f"  {count} workers: {results['workers'][-1]['qps']:10.1f} q/s ({results['workers'][-1]['speedup']:.2f}x)", file=sys.stderr)
+    return results
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": commit,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for Alfred's graph and guest retrieval.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000, 1000000], help="guest corpus sizes for extract_text")
+    parser.add_argument("--queries", type=int, default=200, help="queries per corpus size")
+    parser.add_argument("--guests", type=int, default=1000, help="guest corpus size for the graph benchmarks")
+    parser.add_argument("--samples", type=int, default=50, help="turns per per-turn overhead scenario")
+    parser.add_argument("--turns", type=int, default=40, help="length of the multi-turn conversation")
+    parser.add_argument("--cold-starts", type=int, default=3, help="fresh processes to time")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated model latency per call, in seconds")
+    parser.add_argument("--context-tokens", type=int, default=3000, help="prompt budget for the conversation window")
+    parser.add_argument("--shard-size", type=int, default=100000, help="guest corpus size for the sharded retrieval benchmark")
+    parser.add_argument("--shard-workers", type=int, nargs="+", default=[1, 2, 4], help="worker process counts to try")
+    parser.add_argument("--output", default="benchmark_report.json", help="where to write the JSON report")
+    parser.add_argument("--cold-start-child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--memory-child", nargs=2, metavar=("SNAPSHOT", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_start_child:
+        print(json.dumps(cold_start_child()))
+        return
+    if args.memory_child:
+        print(json.dumps(memory_child(*args.memory_child)))
+        return
+
+    workdir = tempfile.mkdtemp(prefix="alfred-bench-")
+    try:
+        # Every module that imports tools maps this snapshot instead of downloading the dataset
+        base = os.path.join(workdir, "base")
+        build_snapshot(base, DATASET_NAME, synthetic_guests(args.guests))
+        os.environ["GUEST_INDEX_DIR"] = base
+
+        report = {
+            "version": REPORT_VERSION,
+            "created": datetime.now(timezone.utc).isoformat(),
+            "environment": environment(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("cold_start_child", "memory_child")},
+        }
+        print("Cold start…", file=sys.stderr)
+        report["cold_start"] = bench_cold_start(args.cold_starts)
+        print("Per-turn overhead…", file=sys.stderr)
+        report["turn_overhead"] = bench_turn_overhead(args.samples, args.latency)
+        print("Multi-turn latency…", file=sys.stderr)
+        report["multi_turn"] = bench_multi_turn(args.turns, args.latency, args.context_tokens)
+        print("Tool output compaction…", file=sys.stderr)
+        report["compaction"] = bench_compaction(args.turns, args.context_tokens)
+        print("Intent router…", file=sys.stderr)
+        report["router"] = bench_router(args.samples, args.latency)
+        print("extract_text throughput…", file=sys.stderr)
+        report["extract_text"] = bench_extract_text(args.sizes, args.queries, workdir)
+        print("Guest list memory…", file=sys.stderr)
+        report["guest_memory"] = bench_guest_memory(max(args.sizes), workdir)
+        print("Sharded retrieval…", file=sys.stderr)
+        report["sharded"] = bench_sharded(args.shard_size, args.queries, args.shard_workers, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    cold = report["cold_start"]["phases_ms"]
+    overhead = report["turn_overhead"]
+    multi = report["multi_turn"]
+    print(f"Cold start: {cold['process_s']['p50_ms']:.0f} ms to first answer ({cold['load_guest_index_s']['p50_ms']:.0f} ms loading the guest index)")
+    for scenario in ("direct_answer", "guest_lookup", "all_tools"):
+        print(f"Turn ({scenario}): {overhead[scenario]['p50_ms']:.1f} ms p50, {overhead[scenario]['graph_overhead_ms']:.1f} ms graph overhead")
+    print(f"Multi-turn: {multi['first_turns_ms']['p50_ms']:.1f} ms early vs {multi['last_turns_ms']['p50_ms']:.1f} ms after {multi['turns']} turns")
+    compaction = report["compaction"]
+    print(f"Compaction: {compaction['saved_fraction']:.0%} fewer prompt tokens ({compaction['verbatim']['prompt_tokens_per_turn']:.0f} -> {compaction['compacted']['prompt_tokens_per_turn']:.0f} per turn)")
+    routing = report["router"]
+    print(f"Router: {routing['precision']:.0%} precision, {routing['recall']:.0%} recall, {routing['saved_ms_p50']:.1f} ms saved per routed turn")
+    memory = report["guest_memory"]
+    print(f"Guest list memory: {memory['anonymous_saved_bytes'] / 2**20:.1f} MB less per process with the columnar store ({memory['guests']:,} guests)")
+    sharded = report["sharded"]
+    best = max(sharded["workers"], key=lambda entry: entry["qps"])
+    print(f"Sharded: {best['speedup']:.2f}x with {best['workers']} workers on {sharded['cpus']} CPUs ({sharded['guests']:,} guests)")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
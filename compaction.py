@@ -0,0 +1,177 @@
+import os
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, ToolMessage
+
+from conversation import estimate_tokens
+from metrics import record_compaction
+from search import normalize_url
+
+# Token budget for each tool's result once compacted; other tools get DEFAULT_BUDGET
+TOOL_BUDGETS = {"guest_info_retriever": 300, "web_search": 300, "get_weather_info": 60}
+DEFAULT_BUDGET = 500
+
+# Guest messages that want an email address in the answer
+_WANTS_EMAIL = re.compile(r"\b(?:e-?mails?|contact|get in touch|reach (?:him|her|them|out)|write to)\b", re.IGNORECASE)
+
+# Emoji and dingbats, e.g. the weather tool's fireworks decorations
+_DECORATION = re.compile("[\U0001F300-\U0001FAFF\u2600-\u27BF\uFE0F]")
+
+# A guest record as retrieval formats it (see guest_store.format_guest), email optional
+# since compacted records may have lost it
+_GUEST_RECORD = re.compile(r"Name: (.*)\nRelation: (.*)\nDescription: (.*?)(?:\nEmail: (.*))?", re.DOTALL)
+
+_SEARCH_RESULT = re.compile(r"(\d+)\. (.*)\n   (.*)\n   Source: (.*)", re.DOTALL)
+
+
+def _without_email(record: str) -> str:
+    return record.split("\nEmail: ")[0]
+
+
+def _truncate(text: str, budget: int) -> str:
+    """Cut text to about budget tokens, at a word boundary."""
+    if estimate_tokens(text) <= budget:
+        return text
+    cut = text[:budget * 4].rsplit(" ", 1)[0]
+    return cut.rstrip(" ,.;:") + " …"
+
+
+def fit_blocks(blocks: List[str], budget: int) -> str:
+    """Join whole blocks (records, search results) while they fit the budget, noting what was left out."""
+    kept = []
+    for block in blocks:
+        if estimate_tokens("\n\n".join(kept + [block])) > budget:
+            if not kept:
+                kept.append(_truncate(block, budget))
+                continue
+            kept.append(f"({len(blocks) - len(kept)} more left out for brevity)")
+            break
+        kept.append(block)
+    return "\n\n".join(kept)
+
+
+class ToolOutputCompactor:
+    """Shrinks tool results before they enter the conversation, and so every later prompt.
+
+    Guest records lose their email unless the guest asked for one, and records and web
+    results the conversation already holds (from the last lookback_turns turns, which
+    the context window still sends verbatim) become one-line references. Weather loses
+    its decorations. Whatever is left is held to a per-tool token budget by dropping
+    the lowest-ranked records or results, or cutting a single long one.
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, default_budget: int = DEFAULT_BUDGET, lookback_turns: int = 2):
+        self.budgets = {**TOOL_BUDGETS, **(budgets or {})}
+        self.default_budget = default_budget
+        self.lookback_turns = lookback_turns
+        self.raw_tokens = 0
+        self.saved_tokens = 0
+
+    def _guests(self, text: str, seen: Set[str], wants_email: bool) -> List[str]:
+        blocks = []
+        for block in text.split("\n\n"):
+            match = _GUEST_RECORD.fullmatch(block)
+            if match is None:
+                blocks.append(block)
+                continue
+            record = block if wants_email else _without_email(block)
+            if record in seen:
+                record = f"Name: {match.group(1)} (details given earlier in this conversation)"
+            else:
+                seen.update((record, _without_email(record)))
+            blocks.append(record)
+        return blocks
+
+    def _search(self, text: str, seen: Set[str]) -> List[str]:
+        blocks = []
+        for block in text.split("\n\n"):
+            match = _SEARCH_RESULT.fullmatch(block)
+            if match is None:
+                blocks.append(block)
+                continue
+            url = normalize_url(match.group(4))
+            if url in seen:
+                block = f"{match.group(1)}. {match.group(2)} (found earlier in this conversation)"
+            seen.add(url)
+            blocks.append(block)
+        return blocks
+
+    def compact_text(self, tool: str, text: str, seen: Set[str], wants_email: bool = False) -> str:
+        """The compacted form of one tool result; seen collects what the conversation already holds."""
+        budget = self.budgets.get(tool, self.default_budget)
+        if tool == "guest_info_retriever":
+            return fit_blocks(self._guests(text, seen, wants_email), budget)
+        if tool == "web_search":
+            return fit_blocks(self._search(text, seen), budget)
+        if tool == "get_weather_info":
+            text = " ".join(_DECORATION.sub("", text).split())
+        if text in seen:
+            return "(Same result as given earlier in this conversation.)"
+        seen.add(text)
+        return _truncate(text, budget)
+
+    def _recent_start(self, messages: List[BaseMessage], since: int) -> int:
+        turn_starts = [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+        return max(since, turn_starts[-1 - self.lookback_turns] if len(turn_starts) > self.lookback_turns else 0)
+
+    def compact(self, messages: List[BaseMessage], since: int = 0) -> Tuple[List[ToolMessage], int]:
+        """Compact the tool results at the end of messages.
+
+        Earlier tool results from messages[since:] in the recent turns count as already
+        in the conversation. Returns the replacement messages (same ids) and the tokens saved.
+        """
+        end = len(messages)
+        while end > 0 and isinstance(messages[end - 1], ToolMessage):
+            end -= 1
+        new = messages[end:]
+        if not new:
+            return [], 0
+        asked = next((message for message in reversed(messages[:end]) if isinstance(message, HumanMessage)), None)
+        wants_email = asked is not None and _WANTS_EMAIL.search(str(asked.content)) is not None
+
+        # What each tool has already put in front of the model
+        seen: Dict[str, Set[str]] = {}
+        for message in messages[self._recent_start(messages, since):end]:
+            if isinstance(message, ToolMessage):
+                self.compact_text(message.name, str(message.content), seen.setdefault(message.name, set()), wants_email=True)
+
+        replaced, saved = [], 0
+        for message in new:
+            if not isinstance(message.content, str):
+                continue
+            text = message.content
+            compacted = self.compact_text(message.name, text, seen.setdefault(message.name, set()), wants_email)
+            raw_tokens = estimate_tokens(text)
+            message_saved = raw_tokens - estimate_tokens(compacted)
+            self.raw_tokens += raw_tokens
+            self.saved_tokens += message_saved
+            saved += message_saved
+            record_compaction(message.name, raw_tokens, message_saved)
+            if compacted != text:
+                replaced.append(message.model_copy(update={"content": compacted}))
+        return replaced, saved
+
+    def stats(self) -> dict:
+        """Return the tokens tool results came to and how many compaction saved."""
+        return {"raw_tokens": self.raw_tokens, "saved_tokens": self.saved_tokens}
+
+
+def parse_budgets(spec: str) -> Dict[str, int]:
+    """Parse "tool=tokens,tool=tokens" into a budget per tool."""
+    budgets = {}
+    for item in spec.split(","):
+        if item.strip():
+            tool, tokens = item.split("=")
+            budgets[tool.strip()] = int(tokens)
+    return budgets
+
+
+def compactor_from_env() -> Optional[ToolOutputCompactor]:
+    """The tool output compactor, unless ALFRED_COMPACT_TOOLS=0 turns it off.
+
+    ALFRED_TOOL_BUDGETS overrides budgets as "tool=tokens" pairs, comma-separated.
+    """
+    if os.getenv("ALFRED_COMPACT_TOOLS", "1") == "0":
+        return None
+    return ToolOutputCompactor(budgets=parse_budgets(os.getenv("ALFRED_TOOL_BUDGETS", "")))
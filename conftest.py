@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+from benchmark import DATASET_NAME, synthetic_guests
+from guest_index import build_snapshot
+
+# Tests never touch the hub: tools loads a synthetic guest list from a scratch snapshot
+if "GUEST_INDEX_DIR" not in os.environ:
+    os.environ["GUEST_INDEX_DIR"] = tempfile.mkdtemp(prefix="alfred-tests-")
+    build_snapshot(os.environ["GUEST_INDEX_DIR"], DATASET_NAME, synthetic_guests(200))
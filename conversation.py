@@ -0,0 +1,132 @@
+from typing import Awaitable, Callable, List, Mapping, MutableMapping
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langgraph.constants import TAG_NOSTREAM
+
+SUMMARY_PROMPT = """You keep a running summary of a conversation between a guest and Alfred, a butler at a gala.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Rewrite the summary so it also covers the new messages. Keep names, facts about guests, places, weather findings and any open requests. Reply with the summary only, in at most 150 words."""
+
+
+# Room left in the budget for the rolling summary (the prompt asks for at most 150 words)
+SUMMARY_RESERVE = 250
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token) that needs no tokenizer download."""
+    return max(1, len(text) // 4)
+
+
+def _count(messages) -> int:
+    return sum(estimate_tokens(str(message.content)) + 4 for message in messages)
+
+
+def _transcript_line(message: BaseMessage) -> str:
+    if isinstance(message, HumanMessage):
+        return f"Guest: {message.content}"
+    if isinstance(message, ToolMessage):
+        return f"Tool result ({message.name}): {str(message.content)[:500]}"
+    if isinstance(message, AIMessage) and message.tool_calls and not message.content:
+        return "Alfred called " + ", ".join(f"{call['name']}({call['args']})" for call in message.tool_calls)
+    return f"Alfred: {message.content}"
+
+
+def summarize_with(chat, scheduler=None) -> Callable[[str, List[BaseMessage]], Awaitable[str]]:
+    """Build a summarizer that folds new messages into the running summary with a chat model.
+
+    With an LLMScheduler the calls are queued, paced and retried with every other model call.
+    The calls are tagged so the graph's message stream leaves them out: the summary is
+    made inside the assistant node, and would otherwise show up as part of its answer.
+    """
+    chat = chat.with_config(tags=[TAG_NOSTREAM])
+
+    async def summarize(summary: str, messages: List[BaseMessage]) -> str:
+        transcript = "\n".join(_transcript_line(message) for message in messages)
+        prompt = [HumanMessage(content=SUMMARY_PROMPT.format(summary=summary or "(empty)", messages=transcript))]
+        if scheduler is not None:
+            response = await scheduler.ainvoke(chat, prompt, session="summaries")
+        else:
+            response = await chat.ainvoke(prompt)
+        return response.content.strip()
+
+    return summarize
+
+
+class ConversationWindow:
+    """Keeps the prompt within a token budget with a verbatim tail and a rolling summary.
+
+    The first message is the system prompt and is always sent. The last keep_turns
+    turns (a guest message plus everything up to the next one, tool calls included)
+    are sent word for word, and anything older is folded into a summary kept in a state
+    mapping. Each message is folded exactly once, and the summary is extended rather
+    than regenerated.
+    """
+
+    def __init__(self, summarize: Callable[[str, List[BaseMessage]], Awaitable[str]], token_budget: int = 3000, keep_turns: int = 4):
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+
+    def fold_boundary(self, messages: List[BaseMessage], state: Mapping) -> int:
+        """Index of the first message the next build will send verbatim.
+
+        Everything before it is in the summary already or will be folded into it.
+        """
+        summarized = state.get("context_summarized", 1)
+        # Turns start at guest messages; the current turn always stays verbatim
+        turn_starts = [i for i, message in enumerate(messages) if i > 0 and isinstance(message, HumanMessage)]
+        if not turn_starts:
+            return summarized
+        boundaries = [i for i in turn_starts if i >= summarized] or [turn_starts[-1]]
+        keep_turn = max(0, len(boundaries) - 1 - self.keep_turns)
+
+        # Fold whole turns into the summary until the rest fits, leaving room for the summary itself
+        fixed_tokens = _count(messages[:1]) + SUMMARY_RESERVE
+        while keep_turn < len(boundaries) - 1 and fixed_tokens + _count(messages[boundaries[keep_turn]:]) > self.token_budget:
+            keep_turn += 1
+        return max(summarized, boundaries[keep_turn])
+
+    async def build(self, messages: List[BaseMessage], state: MutableMapping):
+        """Return the prompt for the next model call and a report of the tokens saved.
+
+        state holds context_summary and context_summarized (how many messages have been
+        folded) and is updated in place.
+        """
+        summary = state.get("context_summary", "")
+        summarized = state.get("context_summarized", 1)
+        system_message = messages[0]
+
+        if not any(isinstance(message, HumanMessage) for message in messages[1:]):
+            return list(messages), {"full_tokens": _count(messages), "prompt_tokens": _count(messages), "saved_tokens": 0, "summarized_messages": 0}
+        keep_from = self.fold_boundary(messages, state)
+
+        if keep_from > summarized:
+            try:
+                summary = await self.summarize(summary, messages[summarized:keep_from])
+                summarized = keep_from
+            except Exception:
+                # Keep the messages verbatim rather than lose them if summarizing fails
+                keep_from = summarized
+
+        prompt = [system_message]
+        if summary:
+            prompt.append(HumanMessage(content=f"For context, here is a summary of our earlier conversation:\n{summary}"))
+        prompt.extend(messages[keep_from:])
+
+        state["context_summary"] = summary
+        state["context_summarized"] = summarized
+        full_tokens = _count(messages)
+        prompt_tokens = _count(prompt)
+        report = {
+            "full_tokens": full_tokens,
+            "prompt_tokens": prompt_tokens,
+            "saved_tokens": full_tokens - prompt_tokens,
+            "summarized_messages": summarized - 1,
+        }
+        return prompt, report
@@ -0,0 +1,610 @@
+import copy
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+from functools import cached_property
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from guest_store import COLUMN_ARRAYS, GuestStore, column_arrays
+from name_index import NAME_ARRAYS, NameIndex, name_arrays, name_fields
+
+# Bump this whenever the on-disk layout changes so stale snapshots get rebuilt
+SNAPSHOT_FORMAT = 4
+
+# BM25Okapi defaults, kept identical to what BM25Retriever.from_documents uses
+BM25_PARAMS = {"k1": 1.5, "b": 0.75, "epsilon": 0.25}
+
+_ARRAYS = [
+    "vocab", "vocab_offsets", "df", "idf", "doc_len",
+    "postings_indptr", "postings_docs", "postings_tf",
+    "postings_weights", "tokens_indptr", "tokens",
+]
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into BM25 terms, the same way BM25Retriever does by default."""
+    return text.split()
+
+
+def dataset_fingerprint(docs: List[Document]) -> str:
+    """Hash the guest documents so a snapshot can be matched to the data it was built from."""
+    digest = hashlib.sha256()
+    for doc in docs:
+        record = json.dumps([doc.page_content, doc.metadata], sort_keys=True, ensure_ascii=False)
+        digest.update(record.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def _pointer_path(root: str, dataset_name: str) -> str:
+    return os.path.join(root, dataset_name.replace("/", "__") + ".current")
+
+
+class _LiveStats:
+    """Corpus statistics and postings for guests changed since the snapshot was built.
+
+    Removed guests keep their ids and are masked out. Added guests get new ids after
+    the snapshot's and their postings live here, with terms the snapshot doesn't know
+    numbered after its vocabulary. Instances are never modified once published.
+    """
+
+    def __init__(self, removed, doc_len, df, extra_terms, postings, doc_terms):
+        self.removed = removed
+        self.doc_len = doc_len
+        self.df = df
+        self.extra_terms = extra_terms
+        self.postings = postings
+        self.doc_terms = doc_terms
+        self.n_live = int(len(removed) - removed.sum())
+        self.avgdl = float(doc_len[~removed].sum()) / max(self.n_live, 1)
+        self.idf = _idf(df, self.n_live)
+
+
+def _idf(df: np.ndarray, n_docs: int) -> np.ndarray:
+    """BM25Okapi idf for every term, with negative values floored at epsilon times the mean idf."""
+    present = df > 0
+    idf = np.zeros(len(df))
+    idf[present] = np.log(n_docs - df[present] + 0.5) - np.log(df[present] + 0.5)
+    if present.any():
+        floor = BM25_PARAMS["epsilon"] * idf[present].mean()
+        idf[present & (idf < 0)] = floor
+    return idf
+
+
+class RangeStats(NamedTuple):
+    """What scoring snapshot guests needs from a changed version, for a copy mapping only the snapshot.
+
+    idf holds the current idf of each query term the snapshot knows; removed the
+    snapshot guests removed since.
+    """
+
+    idf: Dict[str, float]
+    avgdl: float
+    removed: np.ndarray
+
+
+class GuestIndex:
+    """BM25 index over the guest documents, backed by memory-mapped snapshot arrays.
+
+    An index is never modified in place: with_changes returns a new version that shares
+    the snapshot arrays and carries the changes on top, so readers holding the old
+    version keep a consistent view while a writer publishes the next one.
+    """
+
+    def __init__(self, path: str, meta: dict, arrays: dict, docs: GuestStore):
+        self.path = path
+        self.meta = meta
+        self.fingerprint = meta["fingerprint"]
+        self.docs = docs
+        self.n_docs = meta["n_docs"]
+        self.n_terms = meta["n_terms"]
+        self.avgdl = meta["avgdl"]
+        self.k1 = meta["k1"]
+        self.b = meta["b"]
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.name_arrays = {name: arrays[name] for name in NAME_ARRAYS if name in arrays}
+        # Number of changes applied on top of the snapshot, and their statistics
+        self.version = 0
+        self._live: Optional[_LiveStats] = None
+
+    @cached_property
+    def names(self) -> NameIndex:
+        """Name and relation lookups over the same guests, from the snapshot's tables."""
+        return NameIndex.from_arrays(self.name_arrays, self.meta["max_name_tokens"])
+
+    def is_live(self, doc_id: int) -> bool:
+        """True unless the guest has been removed or replaced."""
+        return self._live is None or not self._live.removed[doc_id]
+
+    def live_docs(self) -> GuestStore:
+        """The current guest list, in index order."""
+        if self._live is None:
+            return self.docs
+        return self.docs.view(np.flatnonzero(~self._live.removed))
+
+    def find(self, name: str) -> Optional[int]:
+        """Id of the current guest with exactly this name, if there is one."""
+        match = self.names.lookup(name)
+        if match is not None and match.kind == "exact":
+            return next((doc_id for doc_id in match.doc_ids if self.is_live(doc_id)), None)
+        return None
+
+    def with_changes(self, add: List[Document] = (), remove: List[int] = ()) -> "GuestIndex":
+        """Return a new version with guests added and removed, without rebuilding the index.
+
+        Document frequencies and lengths are adjusted only for the changed guests; idf
+        and the average length are then derived from them. An update is a removal plus
+        an addition.
+        """
+        live = self._live
+        if live is None:
+            live = _LiveStats(
+                removed=np.zeros(self.n_docs, dtype=bool),
+                doc_len=np.array(self.doc_len, dtype=np.int64),
+                df=np.array(self.df, dtype=np.int64),
+                extra_terms={}, postings={}, doc_terms={},
+            )
+        removed = np.concatenate([live.removed, np.zeros(len(add), dtype=bool)])
+        doc_len = np.concatenate([live.doc_len, np.zeros(len(add), dtype=np.int64)])
+        df = live.df.copy()
+        extra_terms, postings, doc_terms = dict(live.extra_terms), dict(live.postings), dict(live.doc_terms)
+
+        for doc_id in remove:
+            if removed[doc_id]:
+                continue
+            removed[doc_id] = True
+            if doc_id < self.n_docs:
+                terms = np.unique(self.tokens[self.tokens_indptr[doc_id]:self.tokens_indptr[doc_id + 1]])
+            else:
+                terms = doc_terms[doc_id]
+            df[terms] -= 1
+
+        for offset, doc in enumerate(add):
+            doc_id = len(self.docs) + offset
+            tokens = tokenize(doc.page_content)
+            doc_len[doc_id] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            terms = []
+            for token, tf in counts.items():
+                term_id = self.term_id(token)
+                if term_id < 0:
+                    term_id = extra_terms.setdefault(token, self.n_terms + len(extra_terms))
+                if term_id >= len(df):
+                    df = np.concatenate([df, np.zeros(term_id + 1 - len(df), dtype=np.int64)])
+                df[term_id] += 1
+                docs, tfs = postings.get(term_id, (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)))
+                postings[term_id] = (np.append(docs, doc_id), np.append(tfs, tf))
+                terms.append(term_id)
+            doc_terms[doc_id] = np.array(terms, dtype=np.int64)
+
+        index = copy.copy(self)
+        index.docs = self.docs.with_added(list(add))
+        index.version = self.version + 1
+        index._live = _LiveStats(removed, doc_len, df, extra_terms, postings, doc_terms)
+        index.avgdl = index._live.avgdl
+        index.__dict__["names"] = self.names.updated(
+            [(doc_id, self.docs[doc_id]) for doc_id in remove],
+            [(len(self.docs) + offset, doc) for offset, doc in enumerate(add)],
+        )
+        return index
+
+    def _live_scores(self, query_tokens: List[str]) -> np.ndarray:
+        """Score every guest with the statistics as changed since the snapshot."""
+        live = self._live
+        k1, b = self.k1, self.b
+        docs_parts, weight_parts = [], []
+        for token in query_tokens:
+            term_id = self.term_id(token)
+            if term_id < 0:
+                term_id = live.extra_terms.get(token, -1)
+            if term_id < 0:
+                continue
+            docs = [np.zeros(0, dtype=np.int64)]
+            tfs = [np.zeros(0, dtype=np.int64)]
+            if term_id < self.n_terms:
+                start, end = self.postings_indptr[term_id], self.postings_indptr[term_id + 1]
+                docs.append(np.asarray(self.postings_docs[start:end], dtype=np.int64))
+                tfs.append(np.asarray(self.postings_tf[start:end], dtype=np.int64))
+            if term_id in live.postings:
+                docs.append(live.postings[term_id][0])
+                tfs.append(live.postings[term_id][1])
+            docs, tfs = np.concatenate(docs), np.concatenate(tfs)
+            weights = live.idf[term_id] * (tfs * (k1 + 1) / (tfs + k1 * (1 - b + b * live.doc_len[docs] / live.avgdl)))
+            docs_parts.append(docs)
+            weight_parts.append(np.where(live.removed[docs], 0.0, weights))
+        scores = np.bincount(
+            np.concatenate(docs_parts) if docs_parts else np.zeros(0, dtype=np.int64),
+            weights=np.concatenate(weight_parts) if weight_parts else None,
+            minlength=len(self.docs),
+        ).astype(float)
+        # Removed guests must never be returned, not even as zero-score filler
+        scores[live.removed] = -np.inf
+        return scores
+
+    def term(self, term_id: int) -> str:
+        """Return the vocabulary term with the given id."""
+        start, end = self.vocab_offsets[term_id], self.vocab_offsets[term_id + 1]
+        return bytes(self.vocab[start:end]).decode("utf-8")
+
+    def term_id(self, term: str) -> int:
+        """Binary-search the sorted vocabulary for a term, returning -1 if it is unknown."""
+        target = term.encode("utf-8")
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start, end = self.vocab_offsets[mid], self.vocab_offsets[mid + 1]
+            if bytes(self.vocab[start:end]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_terms:
+            start, end = self.vocab_offsets[lo], self.vocab_offsets[lo + 1]
+            if bytes(self.vocab[start:end]) == target:
+                return lo
+        return -1
+
+    def _query_postings(self, query_tokens: List[str]) -> np.ndarray:
+        """Positions of every posting touched by the query, one row per query token in order."""
+        term_ids = np.array([self.term_id(token) for token in query_tokens], dtype=np.int64)
+        term_ids = term_ids[term_ids >= 0]
+        starts = self.postings_indptr[term_ids]
+        lengths = self.postings_indptr[term_ids + 1] - starts
+        # Concatenate the [start, end) ranges without a Python loop
+        row_offsets = np.cumsum(lengths) - lengths
+        return np.arange(int(lengths.sum())) - np.repeat(row_offsets - starts, lengths)
+
+    def get_scores(self, query_tokens: List[str]) -> np.ndarray:
+        """Score every guest against the query, matching rank_bm25's BM25Okapi.get_scores.
+
+        The postings hold precomputed BM25 weights, so this is a sparse query vector times
+        the CSR term-document matrix. bincount accumulates in query-token order, which keeps
+        the floating point sums identical to rank_bm25's term-by-term loop. Once guests
+        have been changed, weights are computed from the current statistics instead.
+        """
+        if self._live is not None:
+            return self._live_scores(query_tokens)
+        positions = self._query_postings(query_tokens)
+        return np.bincount(
+            self.postings_docs[positions],
+            weights=self.postings_weights[positions],
+            minlength=self.n_docs,
+        )
+
+    def get_scores_range(self, query_tokens: List[str], lo: int, hi: int, stats: Optional[RangeStats] = None) -> np.ndarray:
+        """Scores of snapshot guests lo to hi-1 only, identical to that slice of get_scores.
+
+        Each term's postings are sorted by guest, so the range is found by binary search
+        and the rest of the corpus is never touched. With stats (see range_stats) the
+        weights are computed from a changed version's statistics instead, as it would.
+        """
+        docs_parts, weight_parts = [], []
+        for token in query_tokens:
+            term_id = self.term_id(token)
+            if term_id < 0:
+                continue
+            start, end = self.postings_indptr[term_id], self.postings_indptr[term_id + 1]
+            first, last = start + np.searchsorted(self.postings_docs[start:end], [lo, hi])
+            docs_parts.append(self.postings_docs[first:last])
+            if stats is None:
+                weight_parts.append(self.postings_weights[first:last])
+                continue
+            docs = np.asarray(self.postings_docs[first:last], dtype=np.int64)
+            tfs = np.asarray(self.postings_tf[first:last], dtype=np.int64)
+            weight_parts.append(stats.idf[token] * (tfs * (self.k1 + 1) / (tfs + self.k1 * (1 - self.b + self.b * self.doc_len[docs] / stats.avgdl))))
+        if not docs_parts:
+            scores = np.zeros(hi - lo)
+        else:
+            # Float even when no posting falls in the range, so removed guests can be set to -inf
+            scores = np.bincount(np.concatenate(docs_parts) - lo, weights=np.concatenate(weight_parts), minlength=hi - lo).astype(float)
+        if stats is not None:
+            removed = stats.removed[(stats.removed >= lo) & (stats.removed < hi)]
+            scores[removed - lo] = -np.inf
+        return scores
+
+    def range_stats(self, queries_tokens: List[List[str]]) -> Optional[RangeStats]:
+        """The statistics get_scores_range needs to score these queries as this version does.
+
+        None while nothing has changed since the snapshot.
+        """
+        live = self._live
+        if live is None:
+            return None
+        idf = {}
+        for token in {token for tokens in queries_tokens for token in tokens}:
+            term_id = self.term_id(token)
+            if term_id >= 0:
+                idf[token] = float(live.idf[term_id])
+        return RangeStats(idf, live.avgdl, np.flatnonzero(live.removed[:self.n_docs]))
+
+    def get_scores_added(self, query_tokens: List[str]) -> np.ndarray:
+        """Scores of the guests added since the snapshot, identical to that slice of get_scores."""
+        live = self._live
+        n_added = len(self.docs) - self.n_docs
+        if live is None or n_added == 0:
+            return np.zeros(n_added)
+        k1, b = self.k1, self.b
+        docs_parts, weight_parts = [np.zeros(0, dtype=np.int64)], [np.zeros(0)]
+        for token in query_tokens:
+            term_id = self.term_id(token)
+            if term_id < 0:
+                term_id = live.extra_terms.get(token, -1)
+            if term_id not in live.postings:
+                continue
+            docs, tfs = live.postings[term_id]
+            docs_parts.append(docs - self.n_docs)
+            weight_parts.append(live.idf[term_id] * (tfs * (k1 + 1) / (tfs + k1 * (1 - b + b * live.doc_len[docs] / live.avgdl))))
+        scores = np.bincount(np.concatenate(docs_parts), weights=np.concatenate(weight_parts), minlength=n_added).astype(float)
+        scores[live.removed[self.n_docs:]] = -np.inf
+        return scores
+
+    def get_scores_batch(self, queries_tokens: List[List[str]]) -> np.ndarray:
+        """Score several queries in one pass, returning one row of guest scores per query."""
+        if self._live is not None:
+            return np.array([self._live_scores(tokens) for tokens in queries_tokens]).reshape(len(queries_tokens), len(self.docs))
+        positions = [self._query_postings(tokens) for tokens in queries_tokens]
+        query_ids = np.repeat(np.arange(len(positions), dtype=np.int64), [len(p) for p in positions])
+        positions = np.concatenate(positions) if positions else np.zeros(0, dtype=np.int64)
+        scores = np.bincount(
+            query_ids * self.n_docs + self.postings_docs[positions],
+            weights=self.postings_weights[positions],
+            minlength=len(queries_tokens) * self.n_docs,
+        )
+        return scores.reshape(len(queries_tokens), self.n_docs)
+
+    def _top_docs(self, scores: np.ndarray, n: int) -> List[Document]:
+        return [self.docs[i] for i in top_k(scores, n) if self.is_live(i)]
+
+    def get_top_n(self, query_tokens: List[str], n: int = 4) -> List[Document]:
+        """Return the n best-scoring guest documents for the query."""
+        return self._top_docs(self.get_scores(query_tokens), n)
+
+    def get_top_n_batch(self, queries_tokens: List[List[str]], n: int = 4) -> List[List[Document]]:
+        """Return the n best-scoring guest documents for each query."""
+        return [self._top_docs(scores, n) for scores in self.get_scores_batch(queries_tokens)]
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, without sorting the whole array.
+
+    Ties are broken towards the higher index so results are deterministic; rank_bm25's
+    reversed argsort leaves the order of tied documents up to numpy's sort.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+        kth = scores[candidates].min()
+        above = candidates[scores[candidates] > kth]
+        tied = np.flatnonzero(scores == kth)[::-1][:k - len(above)]
+        candidates = np.concatenate([above, tied])
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.lexsort((-candidates, -scores[candidates]))]
+
+
+def check_parity(index: GuestIndex, queries: List[str], k: int = 4) -> List[str]:
+    """Compare the index with LangChain's BM25Retriever and return the queries that disagree.
+
+    Rankings match when both return the same documents with the same scores, in the same
+    order; documents that tie on score may come back in either order.
+    """
+    from langchain_community.retrievers import BM25Retriever
+
+    reference = BM25Retriever.from_documents(index.docs, k=k).vectorizer
+    mismatches = []
+    for query in queries:
+        tokens = tokenize(query)
+        expected = reference.get_scores(tokens)
+        scores = index.get_scores(tokens)
+        expected_top = np.argsort(expected)[::-1][:k]
+        if not np.array_equal(expected, scores) or not np.array_equal(expected[expected_top], scores[top_k(scores, k)]):
+            mismatches.append(query)
+    return mismatches
+
+
+class GuestIndexRetriever(BaseRetriever):
+    """LangChain retriever that serves queries from a GuestIndex snapshot.
+
+    Queries that plainly name a guest (or a relation few guests share) are answered
+    from the name index; BM25 only runs when that has no confident hit.
+    """
+
+    index: Any
+    k: int = 4
+    preprocess_func: Callable[[str], List[str]] = tokenize
+    use_names: bool = True
+
+    def _name_match(self, index: GuestIndex, query: str) -> Optional[List[Document]]:
+        match = index.names.lookup(query, k=self.k) if self.use_names else None
+        if match is None:
+            return None
+        return [index.docs[i] for i in match.doc_ids if index.is_live(i)] or None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        # One index version for the whole lookup, even if a new one is published meanwhile
+        index = self.index
+        docs = self._name_match(index, query)
+        if docs is not None:
+            return docs
+        return index.get_top_n(self.preprocess_func(query), n=self.k)
+
+    def batch_relevant_documents(self, queries: List[str]) -> List[List[Document]]:
+        """Retrieve documents for several queries with a single scoring pass over the index."""
+        index = self.index
+        results = [self._name_match(index, query) for query in queries]
+        misses = [i for i, docs in enumerate(results) if docs is None]
+        if misses:
+            ranked = index.get_top_n_batch([self.preprocess_func(queries[i]) for i in misses], n=self.k)
+            for i, docs in zip(misses, ranked):
+                results[i] = docs
+        return results
+
+
+def build_snapshot(root: str, dataset_name: str, docs: List[Document]) -> str:
+    """Tokenize and index the guest documents and write them to an on-disk snapshot.
+
+    The snapshot lives in ``<root>/<fingerprint>/`` and a small pointer file records
+    which fingerprint is current for the dataset, so later loads never touch the hub.
+    Guest records are stored as columns (see guest_store), so they must be shaped like
+    tools.guest_document's.
+    """
+    if not docs:
+        raise ValueError("Cannot build a guest index from an empty guest list")
+
+    k1, b, epsilon = BM25_PARAMS["k1"], BM25_PARAMS["b"], BM25_PARAMS["epsilon"]
+    fingerprint = dataset_fingerprint(docs)
+    n_docs = len(docs)
+
+    # Tokenized corpus as term ids against a sorted vocabulary
+    tokenized = [tokenize(doc.page_content) for doc in docs]
+    vocab = sorted({token for tokens in tokenized for token in tokens})
+    term_ids = {term: i for i, term in enumerate(vocab)}
+    doc_len = np.array([len(tokens) for tokens in tokenized], dtype=np.int32)
+    avgdl = int(doc_len.sum()) / n_docs
+    tokens_indptr = np.zeros(n_docs + 1, dtype=np.int64)
+    np.cumsum(doc_len, out=tokens_indptr[1:])
+    tokens = np.fromiter(
+        (term_ids[token] for doc_tokens in tokenized for token in doc_tokens),
+        dtype=np.int32,
+        count=int(tokens_indptr[-1]),
+    )
+
+    # Postings: one (term, doc) pair per distinct term in a document, sorted by term then doc
+    doc_ids = np.repeat(np.arange(n_docs, dtype=np.int64), doc_len)
+    keys, postings_tf = np.unique(tokens.astype(np.int64) * n_docs + doc_ids, return_counts=True)
+    postings_terms = keys // n_docs
+    postings_docs = (keys % n_docs).astype(np.int32)
+    df = np.bincount(postings_terms, minlength=len(vocab)).astype(np.int32)
+    postings_indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(df, out=postings_indptr[1:])
+
+    # Term statistics. rank_bm25 sums idf in first-appearance order and floors negative
+    # idfs at epsilon * average idf, so do the same to keep scores bit-for-bit identical.
+    _, first_seen = np.unique(tokens, return_index=True)
+    idf = np.zeros(len(vocab))
+    idf_sum = 0.0
+    negative = []
+    for term_id in np.argsort(first_seen, kind="stable"):
+        freq = int(df[term_id])
+        value = math.log(n_docs - freq + 0.5) - math.log(freq + 0.5)
+        idf[term_id] = value
+        idf_sum += value
+        if value < 0:
+            negative.append(term_id)
+    idf[negative] = epsilon * (idf_sum / len(vocab))
+
+    # Precompute each posting's BM25 weight so a query is a single sparse dot product
+    posting_len = doc_len[postings_docs]
+    postings_weights = idf[postings_terms] * (
+        postings_tf * (k1 + 1) / (postings_tf + k1 * (1 - b + b * posting_len / avgdl))
+    )
+
+    # Name and relation lookup tables, mapped like everything else rather than rebuilt per process
+    names, max_name_tokens = name_arrays((doc_id, *name_fields(doc)) for doc_id, doc in enumerate(docs))
+
+    vocab_bytes = [term.encode("utf-8") for term in vocab]
+    vocab_offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum([len(term) for term in vocab_bytes], out=vocab_offsets[1:])
+
+    arrays = {
+        "vocab": np.frombuffer(b"".join(vocab_bytes), dtype=np.uint8),
+        "vocab_offsets": vocab_offsets,
+        "df": df,
+        "idf": idf,
+        "doc_len": doc_len,
+        "postings_indptr": postings_indptr,
+        "postings_docs": postings_docs,
+        "postings_tf": postings_tf.astype(np.int32),
+        "postings_weights": postings_weights,
+        "tokens_indptr": tokens_indptr,
+        "tokens": tokens,
+        **column_arrays(docs),
+        **names,
+    }
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "dataset": dataset_name,
+        "fingerprint": fingerprint,
+        "n_docs": n_docs,
+        "n_terms": len(vocab),
+        "avgdl": avgdl,
+        "k1": k1,
+        "b": b,
+        "epsilon": epsilon,
+        "max_name_tokens": max_name_tokens,
+    }
+
+    # Write into a scratch directory first and move it into place in one step, so
+    # other processes never see a half-written snapshot
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, fingerprint)
+    # Same data written by an older format is replaced too
+    if open_snapshot(path) is None:
+        scratch = tempfile.mkdtemp(prefix=".build-", dir=root)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(scratch, f"{name}.npy"), array)
+            with open(os.path.join(scratch, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(scratch, path)
+        except OSError:
+            shutil.rmtree(scratch, ignore_errors=True)
+            if open_snapshot(path) is None:
+                raise
+
+    pointer = _pointer_path(root, dataset_name)
+    with tempfile.NamedTemporaryFile("w", dir=root, delete=False) as f:
+        f.write(fingerprint)
+    os.replace(f.name, pointer)
+    return path
+
+
+def open_snapshot(path: str, with_docs: bool = True) -> Optional[GuestIndex]:
+    """Memory-map the snapshot in a directory, or return None if it isn't usable.
+
+    Without docs only the index arrays are mapped, which is all a scoring worker needs.
+    The guest records and name tables are mapped too rather than parsed, so opening is
+    cheap at any size.
+    """
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != SNAPSHOT_FORMAT or meta.get("fingerprint") != os.path.basename(os.path.normpath(path)):
+            return None
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in _ARRAYS
+        }
+        docs = []
+        if with_docs:
+            docs = GuestStore({name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in COLUMN_ARRAYS})
+            arrays.update((name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")) for name in NAME_ARRAYS)
+    except (OSError, ValueError, KeyError):
+        return None
+    return GuestIndex(path, meta, arrays, docs)
+
+
+def load_snapshot(root: str, dataset_name: str, fingerprint: Optional[str] = None) -> Optional[GuestIndex]:
+    """Memory-map the current snapshot for a dataset, or return None if there isn't a usable one."""
+    if fingerprint is None:
+        try:
+            with open(_pointer_path(root, dataset_name), encoding="utf-8") as f:
+                fingerprint = f.read().strip()
+        except OSError:
+            return None
+    return open_snapshot(os.path.join(root, fingerprint))
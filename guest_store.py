@@ -0,0 +1,108 @@
+import re
+from collections.abc import Sequence
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+# Columns of a guest record, in the order they appear in its text
+GUEST_FIELDS = ("name", "relation", "description", "email")
+
+_RECORD = re.compile(r"Name: (.*)\nRelation: (.*)\nDescription: (.*)\nEmail: (.*)", re.DOTALL)
+
+
+def format_guest(name: str, relation: str, description: str, email: str) -> str:
+    """The text of a guest record, as retrieval results show it to the model."""
+    return "\n".join([
+        f"Name: {name}",
+        f"Relation: {relation}",
+        f"Description: {description}",
+        f"Email: {email}",
+    ])
+
+
+def guest_fields(doc: Document) -> List[str]:
+    """Split a guest Document back into its columns; raises ValueError for anything else."""
+    match = _RECORD.fullmatch(doc.page_content)
+    if match is None or doc.metadata != {"name": match.group(1)}:
+        raise ValueError(f"Not a guest record: {doc.page_content[:60]!r}")
+    return list(match.groups())
+
+
+def column_arrays(docs: List[Document]) -> Dict[str, np.ndarray]:
+    """Encode the guests as one UTF-8 byte array plus offsets per column, for a snapshot."""
+    columns = [[] for _ in GUEST_FIELDS]
+    for doc in docs:
+        for column, value in zip(columns, guest_fields(doc)):
+            column.append(value.encode("utf-8"))
+    arrays = {}
+    for field, values in zip(GUEST_FIELDS, columns):
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in values], out=offsets[1:])
+        arrays[f"guest_{field}"] = np.frombuffer(b"".join(values), dtype=np.uint8)
+        arrays[f"guest_{field}_offsets"] = offsets
+    return arrays
+
+
+COLUMN_ARRAYS = [name for field in GUEST_FIELDS for name in (f"guest_{field}", f"guest_{field}_offsets")]
+
+
+class GuestStore(Sequence):
+    """The guest list as columns of memory-mapped UTF-8 bytes, read as Documents on demand.
+
+    Guests are not held as Python objects: indexing formats one record from its
+    columns, so only the guests a lookup returns are ever materialized, and every
+    process mapping the snapshot shares the same pages. Guests added since the
+    snapshot are kept as Documents after the mapped ones; ids selects a view.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], added: tuple = (), ids: Optional[np.ndarray] = None):
+        self.arrays = arrays
+        self.added = added
+        self.ids = ids
+        self.n_mapped = len(arrays["guest_name_offsets"]) - 1
+
+    def __len__(self) -> int:
+        if self.ids is not None:
+            return len(self.ids)
+        return self.n_mapped + len(self.added)
+
+    def _doc_id(self, i: int) -> int:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("guest index out of range")
+        return int(self.ids[i]) if self.ids is not None else i
+
+    def field(self, i: int, field: str) -> str:
+        """One column of the i-th guest, without formatting the whole record."""
+        doc_id = self._doc_id(i)
+        if doc_id >= self.n_mapped:
+            return guest_fields(self.added[doc_id - self.n_mapped])[GUEST_FIELDS.index(field)]
+        return self._mapped(doc_id, field)
+
+    def _mapped(self, doc_id: int, field: str) -> str:
+        offsets = self.arrays[f"guest_{field}_offsets"]
+        return bytes(self.arrays[f"guest_{field}"][offsets[doc_id]:offsets[doc_id + 1]]).decode("utf-8")
+
+    def __getitem__(self, i: int) -> Document:
+        doc_id = self._doc_id(i)
+        if doc_id >= self.n_mapped:
+            return self.added[doc_id - self.n_mapped]
+        name, relation, description, email = (self._mapped(doc_id, field) for field in GUEST_FIELDS)
+        return Document(page_content=format_guest(name, relation, description, email), metadata={"name": name})
+
+    def column(self, field: str) -> Iterator[str]:
+        """Every guest's value for one column, in order."""
+        for i in range(len(self)):
+            yield self.field(i, field)
+
+    def with_added(self, docs: List[Document]) -> "GuestStore":
+        """A store with guests appended after these, sharing the mapped columns."""
+        for doc in docs:
+            guest_fields(doc)
+        return GuestStore(self.arrays, self.added + tuple(docs))
+
+    def view(self, ids: np.ndarray) -> "GuestStore":
+        """The guests with these ids, in that order, without copying any of them."""
+        return GuestStore(self.arrays, self.added, np.asarray(ids, dtype=np.int64))
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+
+def describe_model(chat) -> dict:
+    """Identify a (possibly tool-bound) chat model: its model name, settings and tool schemas."""
+    bound = getattr(chat, "bound", chat)
+    kwargs = getattr(chat, "kwargs", {}) or {}
+    return {
+        "model": getattr(bound, "model_name", None) or getattr(bound, "model", None) or type(bound).__name__,
+        "temperature": getattr(bound, "temperature", None),
+        "tools": kwargs.get("tools", []),
+    }
+
+
+def _normalize(messages: List[BaseMessage]) -> list:
+    """Reduce messages to what the model sees, so random message and tool call ids don't defeat the cache."""
+    call_ids = {}
+
+    def call_id(value):
+        return call_ids.setdefault(value, f"call_{len(call_ids)}")
+
+    normalized = []
+    for message in messages:
+        entry = {"type": message.type, "content": message.content}
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            entry.setdefault("tool_calls", []).append(
+                {"name": tool_call["name"], "args": tool_call["args"], "id": call_id(tool_call["id"])}
+            )
+        if getattr(message, "tool_call_id", None):
+            entry["tool_call_id"] = call_id(message.tool_call_id)
+            entry["name"] = message.name
+        normalized.append(entry)
+    return normalized
+
+
+def request_key(chat, messages: List[BaseMessage]) -> str:
+    """Hash a request: model, tool schemas and normalized messages."""
+    payload = json.dumps([describe_model(chat), _normalize(messages)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Persistent SQLite cache of chat model responses keyed on the full prompt.
+
+    Keys hash the model name and settings, the bound tool schemas and the message list,
+    so a hit is only served for exactly the same request. Responses are stored with their
+    tool calls intact so the graph can replay them. Entries expire after ttl seconds, and
+    the least recently used ones are evicted past max_entries or max_bytes.
+    """
+
+    def __init__(self, path: str, ttl: float = 24 * 3600, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._connection.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, chat, messages: List[BaseMessage]) -> str:
+        """Hash a request: model, tool schemas and normalized messages."""
+        return request_key(chat, messages)
+
+    def get(self, key: str) -> Optional[BaseMessage]:
+        """Return the cached response for a key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, created FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] + self.ttl <= now:
+                self._connection.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._connection.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            self.hits += 1
+
+        message = messages_from_dict([json.loads(row[0])])[0]
+        # A fresh id lets add_messages append the replayed response instead of replacing an earlier one
+        message.id = None
+        return message
+
+    def set(self, key: str, message: BaseMessage) -> None:
+        """Store a response, then evict expired and least recently used entries past the limits."""
+        value = json.dumps(message_to_dict(message))
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._connection.execute("DELETE FROM llm_cache WHERE created <= ?", (now - self.ttl,))
+            count, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM llm_cache"
+            ).fetchone()
+            while count > self.max_entries or size > self.max_bytes:
+                oldest = self._connection.execute(
+                    "SELECT key, LENGTH(value) FROM llm_cache ORDER BY last_used LIMIT 1"
+                ).fetchone()
+                self._connection.execute("DELETE FROM llm_cache WHERE key = ?", (oldest[0],))
+                count, size = count - 1, size - oldest[1]
+                self.evictions += 1
+            self._connection.commit()
+
+    def stats(self) -> dict:
+        """Return hit, miss and eviction counters along with the stored entry count."""
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+        }
+
+
+def llm_cache_from_env() -> Optional[LLMCache]:
+    """Create the LLM cache if ALFRED_LLM_CACHE names a SQLite file; it is off by default."""
+    path = os.getenv("ALFRED_LLM_CACHE")
+    if not path:
+        return None
+    return LLMCache(
+        path,
+        ttl=float(os.getenv("ALFRED_LLM_CACHE_TTL", str(24 * 3600))),
+        max_entries=int(os.getenv("ALFRED_LLM_CACHE_MAX_ENTRIES", "10000")),
+    )
@@ -0,0 +1,263 @@
+import asyncio
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from typing import List, Optional
+
+from langchain_core.messages import BaseMessage
+
+from conversation import estimate_tokens
+from llm_cache import request_key
+from metrics import metrics, record_llm, record_llm_schedule
+
+# Statuses worth retrying: rate limited, or the service is briefly unavailable
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _status(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """True for a 429 from the model API."""
+    return _status(error) == 429
+
+
+def _retry_reason(error: BaseException) -> Optional[str]:
+    """Why an error is worth retrying ("rate_limited", "unavailable" or "connection"), or None."""
+    status = _status(error)
+    if status == 429:
+        return "rate_limited"
+    if status in RETRY_STATUSES:
+        return "unavailable"
+    # Groq's connection and timeout errors carry no status
+    if isinstance(error, (ConnectionError, asyncio.TimeoutError)) or type(error).__name__ in ("APIConnectionError", "APITimeoutError"):
+        return "connection"
+    return None
+
+
+def _retry_after(error: BaseException) -> float:
+    """The wait a 429 asked for in its Retry-After header, in seconds."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class TokenBucket:
+    """Allows rate units per second on average, in bursts of up to capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until amount can be taken (0 if it can be taken now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self) -> None:
+        """Empty the bucket, e.g. after the API said we are over quota."""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class LLMScheduler:
+    """Shared gate in front of the chat model for every session in the process.
+
+    At most max_concurrency requests are in flight; the rest wait in per-session queues
+    served round-robin, so one busy session can't starve the others. Requests and
+    estimated prompt tokens are paced by token buckets sized to the API's per-minute
+    quotas. Rate limits, 5xx responses and connection errors are retried with jittered
+    exponential backoff (honouring Retry-After), and a 429 drains the request bucket so
+    every session slows down together. Identical requests already in flight share one
+    call. All of it runs on Alfred's single background event loop.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        requests_per_minute: float = 30,
+        tokens_per_minute: float = 15000,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._requests = TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute / 6))
+        self._tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute / 6)
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._waiting = 0
+        self._active = 0
+        self._in_flight = {}
+        self._callers = {}
+        self.calls = 0
+        self.retries = 0
+        self.coalesced = 0
+
+    def _update_gauges(self) -> None:
+        metrics.set_gauge("alfred_llm_queue_depth", self._waiting)
+        metrics.set_gauge("alfred_llm_in_flight", self._active)
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting sessions in turn."""
+        while self._active < self.max_concurrency and self._queues:
+            session, waiters = next(iter(self._queues.items()))
+            grant = waiters.popleft()
+            if waiters:
+                self._queues.move_to_end(session)
+            else:
+                del self._queues[session]
+            self._waiting -= 1
+            if grant.done():
+                # Cancelled in this same loop tick, before its waiter could withdraw it
+                continue
+            self._active += 1
+            grant.set_result(None)
+        self._update_gauges()
+
+    async def _acquire(self, session: str) -> None:
+        if self._active < self.max_concurrency and not self._queues:
+            self._active += 1
+            self._update_gauges()
+            return
+        grant = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(session, deque()).append(grant)
+        self._waiting += 1
+        self._update_gauges()
+        try:
+            await grant
+        except asyncio.CancelledError:
+            if grant.cancelled():
+                # Still queued unless _dispatch already dropped it
+                waiters = self._queues.get(session)
+                if waiters is not None and grant in waiters:
+                    waiters.remove(grant)
+                    if not waiters:
+                        del self._queues[session]
+                    self._waiting -= 1
+                    self._update_gauges()
+            else:
+                # The slot was granted just as we were cancelled; pass it on
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    async def _throttle(self, tokens: int) -> None:
+        while True:
+            delay = max(self._requests.delay(1), self._tokens.delay(tokens))
+            if delay <= 0:
+                self._requests.take(1)
+                self._tokens.take(tokens)
+                return
+            await asyncio.sleep(delay)
+
+    async def _call(self, chat, messages: List[BaseMessage], session: str):
+        start = time.perf_counter()
+        await self._acquire(session)
+        try:
+            tokens = sum(estimate_tokens(str(message.content)) + 4 for message in messages)
+            for attempt in range(self.max_retries + 1):
+                # Retries are paced too, so a rate-limited burst isn't simply repeated
+                await self._throttle(tokens)
+                if attempt == 0:
+                    waited = time.perf_counter() - start
+                try:
+                    self.calls += 1
+                    called = time.perf_counter()
+                    response = await chat.ainvoke(messages)
+                    record_llm(time.perf_counter() - called, response)
+                    record_llm_schedule(waited, attempt, coalesced=False)
+                    return response
+                except Exception as e:
+                    reason = _retry_reason(e)
+                    if reason is None or attempt == self.max_retries:
+                        raise
+                    if reason == "rate_limited":
+                        self._requests.drain()
+                    self.retries += 1
+                    metrics.inc("alfred_llm_retries_total", reason=reason)
+                    # Full jitter spreads out sessions that were throttled at the same moment
+                    backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                    await asyncio.sleep(max(backoff, _retry_after(e)))
+        finally:
+            self._release()
+
+    async def ainvoke(self, chat, messages: List[BaseMessage], session: str = "default"):
+        """Send messages to a chat model through the scheduler and return its response."""
+        key = request_key(chat, messages)
+        task = self._in_flight.get(key)
+        coalesced = task is not None
+        if task is None:
+            task = self._in_flight[key] = asyncio.ensure_future(self._call(chat, messages, session))
+            self._callers[task] = 0
+            task.add_done_callback(lambda _: self._forget(key, task))
+        self._callers[task] += 1
+        try:
+            # Shielded, so one caller giving up doesn't fail the others waiting on the same answer
+            response = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._callers.get(task) == 1 and not task.done():
+                # Nobody else wants it: give back the slot or stop the request
+                task.cancel()
+            raise
+        finally:
+            if task in self._callers:
+                self._callers[task] -= 1
+        if not coalesced:
+            return response
+        self.coalesced += 1
+        record_llm_schedule(0.0, 0, coalesced=True)
+        # Each caller gets its own message object to add to its own state
+        return response.model_copy(update={"id": None})
+
+    def _forget(self, key: str, task: asyncio.Future) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        self._callers.pop(task, None)
+        if not task.cancelled():
+            # Retrieve the error so an answer nobody waited for isn't reported as unhandled
+            task.exception()
+
+    def stats(self) -> dict:
+        """Return the queue depth, requests in flight and the call, retry and coalescing counters."""
+        return {
+            "waiting": self._waiting,
+            "in_flight": self._active,
+            "calls": self.calls,
+            "retries": self.retries,
+            "coalesced": self.coalesced,
+        }
+
+
+def llm_scheduler_from_env() -> LLMScheduler:
+    """Create the scheduler with limits from the environment; the defaults fit Groq's free tier."""
+    return LLMScheduler(
+        max_concurrency=int(os.getenv("ALFRED_LLM_CONCURRENCY", "4")),
+        requests_per_minute=float(os.getenv("ALFRED_LLM_RPM", "30")),
+        tokens_per_minute=float(os.getenv("ALFRED_LLM_TPM", "15000")),
+        max_retries=int(os.getenv("ALFRED_LLM_MAX_RETRIES", "4")),
+    )
@@ -0,0 +1,356 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# Histogram buckets for durations (seconds) and for sizes (bytes or tokens)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144)
+
+METRIC_HELP = {
+    "alfred_turns_total": "Conversation turns completed.",
+    "alfred_turn_seconds": "Wall time of a whole turn.",
+    "alfred_tool_loop_iterations": "Assistant calls per turn (1 plus one per round of tool calls).",
+    "alfred_node_seconds": "Wall time per graph node run.",
+    "alfred_tool_seconds": "Wall time per tool call.",
+    "alfred_tool_result_bytes": "Size of tool results handed back to the model.",
+    "alfred_llm_seconds": "Wall time per chat model call, without queueing or retry backoff.",
+    "alfred_llm_tokens_total": "Tokens sent to and received from the chat model.",
+    "alfred_cache_requests_total": "Cache lookups by cache and result.",
+    "alfred_http_seconds": "Wall time of outgoing HTTP requests.",
+    "alfred_http_errors_total": "Outgoing HTTP requests that failed.",
+    "alfred_streamlit_run_seconds": "Wall time of a Streamlit script run.",
+    "alfred_cold_start_seconds": "Seconds each phase of getting Alfred ready took after the process started.",
+    "alfred_llm_queue_depth": "Chat model requests waiting for a scheduler slot.",
+    "alfred_llm_in_flight": "Chat model requests being sent or retried.",
+    "alfred_llm_queue_wait_seconds": "Time a chat model request waited for a slot and the rate limit.",
+    "alfred_llm_retries_total": "Chat model requests retried after an error, by reason.",
+    "alfred_router_total": "Turns whose first step the intent router decided, by intent (none: left to the model).",
+    "alfred_llm_coalesced_total": "Chat model requests answered by an identical request already in flight.",
+    "alfred_tool_tokens_total": "Estimated tokens of tool results as the tools returned them.",
+    "alfred_tool_tokens_saved_total": "Estimated tokens compaction removed from tool results before they entered the conversation.",
+}
+
+
+class TurnTrace:
+    """Everything recorded while one turn runs: node, tool, model, cache and HTTP events."""
+
+    def __init__(self, thread_id: str):
+        self.thread_id = thread_id
+        self.started = time.time()
+        self.seconds = None
+        self.events = []
+
+    def add(self, kind: str, name: str, **fields) -> None:
+        self.events.append({"kind": kind, "name": name, **fields})
+
+    def summary(self) -> dict:
+        """Aggregate the events per node, tool, cache and HTTP service."""
+        nodes, tools, caches, http = {}, {}, {}, {}
+        tokens = {"prompt": 0, "completion": 0}
+        llm_calls = 0
+        scheduler = {"wait_seconds": 0.0, "retries": 0, "coalesced": 0}
+        routed = None
+        # Tokens compacted out of tool results; each later model call in the turn is spared them
+        compaction = {"raw_tokens": 0, "saved_tokens": 0, "prompt_tokens_saved": 0}
+        for event in self.events:
+            kind, name = event["kind"], event["name"]
+            if kind == "node":
+                entry = nodes.setdefault(name, {"calls": 0, "seconds": 0.0})
+                entry["calls"] += 1
+                entry["seconds"] += event["seconds"]
+            elif kind == "tool":
+                entry = tools.setdefault(name, {"calls": 0, "seconds": 0.0, "result_bytes": 0})
+                entry["calls"] += event["calls"]
+                entry["seconds"] += event["seconds"]
+                entry["result_bytes"] += event["result_bytes"]
+            elif kind == "llm":
+                llm_calls += 1
+                compaction["prompt_tokens_saved"] += compaction["saved_tokens"]
+                tokens["prompt"] += event["prompt_tokens"]
+                tokens["completion"] += event["completion_tokens"]
+            elif kind == "cache":
+                entry = caches.setdefault(name, {"hits": 0, "misses": 0})
+                entry["hits" if event["hit"] else "misses"] += 1
+            elif kind == "http":
+                entry = http.setdefault(name, {"calls": 0, "seconds": 0.0, "errors": 0})
+                entry["calls"] += 1
+                entry["seconds"] += event["seconds"]
+                entry["errors"] += not event["ok"]
+            elif kind == "route":
+                routed = event["intent"]
+            elif kind == "scheduler":
+                scheduler["wait_seconds"] += event["wait_seconds"]
+                scheduler["retries"] += event["retries"]
+                scheduler["coalesced"] += event["coalesced"]
+            elif kind == "compaction":
+                compaction["raw_tokens"] += event["raw_tokens"]
+                compaction["saved_tokens"] += event["saved_tokens"]
+        return {
+            "thread_id": self.thread_id,
+            "started": self.started,
+            "seconds": self.seconds,
+            "loop_iterations": nodes.get("assistant", {}).get("calls", 0),
+            "llm_calls": llm_calls,
+            "routed": routed,
+            "tokens": tokens,
+            "scheduler": scheduler,
+            "compaction": compaction,
+            "nodes": nodes,
+            "tools": tools,
+            "caches": caches,
+            "http": http,
+        }
+
+
+# The turn being traced in the current context. Graph nodes, tools and worker threads
+# started from the turn inherit it, so hooks deep in the call stack can report to it.
+current_trace: ContextVar[Optional[TurnTrace]] = ContextVar("alfred_turn_trace", default=None)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class Metrics:
+    """Process-wide counters and histograms, plus a log of recent turns.
+
+    Every finished turn is appended to a JSON-lines log when log_path is set, and the
+    Prometheus text exposition is rewritten to prometheus_path (for node_exporter's
+    textfile collector) when that is set.
+    """
+
+    def __init__(self, log_path: Optional[str] = None, prometheus_path: Optional[str] = None, recent: int = 20):
+        self.log_path = log_path
+        self.prometheus_path = prometheus_path
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self.recent_turns = deque(maxlen=recent)
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels) -> None:
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram["counts"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def mean(self, name: str) -> Optional[float]:
+        """Mean of everything observed into a histogram, across labels, or None if it is empty."""
+        with self._lock:
+            histograms = [value for (metric, _), value in self._histograms.items() if metric == name]
+        count = sum(histogram["count"] for histogram in histograms)
+        return sum(histogram["sum"] for histogram in histograms) / count if count else None
+
+    def finish_turn(self, trace: TurnTrace) -> dict:
+        """Fold a finished turn into the totals, log it and refresh the Prometheus dump."""
+        summary = trace.summary()
+        self.inc("alfred_turns_total")
+        self.observe("alfred_turn_seconds", trace.seconds)
+        self.observe("alfred_tool_loop_iterations", summary["loop_iterations"], buckets=(1, 2, 3, 4, 6, 8, 12))
+        with self._lock:
+            self.recent_turns.append(summary)
+        if self.log_path:
+            try:
+                with self._lock, open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({**summary, "events": trace.events}) + "\n")
+            except OSError:
+                pass
+        self.write_prometheus()
+        return summary
+
+    def prometheus_text(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: {**value, "counts": list(value["counts"])} for key, value in self._histograms.items()}
+
+        lines = []
+        for name in sorted({name for name, _ in counters} | {name for name, _ in gauges} | {name for name, _ in histograms}):
+            is_histogram = any(key[0] == name for key in histograms)
+            is_gauge = any(key[0] == name for key in gauges)
+            lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} {'histogram' if is_histogram else 'gauge' if is_gauge else 'counter'}")
+            if not is_histogram:
+                for (metric, labels), value in sorted((gauges if is_gauge else counters).items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+                continue
+            for (metric, labels), histogram in sorted(histograms.items(), key=lambda item: item[0]):
+                if metric != name:
+                    continue
+                for bound, count in zip(histogram["buckets"], histogram["counts"]):
+                    lines.append(f"{name}_bucket{_format_labels(labels, (('le', f'{bound:g}'),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {histogram['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']:g}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self) -> None:
+        if not self.prometheus_path:
+            return
+        # Write then rename so a scraper never reads a half-written file
+        scratch = f"{self.prometheus_path}.tmp"
+        try:
+            with open(scratch, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(scratch, self.prometheus_path)
+        except OSError:
+            pass
+
+
+# Shared by every session in the server process
+metrics = Metrics(
+    # Both off unless asked for, so the app doesn't write files wherever it was started
+    log_path=os.getenv("ALFRED_METRICS_LOG") or None,
+    prometheus_path=os.getenv("ALFRED_METRICS_PROM") or None,
+)
+
+
+def _add_to_trace(kind: str, name: str, **fields) -> None:
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(kind, name, **fields)
+
+
+@contextmanager
+def node_timer(node: str):
+    """Time a graph node run."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.observe("alfred_node_seconds", seconds, node=node)
+        _add_to_trace("node", node, seconds=seconds)
+
+
+def record_tool(tool: str, seconds: float, result, calls: int = 1) -> None:
+    """Record a tool run (or a batch of calls answered together) and the size of its result."""
+    result_bytes = len(str(result).encode("utf-8"))
+    metrics.observe("alfred_tool_seconds", seconds, tool=tool)
+    metrics.observe("alfred_tool_result_bytes", result_bytes, buckets=SIZE_BUCKETS, tool=tool)
+    _add_to_trace("tool", tool, seconds=seconds, result_bytes=result_bytes, calls=calls)
+
+
+def record_llm(seconds: float, message) -> None:
+    """Record a chat model call and the token usage it reported."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    prompt_tokens = usage.get("input_tokens", 0)
+    completion_tokens = usage.get("output_tokens", 0)
+    metrics.observe("alfred_llm_seconds", seconds)
+    metrics.inc("alfred_llm_tokens_total", prompt_tokens, kind="prompt")
+    metrics.inc("alfred_llm_tokens_total", completion_tokens, kind="completion")
+    _add_to_trace("llm", "chat", seconds=seconds, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Record a cache lookup."""
+    metrics.inc("alfred_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+    _add_to_trace("cache", cache, hit=hit)
+
+
+def record_http(service: str, seconds: float, ok: bool) -> None:
+    """Record an outgoing HTTP request."""
+    metrics.observe("alfred_http_seconds", seconds, service=service)
+    if not ok:
+        metrics.inc("alfred_http_errors_total", service=service)
+    _add_to_trace("http", service, seconds=seconds, ok=ok)
+
+
+def record_route(intent: Optional[str]) -> None:
+    """Record the intent router's decision for a turn (None: left to the model)."""
+    metrics.inc("alfred_router_total", intent=intent or "none")
+    _add_to_trace("route", "router", intent=intent)
+
+
+def record_llm_schedule(wait_seconds: float, retries: int, coalesced: bool) -> None:
+    """Record how long a chat model request queued, how often it was retried and whether it was coalesced."""
+    metrics.observe("alfred_llm_queue_wait_seconds", wait_seconds)
+    if coalesced:
+        metrics.inc("alfred_llm_coalesced_total")
+    _add_to_trace("scheduler", "llm", wait_seconds=wait_seconds, retries=retries, coalesced=int(coalesced))
+
+
+def record_compaction(tool: str, raw_tokens: int, saved_tokens: int) -> None:
+    """Record a tool result's estimated size and the tokens compaction removed from it."""
+    metrics.inc("alfred_tool_tokens_total", raw_tokens, tool=tool)
+    metrics.inc("alfred_tool_tokens_saved_total", saved_tokens, tool=tool)
+    _add_to_trace("compaction", tool, raw_tokens=raw_tokens, saved_tokens=saved_tokens)
+
+
+def instrument_tool(tool):
+    """Return a copy of a Tool whose sync and async functions record their runs."""
+    name = tool.name
+
+    def func(*args, **kwargs):
+        start = time.perf_counter()
+        result = tool.func(*args, **kwargs)
+        record_tool(name, time.perf_counter() - start, result)
+        return result
+
+    async def coroutine(*args, **kwargs):
+        start = time.perf_counter()
+        result = await tool.coroutine(*args, **kwargs)
+        record_tool(name, time.perf_counter() - start, result)
+        return result
+
+    return tool.model_copy(update={
+        "func": func if tool.func is not None else None,
+        "coroutine": coroutine if tool.coroutine is not None else None,
+    })
+
+
+async def traced_turn(awaitable, thread_id: str):
+    """Await one turn of the graph while tracing it; returns the turn's result."""
+    trace = TurnTrace(thread_id)
+    token = current_trace.set(trace)
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        current_trace.reset(token)
+        trace.seconds = time.perf_counter() - start
+        metrics.finish_turn(trace)
+
+
+async def traced_stream(async_iterable, thread_id: str):
+    """Iterate one streamed turn of the graph while tracing it."""
+    trace = TurnTrace(thread_id)
+    # Not reset afterwards: an abandoned generator may be closed from another context,
+    # and the variable belongs to the task driving this stream anyway
+    current_trace.set(trace)
+    start = time.perf_counter()
+    try:
+        async for item in async_iterable:
+            yield item
+    finally:
+        trace.seconds = time.perf_counter() - start
+        metrics.finish_turn(trace)
@@ -0,0 +1,319 @@
+import re
+import unicodedata
+from functools import cached_property
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+# Words that may precede a relation, as in "my best friend" or "the old rival"
+RELATION_FILLERS = {"my", "the", "a", "an", "our"}
+
+
+def name_tokens(text: str) -> List[str]:
+    """Case-fold a name or query into accent-free word tokens, dropping punctuation and possessives."""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(char for char in text if not unicodedata.combining(char))
+    text = text.casefold()
+    text = re.sub(r"['’]s\b", "", text)
+    return re.findall(r"\w+", text)
+
+
+def record_field(doc: Document, field: str) -> str:
+    """Read a "Field: value" line from a guest record."""
+    prefix = f"{field}:"
+    for line in doc.page_content.splitlines():
+        if line.startswith(prefix):
+            return line[len(prefix):].strip()
+    return ""
+
+
+def _deletes(token: str) -> Set[str]:
+    """The token with at most one character removed."""
+    return {token} | {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by at most one insertion, deletion, substitution or adjacent swap."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:] or (a[i + 2:] == b[i + 2:] and a[i:i + 2] == b[i:i + 2][::-1])
+    longer, shorter = (a, b) if len(a) > len(b) else (b, a)
+    return longer[i + 1:] == shorter[i:]
+
+
+def name_fields(doc: Document) -> Tuple[str, str]:
+    """The name and relation of a guest record."""
+    return doc.metadata.get("name") or record_field(doc, "Name"), record_field(doc, "Relation")
+
+
+class NameMatch(NamedTuple):
+    """A confident name or relation hit: how it matched and the guests it points at."""
+
+    kind: str
+    doc_ids: List[int]
+
+
+# Lookup tables: the name as written, the normalized name, the normalized relation and
+# each name word, each mapping to the guests filed under it
+_KINDS = ("exact", "folded", "relation", "token")
+_PARTS = ("keys", "key_offsets", "indptr", "ids")
+NAME_ARRAYS = [f"names_{kind}_{part}" for kind in _KINDS for part in _PARTS]
+
+_NO_IDS = np.zeros(0, dtype=np.int64)
+
+
+def _encode_table(kind: str, table: Dict[str, List[int]]) -> Dict[str, np.ndarray]:
+    """Lay a key -> guest ids mapping out as sorted UTF-8 keys plus CSR ids."""
+    keys = sorted(table)
+    encoded = [key.encode("utf-8") for key in keys]
+    key_offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum([len(key) for key in encoded], out=key_offsets[1:])
+    indptr = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum([len(table[key]) for key in keys], out=indptr[1:])
+    ids = np.fromiter((doc_id for key in keys for doc_id in sorted(set(table[key]))), dtype=np.int64, count=int(indptr[-1]))
+    return {
+        f"names_{kind}_keys": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        f"names_{kind}_key_offsets": key_offsets,
+        f"names_{kind}_indptr": indptr,
+        f"names_{kind}_ids": ids,
+    }
+
+
+def name_arrays(fields: Iterable[Tuple[int, str, str]]) -> Tuple[Dict[str, np.ndarray], int]:
+    """Build the lookup tables for (doc_id, name, relation) rows, for a snapshot or in memory.
+
+    Returns the arrays and the most words any name has.
+    """
+    tables = {kind: {} for kind in _KINDS}
+    max_name_tokens = 1
+    for doc_id, name, relation in fields:
+        tokens, relation = name_tokens(name), " ".join(name_tokens(relation))
+        if tokens:
+            tables["exact"].setdefault(name.strip(), []).append(doc_id)
+            tables["folded"].setdefault(" ".join(tokens), []).append(doc_id)
+            max_name_tokens = max(max_name_tokens, len(tokens))
+            for token in set(tokens):
+                tables["token"].setdefault(token, []).append(doc_id)
+        if relation:
+            tables["relation"].setdefault(relation, []).append(doc_id)
+    arrays = {}
+    for kind, table in tables.items():
+        arrays.update(_encode_table(kind, table))
+    return arrays, max_name_tokens
+
+
+class _KeyTable:
+    """Sorted keys, each with the sorted ids of the guests filed under it, as flat arrays.
+
+    Keys are compared as UTF-8 bytes, which sorts like the strings do, so lookups are a
+    binary search and keys sharing a prefix are adjacent.
+    """
+
+    def __init__(self, keys: np.ndarray, key_offsets: np.ndarray, indptr: np.ndarray, ids: np.ndarray):
+        self.keys = keys
+        self.key_offsets = key_offsets
+        self.indptr = indptr
+        self.ids = ids
+        self.n_keys = len(key_offsets) - 1
+
+    def _key(self, i: int) -> bytes:
+        return bytes(self.keys[self.key_offsets[i]:self.key_offsets[i + 1]])
+
+    def _lower_bound(self, target: bytes) -> int:
+        lo, hi = 0, self.n_keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _ids(self, i: int) -> np.ndarray:
+        return np.asarray(self.ids[self.indptr[i]:self.indptr[i + 1]], dtype=np.int64)
+
+    def get(self, key: str) -> np.ndarray:
+        """Ids filed under key, ascending (empty if the key is unknown)."""
+        target = key.encode("utf-8")
+        i = self._lower_bound(target)
+        if i < self.n_keys and self._key(i) == target:
+            return self._ids(i)
+        return _NO_IDS
+
+    def with_prefix(self, prefix: str) -> Iterator[np.ndarray]:
+        """Ids of each key starting with prefix, key by key."""
+        target = prefix.encode("utf-8")
+        for i in range(self._lower_bound(target), self.n_keys):
+            if not self._key(i).startswith(target):
+                break
+            yield self._ids(i)
+
+    def iter_keys(self) -> Iterator[str]:
+        for i in range(self.n_keys):
+            yield self._key(i).decode("utf-8")
+
+
+class _NameTables:
+    """One set of lookup tables: the snapshot's (memory-mapped) or those of guests added since."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], max_name_tokens: int, min_fuzzy_length: int):
+        self.tables = {kind: _KeyTable(*(arrays[f"names_{kind}_{part}"] for part in _PARTS)) for kind in _KINDS}
+        self.max_name_tokens = max_name_tokens
+        self.min_fuzzy_length = min_fuzzy_length
+
+    @cached_property
+    def deletes(self) -> Dict[str, List[str]]:
+        """Name words by their one-deletion variants, built on the first fuzzy lookup."""
+        deletes = {}
+        for token in self.tables["token"].iter_keys():
+            if token.isalpha() and len(token) >= self.min_fuzzy_length:
+                for variant in _deletes(token):
+                    deletes.setdefault(variant, []).append(token)
+        return deletes
+
+
+class NameIndex:
+    """Direct lookups of guests by name or relation, tried before a BM25 scan.
+
+    A query matches when it is a guest's name (exactly or up to case, accents and
+    punctuation), contains a full guest name, names a single guest by word prefixes
+    ("ada love") or by words at most one typo away ("Ada Lovelce"), or is a relation
+    shared by at most k guests ("my best friend"). Anything ambiguous returns None so
+    the caller can fall back to BM25.
+
+    The tables are sorted arrays, so a snapshot's can be memory-mapped and shared by
+    every process (see from_arrays). Only the fuzzy lookup's deletion variants are held
+    as Python objects, and they are built on first use. Changes are layered on top:
+    added guests get small tables of their own and removed guests are filtered out.
+    """
+
+    def __init__(self, docs: List[Document], min_fuzzy_length: int = 4, max_prefix_docs: int = 10000):
+        if hasattr(docs, "column"):
+            # A GuestStore: read the two columns instead of formatting every record
+            fields = zip(docs.column("name"), docs.column("relation"))
+        else:
+            fields = (name_fields(doc) for doc in docs)
+        arrays, max_name_tokens = name_arrays((doc_id, name, relation) for doc_id, (name, relation) in enumerate(fields))
+        self._setup([_NameTables(arrays, max_name_tokens, min_fuzzy_length)], min_fuzzy_length, max_prefix_docs)
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], max_name_tokens: int, min_fuzzy_length: int = 4, max_prefix_docs: int = 10000) -> "NameIndex":
+        """An index over tables built by name_arrays, e.g. mapped from a snapshot."""
+        index = cls.__new__(cls)
+        index._setup([_NameTables(arrays, max_name_tokens, min_fuzzy_length)], min_fuzzy_length, max_prefix_docs)
+        return index
+
+    def _setup(self, layers, min_fuzzy_length, max_prefix_docs, added=(), removed=_NO_IDS):
+        self.min_fuzzy_length = min_fuzzy_length
+        self.max_prefix_docs = max_prefix_docs
+        self._layers = layers
+        # Guests added since the base tables, as (doc_id, name, relation), and removed ids
+        self._added = added
+        self._removed = removed
+        self._max_name_tokens = max(layer.max_name_tokens for layer in layers)
+
+    def updated(self, removed, added) -> "NameIndex":
+        """Return a new index with (doc_id, doc) pairs removed and added, leaving this one untouched.
+
+        The base tables are shared; only the added guests' small tables are rebuilt, so
+        readers of this index are never affected and an update costs far less than a rebuild.
+        """
+        rows = self._added + tuple((doc_id, *name_fields(doc)) for doc_id, doc in added)
+        gone = np.union1d(self._removed, np.array([doc_id for doc_id, _ in removed], dtype=np.int64))
+        layers = self._layers[:1]
+        if rows:
+            arrays, max_name_tokens = name_arrays(rows)
+            layers = layers + [_NameTables(arrays, max_name_tokens, self.min_fuzzy_length)]
+        index = NameIndex.__new__(NameIndex)
+        index._setup(layers, self.min_fuzzy_length, self.max_prefix_docs, rows, gone)
+        return index
+
+    def _live(self, ids: np.ndarray) -> np.ndarray:
+        if len(self._removed) and len(ids):
+            return ids[~np.isin(ids, self._removed)]
+        return ids
+
+    def _get(self, kind: str, key: str) -> List[int]:
+        """Current guests filed under key, in id order."""
+        parts = [self._live(layer.tables[kind].get(key)) for layer in self._layers]
+        return np.concatenate(parts).tolist() if len(parts) > 1 else parts[0].tolist()
+
+    def _token_docs(self, token: str) -> np.ndarray:
+        return np.concatenate([self._live(layer.tables["token"].get(token)) for layer in self._layers])
+
+    def _prefix_docs(self, prefix: str) -> Optional[np.ndarray]:
+        """Guests with a name word starting with prefix, or None if there are too many to be useful."""
+        if len(prefix) < 2:
+            return None
+        parts, total = [], 0
+        for layer in self._layers:
+            for ids in layer.tables["token"].with_prefix(prefix):
+                parts.append(ids)
+                total += len(ids)
+                if total > self.max_prefix_docs and len(np.unique(np.concatenate(parts))) > self.max_prefix_docs:
+                    return None
+        return self._live(np.unique(np.concatenate(parts))) if parts else _NO_IDS
+
+    def _fuzzy_docs(self, token: str) -> np.ndarray:
+        """Guests with a name word equal to token or one edit away from it."""
+        parts = [self._token_docs(token)]
+        if token.isalpha() and len(token) >= self.min_fuzzy_length:
+            candidates = set()
+            for layer in self._layers:
+                for variant in _deletes(token):
+                    candidates.update(layer.deletes.get(variant, ()))
+            for candidate in candidates:
+                if within_one_edit(token, candidate):
+                    parts.append(self._token_docs(candidate))
+        return np.unique(np.concatenate(parts))
+
+    @staticmethod
+    def _single_guest(doc_sets) -> Optional[List[int]]:
+        if not doc_sets or any(docs is None for docs in doc_sets):
+            return None
+        docs = doc_sets[0]
+        for other in doc_sets[1:]:
+            docs = np.intersect1d(docs, other)
+        return docs.tolist() if len(docs) == 1 else None
+
+    def lookup(self, query: str, k: int = 3) -> Optional[NameMatch]:
+        """Return the guests a query unambiguously refers to, or None to fall back to BM25."""
+        exact = self._get("exact", query.strip())
+        if exact:
+            return NameMatch("exact", exact[:k])
+        tokens = name_tokens(query)
+        if not tokens:
+            return None
+        folded = self._get("folded", " ".join(tokens))
+        if folded:
+            return NameMatch("casefold", folded[:k])
+
+        relation = tokens[1:] if tokens[0] in RELATION_FILLERS and len(tokens) > 1 else tokens
+        guests = self._get("relation", " ".join(relation))
+        if guests:
+            return NameMatch("relation", guests) if len(guests) <= k else None
+
+        # A full guest name inside a longer question, e.g. "Tell me about Ada Lovelace"
+        for size in range(min(len(tokens), self._max_name_tokens), 1, -1):
+            found = {doc_id for start in range(len(tokens) - size + 1) for doc_id in self._get("folded", " ".join(tokens[start:start + size]))}
+            if found:
+                return NameMatch("contained", sorted(found)[:k]) if len(found) == 1 else None
+
+        # Short queries only: a partial or misspelt name, never a whole question
+        if len(tokens) > self._max_name_tokens:
+            return None
+        guest = self._single_guest([self._prefix_docs(token) for token in tokens])
+        if guest is not None:
+            return NameMatch("prefix", guest)
+        guest = self._single_guest([self._fuzzy_docs(token) for token in tokens])
+        if guest is not None:
+            return NameMatch("fuzzy", guest)
+        return None
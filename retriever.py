@@ -1,19 +1,185 @@
-from langchain_community.retrievers import BM25Retriever
+import asyncio
 from langchain.tools import Tool
-from tools import docs
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.prebuilt import ToolNode
+import os
+import threading
+import time
+from cache import TTLCache
+from guest_index import GuestIndexRetriever
+from metrics import record_cache, record_tool
+from name_index import NameIndex, name_tokens
+from tools import guest_index, on_guest_index_change
 
-bm25_retriever = BM25Retriever.from_documents(docs)
+bm25_retriever = GuestIndexRetriever(index=guest_index, k=3)
 
-def extract_text(query: str) -> str:
-    """Retrieves detailed information about gala guests based on their name or relation."""
-    results = bm25_retriever.invoke(query)
+# Shared by every session in the server process; keys carry the snapshot fingerprint so a
+# rebuilt guest list can never serve stale answers
+guest_cache = TTLCache(
+    max_entries=int(os.getenv("GUEST_CACHE_MAX_ENTRIES", "2048")),
+    max_bytes=int(os.getenv("GUEST_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl=float(os.getenv("GUEST_CACHE_TTL", "900")),
+)
+
+# Held while the index is swapped and while lookups are cached, so a result computed
+# with an older index is never stored after that index was replaced
+_index_lock = threading.Lock()
+
+def _affected_by(changed):
+    """Predicate for the cached lookups whose answer may depend on the changed guest records.
+
+    That is any lookup whose result shows one of the records, whose query shares a
+    term or name word with them, or that the name index would resolve to one of them.
+    Other lookups keep their entries; the small shift in corpus statistics an edit
+    causes can only reorder them until their TTL runs out.
+    """
+    names = NameIndex(changed)
+    terms = {term for doc in changed for term in bm25_retriever.preprocess_func(doc.page_content)}
+    words = {word for doc in changed for word in name_tokens(doc.page_content)}
+    records = [doc.page_content for doc in changed]
+
+    def affected(key, text):
+        query, k, _ = key
+        return (
+            any(record in text for record in records)
+            or not terms.isdisjoint(query.split())
+            or not words.isdisjoint(name_tokens(query))
+            or names.lookup(query, k=k) is not None
+        )
+
+    return affected
+
+def _use_guest_index(index, changed):
+    """Point the retriever at a new guest index and drop the cached lookups it may change."""
+    with _index_lock:
+        bm25_retriever.index = index
+        if changed is None:
+            guest_cache.clear()
+        else:
+            guest_cache.invalidate(_affected_by(changed))
+
+on_guest_index_change(_use_guest_index)
+
+def _store(index, key, text):
+    """Cache a lookup unless the index it was computed with has been replaced meanwhile."""
+    with _index_lock:
+        if bm25_retriever.index is index:
+            guest_cache.set(key, text)
+
+def _cache_key(query: str, k: int = 3):
+    """Cache key for a query: its BM25 tokens, the result size and the index version.
+
+    Tokens are whitespace-normalized exactly as the retriever splits them, so
+    "Ada  Lovelace " and "Ada Lovelace" share an entry while case still matters,
+    matching how BM25 scores them.
+    """
+    return (" ".join(bm25_retriever.preprocess_func(query)), k, bm25_retriever.index.fingerprint)
+
+def format_results(results, k: int = 3) -> str:
+    """Join the first k retrieved guest records into the text handed back to the model."""
     if results:
-        return "\n\n".join([doc.page_content for doc in results[:3]])
+        return "\n\n".join([doc.page_content for doc in results[:k]])
     else:
         return "No matching guest information found."
 
+def extract_text(query: str) -> str:
+    """Retrieves detailed information about gala guests based on their name or relation."""
+    index, key = bm25_retriever.index, _cache_key(query)
+    text = guest_cache.get(key)
+    record_cache("guest", text is not None)
+    if text is None:
+        text = format_results(bm25_retriever.invoke(query))
+        _store(index, key, text)
+    return text
+
+async def aextract_text(query: str) -> str:
+    """Async variant of extract_text that scores on a worker thread so the event loop stays free."""
+    index, key = bm25_retriever.index, _cache_key(query)
+    text = guest_cache.get(key)
+    record_cache("guest", text is not None)
+    if text is None:
+        text = await asyncio.to_thread(lambda: format_results(bm25_retriever.invoke(query)))
+        _store(index, key, text)
+    return text
+
+def extract_text_batch(queries: list[str], k: int = 3) -> list[str]:
+    """Retrieves guest information for several queries with a single scoring pass."""
+    index, keys = bm25_retriever.index, [_cache_key(query, k) for query in queries]
+    texts = [guest_cache.get(key) for key in keys]
+    for text in texts:
+        record_cache("guest", text is not None)
+    misses = [i for i, text in enumerate(texts) if text is None]
+    if misses:
+        retriever = bm25_retriever if k == bm25_retriever.k else bm25_retriever.model_copy(update={"k": k})
+        results = retriever.batch_relevant_documents([queries[i] for i in misses])
+        for i, docs in zip(misses, results):
+            texts[i] = format_results(docs, k)
+            _store(index, keys[i], texts[i])
+    return texts
+
 guest_info_tool = Tool(
     name="guest_info_retriever",
     func=extract_text,
+    coroutine=aextract_text,
     description="Retrieves detailed information about gala guests based on their name or relation."
-)
\ No newline at end of file
+)
+
+def _tool_input(tool_call) -> str:
+    """Pull the single string argument out of a Tool call's args."""
+    args = tool_call["args"]
+    if isinstance(args, dict):
+        return str(next(iter(args.values()), ""))
+    return str(args)
+
+def batched_tool_node(tools):
+    """Build a tools node that answers all pending guest lookups with one batched retrieval.
+
+    Every guest_info_retriever call in the latest AI message is scored in a single pass
+    and the results are fanned back out to their tool call ids. Any other tool calls
+    still go through a regular ToolNode, concurrently with the batch when run async.
+    """
+    tool_node = ToolNode(tools)
+
+    def split_calls(state):
+        tool_calls = state["messages"][-1].tool_calls
+        guest_calls = [call for call in tool_calls if call["name"] == guest_info_tool.name]
+        other_calls = [call for call in tool_calls if call["name"] != guest_info_tool.name]
+        return tool_calls, guest_calls, other_calls
+
+    def merge(tool_calls, guest_calls, texts, other_messages):
+        outputs = {
+            call["id"]: ToolMessage(content=text, name=call["name"], tool_call_id=call["id"])
+            for call, text in zip(guest_calls, texts)
+        }
+        for message in other_messages:
+            outputs[message.tool_call_id] = message
+        return {"messages": [outputs[call["id"]] for call in tool_calls]}
+
+    def timed_batch(queries):
+        start = time.perf_counter()
+        texts = extract_text_batch(queries)
+        record_tool(guest_info_tool.name, time.perf_counter() - start, "".join(texts), calls=len(queries))
+        return texts
+
+    def run_tools(state, config: RunnableConfig):
+        tool_calls, guest_calls, other_calls = split_calls(state)
+        if len(guest_calls) < 2:
+            return tool_node.invoke(state, config)
+        texts = timed_batch([_tool_input(call) for call in guest_calls])
+        other_messages = tool_node.invoke(other_calls, config)["messages"] if other_calls else []
+        return merge(tool_calls, guest_calls, texts, other_messages)
+
+    async def arun_tools(state, config: RunnableConfig):
+        tool_calls, guest_calls, other_calls = split_calls(state)
+        if len(guest_calls) < 2:
+            return await tool_node.ainvoke(state, config)
+        batch = asyncio.to_thread(timed_batch, [_tool_input(call) for call in guest_calls])
+        if other_calls:
+            texts, others = await asyncio.gather(batch, tool_node.ainvoke(other_calls, config))
+            other_messages = others["messages"]
+        else:
+            texts, other_messages = await batch, []
+        return merge(tool_calls, guest_calls, texts, other_messages)
+
+    return RunnableLambda(run_tools, afunc=arun_tools, name="tools")
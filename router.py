@@ -0,0 +1,134 @@
+import os
+import re
+import uuid
+from typing import Callable, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from metrics import record_route
+from name_index import NameIndex
+from weather import normalize_location
+
+# Cities the weather route accepts; anything else goes to the model, which can ask back
+GAZETTEER = frozenset([
+    "amsterdam", "athens", "atlanta", "auckland", "austin", "bangkok", "barcelona", "beijing",
+    "berlin", "bogota", "boston", "brussels", "budapest", "buenos aires", "cairo", "calgary",
+    "cape town", "chicago", "copenhagen", "dallas", "delhi", "denver", "dubai", "dublin",
+    "edinburgh", "florence", "frankfurt", "geneva", "glasgow", "hamburg", "helsinki", "hong kong",
+    "honolulu", "houston", "istanbul", "jakarta", "johannesburg", "kyiv", "lagos", "las vegas",
+    "lima", "lisbon", "london", "los angeles", "lyon", "madrid", "manchester", "manila",
+    "marseille", "melbourne", "mexico city", "miami", "milan", "montreal", "moscow", "mumbai",
+    "munich", "nairobi", "naples", "new delhi", "new orleans", "new york", "oslo", "ottawa",
+    "paris", "perth", "philadelphia", "phoenix", "prague", "reykjavik", "rio de janeiro", "rome",
+    "san diego", "san francisco", "santiago", "sao paulo", "seattle", "seoul", "shanghai",
+    "singapore", "stockholm", "sydney", "taipei", "tel aviv", "tokyo", "toronto", "vancouver",
+    "venice", "vienna", "warsaw", "washington", "zurich",
+])
+
+_WEATHER = [
+    re.compile(r"(?:(?:what|how)(?:'s| is) )?(?:the )?(?:current )?(?:weather|forecast)(?: like)? (?:in|for|at) (?P<city>.+)"),
+    re.compile(r"(?:check|get|show me) (?:the )?(?:weather|forecast) (?:in|for|at) (?P<city>.+)"),
+    re.compile(r"(?:is it|will it) (?:rain|raining|snow|snowing|be sunny|be windy|be cold|be warm) in (?P<city>.+)"),
+    re.compile(r"(?P<city>.+?) weather"),
+]
+
+_GUEST = re.compile(
+    r"(?:tell me about|who is|who's|what do you know about|do you know|describe|information (?:about|on)|info on) (?P<name>.+)",
+    re.IGNORECASE,
+)
+
+# Ways a name match counts as certain: the name itself, or a whole name inside the phrase
+_CERTAIN = {"exact", "casefold", "contained"}
+
+
+def _strip(text: str) -> str:
+    """Drop the greeting, politeness and punctuation around a request."""
+    text = " ".join(text.split()).strip(" ?!.")
+    text = re.sub(r"^(?:(?:hey|hi|ok|okay) )?alfred,? ", "", text, flags=re.IGNORECASE)
+    text = re.sub(r",? please$|^please,? ", "", text, flags=re.IGNORECASE)
+    return text.strip(" ?!.,")
+
+
+class IntentRouter:
+    """Answers the obvious first step of a turn without asking the model.
+
+    "Weather in <city>" (for a city in the gazetteer) and "tell me about <guest>" (or
+    just the guest's name, when the name index matches exactly one guest) become the
+    tool call the model would have made, so those turns need one model call instead of
+    two. Anything else, including everything ambiguous, is left to the model.
+    """
+
+    def __init__(self, names: Callable[[], NameIndex], guest_name: Callable[[int], str], cities=None):
+        self.names = names
+        self.guest_name = guest_name
+        self.cities = frozenset(cities) if cities is not None else GAZETTEER
+        self.routed = {"weather": 0, "guest": 0}
+        self.passed = 0
+
+    def _weather(self, text: str) -> Optional[str]:
+        lowered = text.casefold()
+        for pattern in _WEATHER:
+            match = pattern.fullmatch(lowered)
+            if match is None:
+                continue
+            city = re.sub(r" (?:today|tonight|now|right now|this evening)$", "", match.group("city"))
+            if normalize_location(city) in self.cities:
+                if len(lowered) != len(text):
+                    return city
+                # Keep the guest's own spelling of the city
+                start = match.start("city")
+                return text[start:start + len(city)]
+        return None
+
+    def _guest(self, text: str) -> Optional[str]:
+        match = _GUEST.fullmatch(text)
+        phrase, kinds = (match.group("name"), _CERTAIN) if match else (text, {"exact", "casefold"})
+        # k=2 so a name two guests share shows up as ambiguous
+        found = self.names().lookup(phrase, k=2)
+        if found is None or found.kind not in kinds or len(found.doc_ids) != 1:
+            return None
+        return self.guest_name(found.doc_ids[0])
+
+    def route(self, messages: List[BaseMessage]) -> Optional[AIMessage]:
+        """The tool call for the latest guest message, or None to let the model decide."""
+        last = messages[-1] if messages else None
+        if not isinstance(last, HumanMessage) or not isinstance(last.content, str):
+            return None
+        text = _strip(last.content)
+        city = self._weather(text)
+        if city:
+            return self._tool_call("weather", "get_weather_info", city)
+        name = self._guest(text)
+        if name:
+            return self._tool_call("guest", "guest_info_retriever", name)
+        self.passed += 1
+        record_route(None)
+        return None
+
+    def _tool_call(self, intent: str, tool: str, argument: str) -> AIMessage:
+        self.routed[intent] += 1
+        record_route(intent)
+        return AIMessage(content="", tool_calls=[
+            {"name": tool, "args": {"__arg1": argument}, "id": f"route_{uuid.uuid4().hex[:12]}"}
+        ])
+
+    def stats(self) -> dict:
+        """Return how many turns were routed per intent and how many were left to the model."""
+        return {"routed": dict(self.routed), "passed": self.passed}
+
+
+def guest_router() -> IntentRouter:
+    """A router that follows the live guest list."""
+    from retriever import bm25_retriever
+
+    return IntentRouter(
+        names=lambda: bm25_retriever.index.names,
+        guest_name=lambda doc_id: bm25_retriever.index.docs[doc_id].metadata["name"],
+    )
+
+
+def router_from_env() -> Optional[IntentRouter]:
+    """The guest router, unless ALFRED_ROUTER=0 turns it off."""
+    if os.getenv("ALFRED_ROUTER", "1") == "0":
+        return None
+    return guest_router()
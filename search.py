@@ -0,0 +1,208 @@
+import asyncio
+import os
+import time
+import weakref
+from typing import List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+from langchain.tools import Tool
+
+from cache import TTLCache
+from metrics import record_cache, record_http
+from weather import CircuitBreaker
+
+
+class SearchResult(NamedTuple):
+    title: str
+    body: str
+    url: str
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace and case so repeated questions share a cache entry."""
+    return " ".join(query.split()).casefold()
+
+
+def normalize_url(url: str) -> str:
+    """Reduce a URL to what identifies the page, so backends returning the same page dedupe."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.casefold().removeprefix("www.")
+    return urlunsplit(("", host, parts.path.rstrip("/") or "/", parts.query, ""))
+
+
+class DDGSBackend:
+    """A metasearch engine reached through the ddgs package (e.g. "duckduckgo", "bing", "brave").
+
+    ddgs is blocking, so searches run on worker threads; one DDGS client is shared by all
+    of them. A search still running when the deadline passes finishes in the background
+    and is ignored.
+    """
+
+    def __init__(self, engine: str = "auto", timeout: float = 5.0):
+        from ddgs import DDGS
+
+        self.name = f"ddgs:{engine}"
+        self.engine = engine
+        self.client = DDGS(timeout=timeout)
+
+    def _search(self, query: str, max_results: int) -> List[SearchResult]:
+        results = self.client.text(query, max_results=max_results, backend=self.engine) or []
+        return [SearchResult(result["title"], result["body"], result["href"]) for result in results]
+
+    async def search(self, query: str, max_results: int) -> List[SearchResult]:
+        return await asyncio.to_thread(self._search, query, max_results)
+
+
+class SearxBackend:
+    """A SearXNG instance (or anything serving its JSON format), over a shared keep-alive client."""
+
+    def __init__(self, base_url: str, timeout: float = 5.0):
+        self.name = f"searx:{urlsplit(base_url).netloc}"
+        self.url = base_url.rstrip("/") + "/search"
+        self.timeout = timeout
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = httpx.AsyncClient(limits=httpx.Limits(max_connections=16, max_keepalive_connections=16))
+        return client
+
+    async def search(self, query: str, max_results: int) -> List[SearchResult]:
+        response = await self._client().get(self.url, params={"q": query, "format": "json"}, timeout=self.timeout)
+        response.raise_for_status()
+        return [
+            SearchResult(result.get("title", ""), result.get("content", ""), result["url"])
+            for result in response.json().get("results", [])[:max_results]
+        ]
+
+
+class WebSearch:
+    """Web search fanned out to several backends at once, with a cache and a hard deadline.
+
+    Every backend is queried concurrently. Whatever has arrived when deadline seconds
+    are up is merged, taking each backend's results in rank order in turn and dropping
+    pages already seen, and slower backends are abandoned; answers missing a backend,
+    slow or failed, are flagged as partial and not cached. Complete answers are cached
+    per normalized query for cache_ttl seconds. A backend that keeps failing or timing
+    out is skipped for a while by its circuit breaker.
+    """
+
+    def __init__(self, backends: list, max_results: int = 3, deadline: float = 4.0, cache_ttl: float = 900.0):
+        self.backends = backends
+        self.max_results = max_results
+        self.deadline = deadline
+        self.cache = TTLCache(max_entries=512, max_bytes=2 * 1024 * 1024, ttl=cache_ttl)
+        self.breakers = {backend.name: CircuitBreaker() for backend in backends}
+
+    async def _query_backend(self, backend, query: str) -> Optional[List[SearchResult]]:
+        start = time.perf_counter()
+        try:
+            results = await backend.search(query, self.max_results)
+        except asyncio.CancelledError:
+            # Abandoned, not failed: asearch counts missed deadlines itself
+            self.breakers[backend.name].release_probe()
+            raise
+        except Exception:
+            record_http(backend.name, time.perf_counter() - start, ok=False)
+            self.breakers[backend.name].record_failure()
+            return None
+        record_http(backend.name, time.perf_counter() - start, ok=True)
+        self.breakers[backend.name].record_success()
+        return results
+
+    async def asearch(self, query: str) -> Tuple[List[SearchResult], bool]:
+        """Search every available backend within the deadline; returns (results, complete)."""
+        backends = [backend for backend in self.backends if self.breakers[backend.name].allow()]
+        tasks = [asyncio.ensure_future(self._query_backend(backend, query)) for backend in backends]
+        if not tasks:
+            return [], False
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+        except asyncio.CancelledError:
+            # The caller gave up, which says nothing about the backends
+            for task in tasks:
+                task.cancel()
+            raise
+        for backend, task in zip(backends, tasks):
+            if task in pending:
+                task.cancel()
+                record_http(backend.name, self.deadline, ok=False)
+                self.breakers[backend.name].record_failure()
+
+        # Interleave the backends' rankings, keeping the first copy of each page
+        answers = [task.result() for task in tasks if task in done]
+        ranked = [results for results in answers if results is not None]
+        merged, seen = [], set()
+        for rank in range(max((len(results) for results in ranked), default=0)):
+            for results in ranked:
+                if rank < len(results) and normalize_url(results[rank].url) not in seen:
+                    seen.add(normalize_url(results[rank].url))
+                    merged.append(results[rank])
+        # Only an answer every backend gave in time is complete (and worth caching)
+        complete = len(ranked) == len(self.backends)
+        return merged[:self.max_results], complete
+
+    async def atext(self, query: str) -> str:
+        """Search and format the results for the model, serving repeated queries from the cache."""
+        key = normalize_query(query)
+        text = self.cache.get(key)
+        record_cache("search", text is not None)
+        if text is not None:
+            return text
+        results, complete = await self.asearch(query)
+        text = format_results(results, complete)
+        if complete:
+            self.cache.set(key, text)
+        return text
+
+    def text(self, query: str) -> str:
+        """Blocking variant of atext for synchronous callers.
+
+        Runs on Alfred's one background event loop rather than a new loop per call, so
+        the backends' per-loop HTTP clients are reused instead of leaked.
+        """
+        from agent import run_sync
+
+        return run_sync(self.atext(query))
+
+
+def format_results(results: List[SearchResult], complete: bool = True) -> str:
+    if not results:
+        if complete:
+            return "No search results found for your query."
+        return "Web search is not answering right now. Please try again shortly."
+    formatted = [f"{i}. {result.title}\n   {result.body}\n   Source: {result.url}" for i, result in enumerate(results, 1)]
+    if not complete:
+        formatted.append("(Some search sources did not answer, so these results may be incomplete.)")
+    return "\n\n".join(formatted)
+
+
+def search_from_env() -> Optional[WebSearch]:
+    """Create the web search from the environment, or None if no backend is available.
+
+    ALFRED_SEARCH_ENGINES lists ddgs engines (default "duckduckgo", used only if ddgs is
+    installed) and ALFRED_SEARXNG_URLS lists SearXNG instances, both comma-separated.
+    """
+    timeout = float(os.getenv("ALFRED_SEARCH_DEADLINE", "4"))
+    backends = []
+    try:
+        backends += [DDGSBackend(engine.strip(), timeout=timeout) for engine in os.getenv("ALFRED_SEARCH_ENGINES", "duckduckgo").split(",") if engine.strip()]
+    except ImportError:
+        pass
+    backends += [SearxBackend(url.strip(), timeout=timeout) for url in os.getenv("ALFRED_SEARXNG_URLS", "").split(",") if url.strip()]
+    if not backends:
+        return None
+    return WebSearch(backends, deadline=timeout, cache_ttl=float(os.getenv("ALFRED_SEARCH_CACHE_TTL", "900")))
+
+
+def web_search_tool_for(search: WebSearch) -> Tool:
+    """The web_search tool, answering through a shared WebSearch."""
+    return Tool(
+        name="web_search",
+        func=search.text,
+        coroutine=search.atext,
+        description="Search the web for current information about people, events, or topics. Use this when you need up-to-date information that might not be in the guest database."
+    )
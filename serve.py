@@ -0,0 +1,28 @@
+"""Run the Streamlit frontend with Alfred warming up from the moment the server boots.
+
+    python serve.py [streamlit run options, e.g. --server.port 8501]
+
+Alfred is built in a background thread while Streamlit starts, so the first visitor
+doesn't pay for loading the guest index, the imports and compiling the graph. The
+readiness probe (GET /ready on ALFRED_READY_PORT, default 8502) answers 503 until
+Alfred is built and 200 after, so a load balancer only sends traffic to warm replicas.
+"""
+import os
+import sys
+
+import warmup
+
+
+def main():
+    # Start before importing Streamlit, so the two overlap
+    warmup.start(probe_port=int(os.getenv("ALFRED_READY_PORT", "8502")))
+
+    from streamlit.web import cli
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alfred_frontend.py")
+    sys.argv = ["streamlit", "run", script] + sys.argv[1:]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
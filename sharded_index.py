@@ -0,0 +1,111 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from guest_index import GuestIndex, RangeStats, open_snapshot, top_k
+
+# Snapshots mapped in this worker process, by path
+_worker_indexes = {}
+
+# One pool per worker count, shared by every index in the parent process
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _search_shard(path: str, lo: int, hi: int, queries_tokens: List[List[str]], k: int, stats: Optional[RangeStats] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Worker task: the k best guests in lo..hi-1 for each query, as (global ids, scores).
+
+    stats carries the statistics of a changed guest list (see GuestIndex.range_stats).
+    """
+    index = _worker_indexes.get(path)
+    if index is None:
+        # Only the arrays are mapped, and the OS shares their pages between processes
+        index = _worker_indexes[path] = open_snapshot(path, with_docs=False)
+    results = []
+    for tokens in queries_tokens:
+        scores = index.get_scores_range(tokens, lo, hi, stats)
+        best = top_k(scores, k)
+        results.append((best + lo, scores[best]))
+    return results
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            # Spawned rather than forked: the parent runs threads (Streamlit, the event loop)
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return pool
+
+
+def _shard_stats(stats: Optional[RangeStats], lo: int, hi: int) -> Optional[RangeStats]:
+    """Only the part of stats a shard needs, so less is pickled per task."""
+    if stats is None:
+        return None
+    return stats._replace(removed=stats.removed[(stats.removed >= lo) & (stats.removed < hi)])
+
+
+def merge_top_k(shard_results: List[Tuple[np.ndarray, np.ndarray]], k: int) -> np.ndarray:
+    """Merge per-shard top k lists into the overall top k, breaking ties like top_k does."""
+    ids = np.concatenate([result[0] for result in shard_results])
+    scores = np.concatenate([result[1] for result in shard_results])
+    order = np.lexsort((-ids, -scores))[:k]
+    return ids[order]
+
+
+class ShardedGuestIndex:
+    """Drop-in for a GuestIndex that scores the guest list in shards across worker processes.
+
+    Each shard is a contiguous range of guests. Workers memory-map the same snapshot
+    files, so index data is shared through the page cache instead of being pickled,
+    and a query only ships its tokens out and k (id, score) pairs per shard back.
+    Scores are bit-for-bit those of the single-process index. Everything else,
+    including name lookups and documents, is served by the wrapped index in this
+    process. Once guests have changed (see GuestIndex.with_changes) the workers still
+    score the snapshot's guests, given the changed statistics of the query terms, and
+    the guests added since are scored here.
+    """
+
+    def __init__(self, index: GuestIndex, workers: int, shards: int = 0):
+        self.index = index
+        self.workers = workers
+        bounds = np.linspace(0, index.n_docs, (shards or workers) + 1).astype(int)
+        self.shards = [(int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+    def __getattr__(self, name):
+        return getattr(self.index, name)
+
+    def get_top_n(self, query_tokens: List[str], n: int = 4) -> List[Document]:
+        """Return the n best-scoring guest documents for the query."""
+        return self.get_top_n_batch([query_tokens], n)[0]
+
+    def get_top_n_batch(self, queries_tokens: List[List[str]], n: int = 4) -> List[List[Document]]:
+        """Fan the queries out to every shard at once and merge each query's top n."""
+        index = self.index
+        stats = index.range_stats(queries_tokens)
+        pool = _pool(self.workers)
+        futures = [pool.submit(_search_shard, index.path, lo, hi, queries_tokens, n, _shard_stats(stats, lo, hi)) for lo, hi in self.shards]
+        per_shard = [future.result() for future in futures]
+        if len(index.docs) > index.n_docs:
+            added = []
+            for tokens in queries_tokens:
+                scores = index.get_scores_added(tokens)
+                best = top_k(scores, n)
+                added.append((best + index.n_docs, scores[best]))
+            per_shard.append(added)
+        return [
+            [index.docs[i] for i in merge_top_k([results[q] for results in per_shard], n) if index.is_live(i)]
+            for q in range(len(queries_tokens))
+        ]
+
+    def with_changes(self, add: List[Document] = (), remove: List[int] = ()) -> "ShardedGuestIndex":
+        """Return a new version with guests added and removed, still scored across the workers."""
+        sharded = ShardedGuestIndex(self.index.with_changes(add=add, remove=remove), self.workers)
+        # The snapshot part is unchanged, and so are its shards
+        sharded.shards = self.shards
+        return sharded
+
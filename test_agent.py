@@ -0,0 +1,50 @@
+import asyncio
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from agent import build_alfred, make_checkpointer, thread_config
+from benchmark import SYSTEM_MESSAGE, ScriptedChatModel, stub_tools
+from conversation import ConversationWindow, summarize_with
+
+SUMMARY = "Earlier, the guest asked about the fireworks."
+
+
+class SummaryModel(BaseChatModel):
+    """Chat model that answers every prompt with the same summary."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "summary"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=SUMMARY))])
+
+
+def streamed_text(alfred, thread_id, text, first=False):
+    """The assistant tokens a chat UI would show for one turn, as alfred_frontend filters them."""
+    async def run():
+        config = thread_config(thread_id)
+        messages = [SYSTEM_MESSAGE, HumanMessage(content=text)] if first else [HumanMessage(content=text)]
+        shown = []
+        async for chunk, metadata in alfred.astream({"messages": messages}, config, stream_mode="messages"):
+            if metadata.get("langgraph_node") == "assistant" and isinstance(chunk, (AIMessage, AIMessageChunk)) and chunk.content:
+                shown.append(chunk.content)
+        state = await alfred.aget_state(config)
+        return "".join(shown), state.values
+
+    return asyncio.run(run())
+
+
+def test_rolling_summary_is_not_streamed_as_the_answer():
+    tools = stub_tools()
+    chat = ScriptedChatModel()
+    # A budget this small folds the earlier turns on every later one
+    window = ConversationWindow(summarize_with(SummaryModel()), token_budget=400, keep_turns=1)
+    alfred = build_alfred(chat.bind_tools(tools), tools, checkpointer=make_checkpointer("memory"), context_window=window)
+
+    for i in range(3):
+        text, state = streamed_text(alfred, "fold", f"Question {i} " + "about the fireworks " * 30, first=i == 0)
+        assert text == "At your service."
+    assert state["context_summary"] == SUMMARY
@@ -0,0 +1,77 @@
+from cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    # Reading a makes b the least recently used
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_replacing_a_key_does_not_evict():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.set("a", "one")
+    assert (cache.get("a"), cache.get("b"), len(cache)) == ("one", "2", 2)
+
+
+def test_entries_expire_after_their_ttl():
+    clock = Clock()
+    cache = TTLCache(ttl=60, clock=clock)
+    cache.set("default", "x")
+    cache.set("short", "y", ttl=10)
+    clock.now = 10
+    assert cache.get("short") is None
+    assert cache.get("default") == "x"
+    clock.now = 60
+    assert cache.get("default", "gone") == "gone"
+    stats = cache.stats()
+    assert (stats["expirations"], stats["entries"], stats["bytes"]) == (2, 0, 0)
+
+
+def test_byte_cap_evicts_until_the_values_fit():
+    cache = TTLCache(max_bytes=10)
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    assert cache.stats()["bytes"] == 8
+    cache.set("c", "cccc")
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 8
+    # Sizes are UTF-8 bytes, not characters
+    cache.set("d", "é" * 5)
+    assert (len(cache), cache.stats()["bytes"]) == (1, 10)
+
+
+def test_value_larger_than_the_cap_is_not_stored():
+    cache = TTLCache(max_bytes=10)
+    cache.set("small", "ok")
+    cache.set("big", "x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("small") == "ok"
+
+
+def test_hits_misses_and_invalidation():
+    cache = TTLCache()
+    cache.set(("ada", 3), "Ada Lovelace")
+    cache.set(("grace", 3), "Grace Hopper")
+    cache.get(("ada", 3))
+    cache.get(("alan", 3))
+    assert cache.invalidate(lambda key, value: "Ada" in value) == 1
+    assert cache.get(("ada", 3)) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 2, 1 / 3)
+    assert stats["bytes"] == len("Grace Hopper")
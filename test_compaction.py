@@ -0,0 +1,52 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from compaction import ToolOutputCompactor
+from conversation import ConversationWindow
+from guest_store import format_guest
+
+ADA = format_guest("Ada Lovelace", "best friend", "Mathematician and writer. " * 40, "ada.lovelace@example.com")
+GRACE = format_guest("Grace Hopper", "old colleague", "Rear admiral and compiler pioneer.", "grace.hopper@example.com")
+
+
+def guest_lookup(question, result, call_id):
+    return [
+        HumanMessage(content=question),
+        AIMessage(content="", tool_calls=[{"name": "guest_info_retriever", "args": {"__arg1": question}, "id": call_id}]),
+        ToolMessage(content=result, name="guest_info_retriever", tool_call_id=call_id),
+    ]
+
+
+def compacted(messages, since=0):
+    replaced, _ = ToolOutputCompactor(budgets={"guest_info_retriever": 2000}).compact(messages, since=since)
+    return replaced[0].content if replaced else messages[-1].content
+
+
+def test_email_is_dropped_unless_the_guest_asks_for_it():
+    system = [SystemMessage(content="You are Alfred.")]
+    assert "Email:" not in compacted(system + guest_lookup("Tell me about Grace Hopper", GRACE, "c1"))
+    assert compacted(system + guest_lookup("How can I contact Grace Hopper?", GRACE, "c1")) == GRACE
+
+
+def test_repeated_record_becomes_a_reference():
+    messages = [SystemMessage(content="You are Alfred.")]
+    messages += guest_lookup("Tell me about Ada Lovelace", ADA, "c1") + [AIMessage(content="She is your best friend.")]
+    messages += guest_lookup("Remind me who Ada Lovelace is", f"{ADA}\n\n{GRACE}", "c2")
+    text = compacted(messages)
+    assert "Name: Ada Lovelace (details given earlier in this conversation)" in text
+    assert "Mathematician" not in text
+    # Records the conversation doesn't hold yet stay in full
+    assert "Name: Grace Hopper\nRelation: old colleague" in text
+
+
+def test_record_about_to_be_folded_into_the_summary_is_kept_in_full():
+    messages = [SystemMessage(content="You are Alfred.")]
+    messages += guest_lookup("Tell me about Ada Lovelace", ADA, "c1") + [AIMessage(content="She is your best friend.")]
+    messages += guest_lookup("Remind me who Ada Lovelace is", ADA, "c2")
+    # Small enough that the next prompt folds the first turn, and its copy of the record, into the summary
+    window = ConversationWindow(None, token_budget=700, keep_turns=1)
+    boundary = window.fold_boundary(messages, {})
+    assert boundary == 5
+
+    text = compacted(messages, since=boundary)
+    assert "Mathematician" in text
+    assert "details given earlier" not in text
@@ -0,0 +1,43 @@
+import asyncio
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from conversation import ConversationWindow, summarize_with
+from llm_scheduler import LLMScheduler
+
+
+class SummaryChat(BaseChatModel):
+    """Chat model stand-in that answers every prompt with the same summary."""
+
+    prompts: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "summary"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompts.append(messages[-1].content)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=" The guest asked about Ada. "))])
+
+
+def conversation(turns):
+    messages = [SystemMessage(content="You are Alfred.")]
+    for i in range(turns):
+        messages += [HumanMessage(content=f"Question {i} " + "word " * 100), AIMessage(content=f"Answer {i} " + "word " * 100)]
+    return messages + [HumanMessage(content="And now?")]
+
+
+def test_summaries_go_through_the_scheduler():
+    chat = SummaryChat(prompts=[])
+    scheduler = LLMScheduler(requests_per_minute=1e9, tokens_per_minute=1e12)
+    window = ConversationWindow(summarize_with(chat, scheduler=scheduler), token_budget=500, keep_turns=1)
+    state = {}
+    prompt, report = asyncio.run(window.build(conversation(4), state))
+
+    assert scheduler.stats()["calls"] == 1
+    assert len(chat.prompts) == 1
+    assert state["context_summary"] == "The guest asked about Ada."
+    assert "The guest asked about Ada." in prompt[1].content
+    assert report["summarized_messages"] > 0
@@ -0,0 +1,65 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from benchmark import synthetic_guests
+from guest_index import build_snapshot, check_parity, open_snapshot
+from guest_store import format_guest
+
+
+def guest(name: str, relation: str, description: str) -> Document:
+    email = f"{name.lower().replace(' ', '.')}@example.com"
+    return Document(page_content=format_guest(name, relation, description, email), metadata={"name": name})
+
+
+# Guests with the same relation and description tie on every query that misses their names
+TWINS = [
+    guest("Ada Lovelace", "best friend", "Mathematician who wrote the first program for the analytical engine."),
+    guest("Ada Byron", "best friend", "Mathematician who wrote the first program for the analytical engine."),
+    guest("Grace Hopper", "best friend", "Mathematician who wrote the first program for the analytical engine."),
+    guest("Marie Curie", "old rival", "Chemist and physicist, twice a Nobel laureate."),
+    guest("Pierre Curie", "old rival", "Chemist and physicist, twice a Nobel laureate."),
+]
+
+
+def test_check_parity_on_synthetic_guests(tmp_path):
+    docs = synthetic_guests(200) + TWINS
+    index = open_snapshot(build_snapshot(str(tmp_path), "synthetic/guests", docs))
+    queries = [doc.metadata["name"] for doc in docs[:50]] + [
+        "best friend",
+        "mathematician analytical engine",
+        "chemist physicist nobel",
+        # Appears in every record, so its idf is floored at epsilon times the average
+        "email example com",
+        "Ada",
+        "Curie Curie",
+        "a term no guest has",
+        "",
+    ]
+    for k in (1, 2, 4, 10):
+        assert check_parity(index, queries, k=k) == []
+
+
+def test_changes_score_like_a_rebuilt_index(tmp_path):
+    from rank_bm25 import BM25Okapi
+
+    index = open_snapshot(build_snapshot(str(tmp_path), "synthetic/guests", synthetic_guests(200) + TWINS))
+    index = index.with_changes(add=[guest("Hedy Lamarr", "neighbour", "Actress and inventor of frequency hopping.")])
+    # Edit a snapshot guest, then the guest just added
+    index = index.with_changes(add=[guest("Ada Lovelace", "godmother", "Wrote notes on the analytical engine.")], remove=[index.find("Ada Lovelace")])
+    index = index.with_changes(add=[guest("Hedy Lamarr", "neighbour", "Actress, inventor and chess player.")], remove=[index.find("Hedy Lamarr")])
+    index = index.with_changes(remove=[index.find("Marie Curie"), index.find("Emmy Noether 0")])
+    index = index.with_changes(add=[guest("Marie Curie", "old rival", "Chemist, back on the list.")])
+
+    live = [doc_id for doc_id in range(len(index.docs)) if index.is_live(doc_id)]
+    docs = index.live_docs()
+    assert [doc.metadata["name"] for doc in docs] == [index.docs[doc_id].metadata["name"] for doc_id in live]
+    reference = BM25Okapi([doc.page_content.split() for doc in docs])
+    for query in ["Ada Lovelace", "Hedy Lamarr chess", "analytical engine", "Marie Curie", "Emmy Noether 0", "chemist physicist nobel", "email example com"]:
+        tokens = query.split()
+        expected, scores = reference.get_scores(tokens), index.get_scores(tokens)
+        np.testing.assert_allclose(scores[live], expected, rtol=1e-12)
+        # Removed and replaced records never score
+        assert np.all(np.isneginf(np.delete(scores, live)))
+        # The top guests are the rebuilt index's, up to the order of ties
+        top = [docs.index(doc) for doc in index.get_top_n(tokens, n=4)]
+        assert list(expected[top]) == sorted(expected, reverse=True)[:4]
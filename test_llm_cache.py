@@ -0,0 +1,82 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from agent import build_alfred, make_checkpointer, thread_config
+from benchmark import SYSTEM_MESSAGE, ScriptedChatModel, stub_tools
+from llm_cache import LLMCache, llm_cache_from_env, request_key
+
+
+def lookup(call_id, message_id=None):
+    return [
+        SystemMessage(content="You are Alfred."),
+        HumanMessage(content="Who is Ada Lovelace?", id=message_id),
+        AIMessage(content="", tool_calls=[{"name": "guest_info_retriever", "args": {"__arg1": "Ada Lovelace"}, "id": call_id}]),
+        ToolMessage(content="Name: Ada Lovelace", name="guest_info_retriever", tool_call_id=call_id),
+    ]
+
+
+def test_key_ignores_ids_but_not_content_model_or_tools():
+    chat = ScriptedChatModel()
+    key = request_key(chat, lookup("call_a1", "m1"))
+    assert request_key(chat, lookup("call_b2", "m2")) == key
+    assert request_key(chat, lookup("call_a1")[:2] + [HumanMessage(content="Who is Grace Hopper?")]) != key
+    assert request_key(ScriptedChatModel().bind(tools=[{"name": "web_search"}]), lookup("call_a1")) != key
+
+
+def test_responses_are_replayed_with_their_tool_calls(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite"))
+    key = cache.key(ScriptedChatModel(), lookup("call_1"))
+    assert cache.get(key) is None
+    response = AIMessage(content="", id="run-1", tool_calls=[{"name": "get_weather_info", "args": {"location": "Paris"}, "id": "call_9"}])
+    cache.set(key, response)
+
+    replayed = cache.get(key)
+    assert replayed.tool_calls == response.tool_calls
+    # A fresh id, so the graph appends the replay instead of overwriting the original
+    assert replayed.id is None
+    # Entries outlive the connection
+    assert LLMCache(str(tmp_path / "llm.sqlite")).get(key).tool_calls == response.tool_calls
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_expired_and_least_recently_used_entries_go(tmp_path):
+    expired = LLMCache(str(tmp_path / "expired.sqlite"), ttl=0)
+    expired.set("a", AIMessage(content="a"))
+    assert expired.get("a") is None
+
+    cache = LLMCache(str(tmp_path / "lru.sqlite"), max_entries=2)
+    for key in ("a", "b"):
+        cache.set(key, AIMessage(content=key))
+    cache.get("a")
+    cache.set("c", AIMessage(content="c"))
+    assert cache.get("b") is None
+    assert [cache.get(key).content for key in ("a", "c")] == ["a", "c"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_is_off_unless_configured(tmp_path, monkeypatch):
+    monkeypatch.delenv("ALFRED_LLM_CACHE", raising=False)
+    assert llm_cache_from_env() is None
+    monkeypatch.setenv("ALFRED_LLM_CACHE", str(tmp_path / "llm.sqlite"))
+    monkeypatch.setenv("ALFRED_LLM_CACHE_TTL", "60")
+    cache = llm_cache_from_env()
+    assert isinstance(cache, LLMCache) and cache.ttl == 60
+
+
+def test_repeated_conversation_is_answered_from_the_cache(tmp_path):
+    tools = stub_tools()
+    chat = ScriptedChatModel(tool_names=["guest_info_retriever"])
+    cache = LLMCache(str(tmp_path / "llm.sqlite"))
+    alfred = build_alfred(chat.bind_tools(tools), tools, checkpointer=make_checkpointer("memory"), llm_cache=cache)
+
+    def ask(thread_id):
+        state = asyncio.run(alfred.ainvoke({"messages": [SYSTEM_MESSAGE, HumanMessage(content="Emmy Noether 0")]}, thread_config(thread_id)))
+        return state["messages"][-1].content
+
+    first = ask("first")
+    assert cache.stats()["hits"] == 0
+    # A new thread asking the same thing replays both model calls, tool call included
+    assert ask("second") == first
+    assert cache.stats()["hits"] == 2
@@ -0,0 +1,141 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from llm_scheduler import LLMScheduler
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class FakeChat:
+    """Chat model stand-in: records each call and answers once its gate is opened."""
+
+    model = "fake"
+
+    def __init__(self, failures=0):
+        self.started = []
+        self.failures = failures
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def ainvoke(self, messages):
+        self.started.append(messages[-1].content)
+        await self.gate.wait()
+        if self.failures:
+            self.failures -= 1
+            raise RateLimited("slow down")
+        return AIMessage(content=f"re: {messages[-1].content}")
+
+
+def scheduler(**kwargs):
+    # Limits far above what the tests send, so only the behaviour under test shows
+    return LLMScheduler(**{"requests_per_minute": 1e9, "tokens_per_minute": 1e12, **kwargs})
+
+
+def ask(text):
+    return [HumanMessage(content=text)]
+
+
+def test_sessions_are_served_round_robin():
+    async def run():
+        chat = FakeChat()
+        chat.gate.clear()
+        gate = scheduler(max_concurrency=1)
+        busy = [asyncio.ensure_future(gate.ainvoke(chat, ask(f"a{i}"), session="a")) for i in range(3)]
+        await asyncio.sleep(0)
+        quiet = asyncio.ensure_future(gate.ainvoke(chat, ask("b0"), session="b"))
+        await asyncio.sleep(0)
+        chat.gate.set()
+        await asyncio.gather(*busy, quiet)
+        return chat.started
+
+    # The quiet session goes next rather than after everything the busy one queued
+    assert asyncio.run(run()) == ["a0", "a1", "b0", "a2"]
+
+
+def test_identical_requests_in_flight_share_one_call():
+    async def run():
+        chat = FakeChat()
+        chat.gate.clear()
+        gate = scheduler()
+        calls = [asyncio.ensure_future(gate.ainvoke(chat, ask("same"), session=session)) for session in ("a", "b")]
+        await asyncio.sleep(0)
+        chat.gate.set()
+        return chat, gate, await asyncio.gather(*calls)
+
+    chat, gate, (first, second) = asyncio.run(run())
+    assert chat.started == ["same"]
+    assert gate.coalesced == 1
+    assert first.content == second.content == "re: same"
+    assert first is not second
+
+
+def test_rate_limits_are_retried_with_backoff():
+    async def run():
+        chat = FakeChat(failures=2)
+        gate = scheduler(base_delay=0.001, max_delay=0.01)
+        return chat, gate, await gate.ainvoke(chat, ask("hello"))
+
+    chat, gate, response = asyncio.run(run())
+    assert response.content == "re: hello"
+    assert len(chat.started) == 3
+    assert gate.retries == 2
+
+
+def test_retries_give_up_after_max_retries():
+    async def run():
+        gate = scheduler(max_retries=1, base_delay=0.001)
+        try:
+            await gate.ainvoke(FakeChat(failures=5), ask("hello"))
+        except RateLimited:
+            return gate
+        raise AssertionError("expected the rate limit error")
+
+    gate = asyncio.run(run())
+    assert gate.retries == 1
+    assert gate.stats()["in_flight"] == 0
+
+
+def test_cancelled_waiter_gives_back_its_place():
+    async def run():
+        chat = FakeChat()
+        chat.gate.clear()
+        gate = scheduler(max_concurrency=1)
+        running = asyncio.ensure_future(gate.ainvoke(chat, ask("first")))
+        await asyncio.sleep(0)
+        waiting = asyncio.ensure_future(gate.ainvoke(chat, ask("second")))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        chat.gate.set()
+        await running
+        assert waiting.cancelled()
+        return chat, gate, await gate.ainvoke(chat, ask("third"))
+
+    chat, gate, response = asyncio.run(run())
+    assert response.content == "re: third"
+    assert chat.started == ["first", "third"]
+    assert gate.stats()["waiting"] == 0
+    assert gate.stats()["in_flight"] == 0
+
+
+def test_waiter_cancelled_as_a_slot_frees_up():
+    async def run():
+        gate = scheduler(max_concurrency=1)
+        await gate._acquire("a")
+        waiter = asyncio.ensure_future(gate._acquire("b"))
+        await asyncio.sleep(0)
+        # Cancelled and released in the same tick: the grant is cancelled before its
+        # waiter runs again, so dispatching must skip it
+        waiter.cancel()
+        gate._release()
+        await asyncio.gather(waiter, return_exceptions=True)
+        stats = gate.stats()
+        # The next caller still gets the slot
+        await asyncio.wait_for(gate._acquire("c"), timeout=1)
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0
+    assert stats["waiting"] == 0
@@ -0,0 +1,77 @@
+import pytest
+from langchain_core.documents import Document
+
+from guest_store import format_guest
+from name_index import NameIndex, NameMatch, name_arrays, name_fields
+
+
+def guest(name: str, relation: str, description: str = "Plays chess on Sundays.") -> Document:
+    email = f"{name.lower().replace(' ', '.')}@example.com"
+    return Document(page_content=format_guest(name, relation, description, email), metadata={"name": name})
+
+
+GUESTS = [
+    guest("Ada Lovelace", "best friend"),
+    guest("Ada Byron", "cousin"),
+    guest("Marie Curie", "old rival"),
+    guest("Pierre Curie", "old rival"),
+    guest("Nikola Tesla", "neighbour"),
+    guest("Dr. José Martí", "mentor"),
+    guest("Grace Hopper", "colleague"),
+    guest("Alan Turing", "colleague"),
+    guest("Emmy Noether", "colleague"),
+    guest("Rosalind Franklin", "colleague"),
+]
+
+
+@pytest.fixture(params=["documents", "arrays"])
+def names(request):
+    """The same guests indexed from their documents and from snapshot-style tables."""
+    if request.param == "documents":
+        return NameIndex(GUESTS)
+    arrays, max_name_tokens = name_arrays((doc_id, *name_fields(doc)) for doc_id, doc in enumerate(GUESTS))
+    return NameIndex.from_arrays(arrays, max_name_tokens)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Ada Lovelace", NameMatch("exact", [0])),
+    ("ada LOVELACE", NameMatch("casefold", [0])),
+    ("dr jose marti", NameMatch("casefold", [5])),
+    ("Tell me about Nikola Tesla, please", NameMatch("contained", [4])),
+    ("ada love", NameMatch("prefix", [0])),
+    ("Ada Lovelce", NameMatch("fuzzy", [0])),
+    ("Tesal", NameMatch("fuzzy", [4])),
+    ("my best friend", NameMatch("relation", [0])),
+    ("old rival", NameMatch("relation", [2, 3])),
+])
+def test_lookup_match_kinds(names, query, expected):
+    assert names.lookup(query) == expected
+
+
+@pytest.mark.parametrize("query", [
+    # Two guests are called Ada
+    "Ada",
+    # In every description, but nobody's name
+    "chess",
+    # Shared by more guests than asked for
+    "colleague",
+    "Curie",
+    "",
+    "Who is coming to the gala tonight and what should I wear?",
+])
+def test_ambiguous_or_unknown_queries_fall_back(names, query):
+    assert names.lookup(query) is None
+
+
+def test_relation_limit_follows_k(names):
+    assert names.lookup("colleague", k=4) == NameMatch("relation", [6, 7, 8, 9])
+
+
+def test_updated_index_sees_changes_and_leaves_the_original(names):
+    updated = names.updated(removed=[(1, GUESTS[1])], added=[(10, guest("Hedy Lamarr", "neighbour"))])
+    # With Ada Byron gone, "Ada" names a single guest
+    assert updated.lookup("Ada") == NameMatch("prefix", [0])
+    assert updated.lookup("Hedy Lamarr") == NameMatch("exact", [10])
+    assert updated.lookup("neighbour") == NameMatch("relation", [4, 10])
+    assert names.lookup("Ada") is None
+    assert names.lookup("Hedy Lamarr") is None
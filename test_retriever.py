@@ -0,0 +1,50 @@
+import pytest
+
+import retriever
+import tools
+
+
+@pytest.fixture
+def guest_list():
+    """The shared guest index, put back (with an empty cache) after the test edits it."""
+    original = tools.guest_index
+    retriever.guest_cache.clear()
+    yield
+    tools._publish(original, None)
+
+
+def test_edit_keeps_cached_lookups_of_unrelated_guests(guest_list):
+    emmy = retriever.extract_text("Emmy Noether 0")
+    grace = retriever.extract_text("Grace Curie 1")
+    retriever.extract_text("violin")
+    keys = {query: retriever._cache_key(query) for query in ("Emmy Noether 0", "Grace Curie 1", "violin")}
+    assert all(retriever.guest_cache.get(key) is not None for key in keys.values())
+
+    tools.upsert_guest({"name": "Emmy Noether 0", "relation": "old rival", "description": "algebra and violin", "email": "emmy@example.com"})
+
+    # The edited guest's lookups, and any sharing a term with the edit, are dropped
+    assert retriever.guest_cache.get(keys["Emmy Noether 0"]) is None
+    assert retriever.guest_cache.get(keys["violin"]) is None
+    assert retriever.guest_cache.get(keys["Grace Curie 1"]) == grace
+    updated = retriever.extract_text("Emmy Noether 0")
+    assert updated != emmy and "algebra and violin" in updated
+
+
+def test_affected_by_matches_records_terms_and_names(guest_list):
+    doc = tools.guest_index.docs[tools.guest_index.find("Emmy Noether 0")]
+    affected = retriever._affected_by([doc])
+    assert affected(("Emmy Noether 0", 3, ""), "")
+    assert affected(("Emmy", 3, ""), "")
+    assert affected(("who plays chess", 3, ""), "")
+    assert affected(("old rival", 3, ""), "")
+    assert affected(("xyz", 3, ""), doc.page_content)
+    assert not affected(("Grace Curie 1", 3, ""), "Name: Grace Curie 1")
+
+
+def test_batch_returns_k_records_per_query(guest_list):
+    texts = retriever.extract_text_batch(["telescopes chess", "Grace Curie 1"], k=5)
+    assert texts[0].count("Name: ") == 5
+    assert texts[1].startswith("Name: Grace Curie 1\n")
+    # Cached per k, so a default-sized lookup isn't served the longer answer
+    assert retriever.extract_text_batch(["telescopes chess"])[0].count("Name: ") == 3
+    assert retriever.extract_text("telescopes chess").count("Name: ") == 3
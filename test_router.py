@@ -0,0 +1,87 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from name_index import NameIndex
+from router import IntentRouter
+from test_name_index import GUESTS
+
+NAMES = NameIndex(GUESTS)
+
+
+@pytest.fixture
+def router():
+    return IntentRouter(names=lambda: NAMES, guest_name=lambda doc_id: GUESTS[doc_id].metadata["name"])
+
+
+def routed(router, text):
+    """(tool, argument) the router answers text with, or None when it is left to the model."""
+    call = router.route([HumanMessage(content=text)])
+    if call is None:
+        return None
+    [tool_call] = call.tool_calls
+    return tool_call["name"], tool_call["args"]["__arg1"]
+
+
+@pytest.mark.parametrize("text, city", [
+    ("What's the weather in Paris?", "Paris"),
+    ("weather in new york", "new york"),
+    ("Alfred, what is the weather like in Rio de Janeiro tonight?", "Rio de Janeiro"),
+    ("Hey Alfred, check the forecast for London, please", "London"),
+    ("Will it rain in Tokyo?", "Tokyo"),
+    ("Berlin weather", "Berlin"),
+])
+def test_weather_in_a_known_city_is_routed(router, text, city):
+    assert routed(router, text) == ("get_weather_info", city)
+
+
+@pytest.mark.parametrize("text", [
+    # Not in the gazetteer; the model can ask which place is meant
+    "What's the weather in Springfield?",
+    "weather in my home town",
+    "Is the weather good for fireworks?",
+    "Should we move the fireworks if it rains in Paris?",
+])
+def test_other_weather_questions_go_to_the_model(router, text):
+    assert routed(router, text) is None
+
+
+@pytest.mark.parametrize("text, name", [
+    ("Tell me about Ada Lovelace", "Ada Lovelace"),
+    ("who is nikola tesla?", "Nikola Tesla"),
+    ("Alfred, what do you know about Dr. José Martí?", "Dr. José Martí"),
+    ("Grace Hopper", "Grace Hopper"),
+    ("grace hopper", "Grace Hopper"),
+])
+def test_guest_names_are_routed(router, text, name):
+    assert routed(router, text) == ("guest_info_retriever", name)
+
+
+@pytest.mark.parametrize("text", [
+    # Two guests are called Ada
+    "Tell me about Ada",
+    # Prefixes, typos and relations may be right, but only the model may guess
+    "Tell me about ada love",
+    "Ada Lovelce",
+    "Who is my best friend?",
+    "Who is coming tonight?",
+    "Tell me about the fireworks",
+    "Ada Lovelace and Grace Hopper both like chess; who should sit next to whom?",
+    "Can you suggest a toast for the evening?",
+    "What's new in quantum computing?",
+])
+def test_open_ended_questions_go_to_the_model(router, text):
+    assert routed(router, text) is None
+
+
+def test_only_the_latest_guest_message_is_routed(router):
+    call = router.route([HumanMessage(content="weather in Paris")])
+    assert router.route([HumanMessage(content="weather in Paris"), call]) is None
+    assert router.route([call, ToolMessage(content="Sunny", tool_call_id=call.tool_calls[0]["id"])]) is None
+    assert router.route([AIMessage(content="At your service.")]) is None
+    assert router.route([]) is None
+
+
+def test_stats_count_routed_and_passed_turns(router):
+    for text in ("weather in Paris", "Tell me about Grace Hopper", "Who is Alan Turing", "How are you?"):
+        routed(router, text)
+    assert router.stats() == {"routed": {"weather": 1, "guest": 2}, "passed": 1}
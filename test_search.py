@@ -0,0 +1,130 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from search import SearchResult, SearxBackend, WebSearch
+
+
+class StubBackend:
+    """Search backend answering from a fixed list after a delay, or failing."""
+
+    def __init__(self, name, results=(), delay=0.0, fail=False):
+        self.name = name
+        self.results = list(results)
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+
+    async def search(self, query, max_results):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise ConnectionError(self.name)
+        return self.results[:max_results]
+
+
+def page(n, host="example.com"):
+    return SearchResult(f"Page {n}", f"About {n}", f"https://{host}/{n}")
+
+
+class StubSearxHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({"results": [
+            {"title": "Fireworks", "content": "Tonight at nine.", "url": "https://www.example.com/fireworks/"},
+            {"title": "Menu", "content": "Seven courses.", "url": "https://example.com/menu"},
+        ]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def searx():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSearxHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_backends_are_interleaved_and_deduplicated(searx):
+    # The stub's first page differs from this one only in host prefix and trailing slash
+    other = StubBackend("other", [SearchResult("Fireworks again", "", "https://example.com/fireworks"), page(1)])
+    search = WebSearch([SearxBackend(searx), other], max_results=3)
+    results, complete = asyncio.run(search.asearch("fireworks"))
+    assert complete
+    assert [result.title for result in results] == ["Fireworks", "Menu", "Page 1"]
+
+
+def test_slow_backends_are_abandoned_at_the_deadline():
+    fast, slow = StubBackend("fast", [page(1)]), StubBackend("slow", [page(2)], delay=5)
+    search = WebSearch([fast, slow], deadline=0.2)
+    start = time.perf_counter()
+    results, complete = asyncio.run(search.asearch("fireworks"))
+    assert time.perf_counter() - start < 1
+    assert results == [page(1)] and not complete
+    assert slow.cancelled == 1
+    # A missed deadline counts against the slow backend
+    assert search.breakers["slow"].failures == 1
+    assert search.breakers["fast"].failures == 0
+
+
+def test_failing_backend_is_skipped_once_its_breaker_opens():
+    good, bad = StubBackend("good", [page(1)]), StubBackend("bad", fail=True)
+    search = WebSearch([good, bad])
+    for _ in range(3):
+        assert asyncio.run(search.asearch("fireworks")) == ([page(1)], False)
+    assert search.breakers["bad"].state == "open"
+    assert asyncio.run(search.asearch("fireworks")) == ([page(1)], False)
+    assert (good.calls, bad.calls) == (4, 3)
+
+
+def test_complete_answers_are_cached_per_normalized_query():
+    backend = StubBackend("only", [page(1)])
+    search = WebSearch([backend])
+    text = asyncio.run(search.atext("Who is  Ada?"))
+    assert "Page 1" in text
+    assert asyncio.run(search.atext("who is ada?")) == text
+    assert backend.calls == 1
+
+
+def test_partial_answers_are_not_cached():
+    fast, slow = StubBackend("fast", [page(1)]), StubBackend("slow", [page(2)], delay=5)
+    search = WebSearch([fast, slow], deadline=0.1)
+    text = asyncio.run(search.atext("fireworks"))
+    assert "may be incomplete" in text
+    asyncio.run(search.atext("fireworks"))
+    assert fast.calls == 2
+
+
+def test_cancelled_search_is_not_a_backend_failure():
+    backends = [StubBackend("a", [page(1)], delay=5), StubBackend("b", [page(2)], delay=5)]
+    search = WebSearch(backends, deadline=4)
+
+    async def cancelled():
+        task = asyncio.ensure_future(search.atext("fireworks"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+    for _ in range(3):
+        asyncio.run(cancelled())
+    # The backend searches were stopped too, and the breakers saw nothing
+    assert [backend.cancelled for backend in backends] == [3, 3]
+    assert all(breaker.state == "closed" and breaker.failures == 0 for breaker in search.breakers.values())
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+import sharded_index
+from benchmark import synthetic_guests
+from guest_index import build_snapshot, open_snapshot, tokenize, top_k
+from sharded_index import ShardedGuestIndex, _search_shard, _shard_stats
+from test_guest_index import TWINS, guest
+
+QUERIES = [tokenize(query) for query in [
+    "Ada Lovelace",
+    "Emmy Noether 3",
+    "mathematician analytical engine",
+    "chemist physicist nobel",
+    "telescopes chess",
+    "best friend",
+    "email example com",
+    "a term no guest has",
+]]
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    """A snapshot index with tied guests, and a spawned worker pool shut down afterwards.
+
+    Workers are spawned, so they import sharded_index afresh rather than this test
+    module; nothing here runs again in them.
+    """
+    root = str(tmp_path_factory.mktemp("sharded"))
+    yield open_snapshot(build_snapshot(root, "synthetic/guests", synthetic_guests(300) + TWINS))
+    with sharded_index._pools_lock:
+        pools = list(sharded_index._pools.values())
+        sharded_index._pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+def assert_matches_in_process(sharded, index, k):
+    expected = index.get_top_n_batch(QUERIES, k)
+    assert sharded.get_top_n_batch(QUERIES, k) == expected
+    # Each worker's shard top k has the in-process ids and bit-identical scores
+    stats = index.range_stats(QUERIES)
+    pool = sharded_index._pool(sharded.workers)
+    for lo, hi in sharded.shards:
+        found = pool.submit(_search_shard, index.path, lo, hi, QUERIES, k, _shard_stats(stats, lo, hi)).result()
+        for tokens, (ids, scores) in zip(QUERIES, found):
+            all_scores = index.get_scores(tokens)[lo:hi]
+            assert ids.tolist() == (top_k(all_scores, k) + lo).tolist()
+            assert np.array_equal(scores, all_scores[ids - lo])
+
+
+@pytest.mark.parametrize("k", [1, 3, 10])
+def test_sharded_top_k_matches_in_process(index, k):
+    assert_matches_in_process(ShardedGuestIndex(index, workers=2, shards=3), index, k)
+
+
+def test_sharded_top_k_matches_in_process_after_changes(index):
+    sharded = ShardedGuestIndex(index, workers=2, shards=3)
+    changes = [
+        {"add": [guest("Hedy Lamarr", "best friend", "Mathematician and inventor, also plays chess.")]},
+        # Edit a snapshot guest, then remove another
+        {"add": [guest("Ada Lovelace", "godmother", "Wrote notes on the analytical engine.")], "remove": [index.find("Ada Lovelace")]},
+        {"remove": [index.find("Marie Curie")]},
+    ]
+    for change in changes:
+        sharded, index = sharded.with_changes(**change), index.with_changes(**change)
+        assert sharded.shards == ShardedGuestIndex(index, workers=2, shards=3).shards
+        for k in (1, 3, 10):
+            assert_matches_in_process(sharded, index, k)
+    assert all(doc.metadata["name"] != "Marie Curie" for top in sharded.get_top_n_batch(QUERIES, 10) for doc in top)
@@ -0,0 +1,61 @@
+import json
+import logging
+import urllib.error
+import urllib.request
+
+import pytest
+
+import warmup
+
+
+@pytest.fixture
+def cold(monkeypatch):
+    """A process where nothing has been built yet."""
+    monkeypatch.setattr(warmup, "_shared", {})
+    monkeypatch.setattr(warmup, "phases", {})
+    monkeypatch.setattr(warmup, "error", None)
+    for name in ("ALFRED_LLM_CACHE", "ALFRED_MEMORY_BACKEND", "ALFRED_SEARXNG_URLS"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("ALFRED_SEARCH_ENGINES", "")
+
+
+def probe(server, path="/ready"):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}{path}") as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_status_follows_a_failed_prewarm_and_a_later_build(cold, monkeypatch, caplog):
+    server = warmup.serve_probe(0, host="127.0.0.1")
+    try:
+        monkeypatch.delenv("GROQ_API_KEY", raising=False)
+        with caplog.at_level(logging.ERROR, logger="warmup"):
+            warmup._prewarm()
+        assert "Alfred prewarm failed" in caplog.text
+        assert not warmup.ready()
+        assert warmup.status()["error"].startswith("RuntimeError: GROQ_API_KEY")
+        code, body = probe(server)
+        assert code == 503 and body["error"] == warmup.status()["error"]
+        assert probe(server, "/live")[0] == 200
+
+        # A session building Alfred once the key is there clears the error
+        monkeypatch.setenv("GROQ_API_KEY", "test")
+        assert warmup.alfred() is warmup.alfred()
+        assert warmup.ready()
+        status = warmup.status()
+        assert status["error"] is None
+        assert {"guest_index", "graph", "total"} <= set(status["phases_ms"])
+        assert probe(server) == (200, status)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_failed_session_build_is_reported(cold, monkeypatch):
+    monkeypatch.delenv("GROQ_API_KEY", raising=False)
+    with pytest.raises(RuntimeError):
+        warmup.alfred()
+    assert warmup.status()["error"].startswith("RuntimeError")
+    assert not warmup.ready()
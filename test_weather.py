@@ -0,0 +1,180 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from weather import CircuitBreaker, WeatherClient
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubWeatherHandler(BaseHTTPRequestHandler):
+    """Answers like OpenWeatherMap: 200 with a reading, or whatever status the test set."""
+
+    def do_GET(self):
+        self.server.requests += 1
+        time.sleep(self.server.delay)
+        body = json.dumps({
+            "main": {"temp": 21.4, "humidity": 60},
+            "weather": [{"main": "Clear", "description": "clear sky"}],
+            "wind": {"speed": 2.0},
+        }).encode("utf-8")
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubWeatherHandler)
+    server.status, server.delay, server.requests = 200, 0.0, 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def client_for(server, breaker=None):
+    return WeatherClient(
+        api_key="test",
+        base_url=f"http://127.0.0.1:{server.server_address[1]}/weather",
+        timeout=2,
+        cache_ttl=600,
+        breaker=breaker or CircuitBreaker(),
+    )
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60, clock=Clock())
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_lets_one_probe_through_after_the_timeout():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60, clock=clock)
+    breaker.record_failure()
+    clock.now = 61
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60, clock=clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now = 61
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now = 100
+    assert not breaker.allow()
+
+
+def test_unanswered_probe_is_given_up_after_probe_timeout():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60, probe_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.now = 61
+    assert breaker.allow()
+    clock.now = 92
+    assert breaker.allow()
+
+
+def test_released_probe_lets_the_next_caller_probe():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60, clock=clock)
+    breaker.record_failure()
+    clock.now = 61
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.allow()
+
+
+def test_fetch_reads_and_caches_the_weather(stub_api):
+    client = client_for(stub_api)
+    weather = client.fetch("Paris")
+    assert weather == {"temp_c": 21, "condition": "Clear", "description": "Clear Sky", "humidity": 60, "wind_kmh": 7.2}
+    assert client.fetch(" paris ") == weather
+    assert stub_api.requests == 1
+
+
+def test_server_errors_open_the_breaker(stub_api):
+    stub_api.status = 503
+    client = client_for(stub_api, CircuitBreaker(failure_threshold=2))
+    assert client.fetch("Paris") is None
+    assert client.fetch("London") is None
+    assert client.breaker.state == "open"
+    # Skipped while open, without touching the service
+    assert client.fetch("Rome") is None
+    assert stub_api.requests == 2
+
+
+def test_unknown_city_is_not_a_failure(stub_api):
+    stub_api.status = 404
+    client = client_for(stub_api, CircuitBreaker(failure_threshold=1))
+    assert client.fetch("Atlantis") is None
+    assert client.breaker.state == "closed"
+
+
+def test_cancelled_requests_leave_a_healthy_breaker_closed(stub_api):
+    stub_api.delay = 0.5
+    client = client_for(stub_api, CircuitBreaker(failure_threshold=3))
+
+    async def cancelled_fetches():
+        for city in ("Paris", "London", "Rome"):
+            task = asyncio.ensure_future(client.afetch(city))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        stub_api.delay = 0.0
+        return await client.afetch("Oslo")
+
+    assert asyncio.run(cancelled_fetches())["condition"] == "Clear"
+    assert client.breaker.state == "closed"
+    assert client.breaker.failures == 0
+
+
+def test_cancelled_probe_is_released(stub_api):
+    clock = Clock()
+    client = client_for(stub_api, CircuitBreaker(failure_threshold=1, reset_timeout=60, clock=clock))
+    client.breaker.record_failure()
+    clock.now = 61
+    stub_api.delay = 0.5
+
+    async def cancelled_probe():
+        task = asyncio.ensure_future(client.afetch("Paris"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        stub_api.delay = 0.0
+        return await client.afetch("Paris")
+
+    # The next caller probes straight away, and its success closes the breaker
+    assert asyncio.run(cancelled_probe()) is not None
+    assert client.breaker.state == "closed"
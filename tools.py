@@ -1,19 +1,130 @@
-import datasets
+import os
+import sys
+import threading
+
 from langchain_core.documents import Document
 
-# Load the dataset
-guest_dataset = datasets.load_dataset("agents-course/unit3-invitees", split="train")
-
-# Convert dataset entries into Document objects
-docs = [
-    Document(
-        page_content="\n".join([
-            f"Name: {guest['name']}",
-            f"Relation: {guest['relation']}",
-            f"Description: {guest['description']}",
-            f"Email: {guest['email']}"
-        ]),
+from guest_index import build_snapshot, check_parity, load_snapshot
+from guest_store import format_guest
+
+DATASET_NAME = "agents-course/unit3-invitees"
+
+# Where the guest index snapshot is stored. Point this at a shared directory so every
+# worker on the host maps the same files.
+GUEST_INDEX_DIR = os.getenv("GUEST_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".guest_index"))
+
+# Score the guest list in this many worker processes; 0 keeps scoring in this process,
+# which is faster for small lists
+GUEST_INDEX_WORKERS = int(os.getenv("GUEST_INDEX_WORKERS", "0"))
+
+
+def guest_document(guest: dict) -> Document:
+    """Turn a guest record (name, relation, description, email) into a Document."""
+    return Document(
+        page_content=format_guest(guest["name"], guest["relation"], guest["description"], guest["email"]),
         metadata={"name": guest["name"]}
     )
-    for guest in guest_dataset
-]
\ No newline at end of file
+
+
+def load_guest_documents():
+    """Download the guest dataset and convert its entries into Document objects."""
+    import datasets
+
+    guest_dataset = datasets.load_dataset(DATASET_NAME, split="train")
+    return [guest_document(guest) for guest in guest_dataset]
+
+
+def load_guest_index(rebuild: bool = False):
+    """Load the guest index snapshot, building it from the hub dataset if there isn't one yet."""
+    index = None if rebuild else load_snapshot(GUEST_INDEX_DIR, DATASET_NAME)
+    if index is None:
+        guest_docs = load_guest_documents()
+        try:
+            build_snapshot(GUEST_INDEX_DIR, DATASET_NAME, guest_docs)
+            index = load_snapshot(GUEST_INDEX_DIR, DATASET_NAME)
+        except OSError:
+            # Read-only deployments still work, they just rebuild on every start
+            import tempfile
+            scratch = tempfile.mkdtemp(prefix="guest_index-")
+            build_snapshot(scratch, DATASET_NAME, guest_docs)
+            index = load_snapshot(scratch, DATASET_NAME)
+    if GUEST_INDEX_WORKERS > 0:
+        from sharded_index import ShardedGuestIndex
+        index = ShardedGuestIndex(index, workers=GUEST_INDEX_WORKERS)
+    return index
+
+
+# Callbacks run whenever the guest index changes, e.g. to drop cached lookups
+_index_listeners = []
+
+# Serializes writers; readers just use whichever index version is current
+_update_lock = threading.Lock()
+
+
+def on_guest_index_change(callback):
+    """Register a callback for guest index changes.
+
+    It receives the new index and the guest documents that changed (old and new
+    versions), or None when the whole index was reloaded.
+    """
+    _index_listeners.append(callback)
+
+
+def _publish(index, changed):
+    global guest_index, docs
+    guest_index = index
+    docs = index.live_docs()
+    for callback in _index_listeners:
+        callback(index, changed)
+    return index
+
+
+def reload_guest_index(rebuild: bool = False):
+    """Reload the guest index in place, rebuilding it from the hub if asked, and notify listeners."""
+    with _update_lock:
+        return _publish(load_guest_index(rebuild=rebuild), None)
+
+
+def upsert_guest(guest: dict):
+    """Add a guest, or replace the current record of the guest with the same name, without a rebuild."""
+    doc = guest_document(guest)
+    with _update_lock:
+        doc_id = guest_index.find(guest["name"])
+        remove = [] if doc_id is None else [doc_id]
+        changed = [guest_index.docs[i] for i in remove] + [doc]
+        return _publish(guest_index.with_changes(add=[doc], remove=remove), changed)
+
+
+def remove_guest(name: str) -> bool:
+    """Remove the guest with this name without a rebuild; returns False if there is none."""
+    with _update_lock:
+        doc_id = guest_index.find(name)
+        if doc_id is None:
+            return False
+        _publish(guest_index.with_changes(remove=[doc_id]), [guest_index.docs[doc_id]])
+        return True
+
+
+def save_guest_index():
+    """Write the current guest list to a fresh snapshot, so restarts and other workers pick up the changes."""
+    with _update_lock:
+        return build_snapshot(GUEST_INDEX_DIR, DATASET_NAME, guest_index.live_docs())
+
+
+# Load the guest index; set GUEST_INDEX_REBUILD=1 to refresh it from the hub
+guest_index = load_guest_index(rebuild=os.getenv("GUEST_INDEX_REBUILD") == "1")
+docs = guest_index.docs
+
+if __name__ == "__main__":
+    # Build step: `GUEST_INDEX_REBUILD=1 python tools.py` writes a fresh snapshot
+    print(f"Guest index snapshot {guest_index.fingerprint} ({guest_index.n_docs} guests) at {guest_index.path}")
+
+    # Check the snapshot ranks guests exactly like LangChain's BM25Retriever
+    queries = [doc.metadata["name"] for doc in docs] + ["best friend", "scientist", "Who is the Countess?"]
+    mismatches = check_parity(guest_index, queries)
+    print(f"BM25 parity: {len(queries) - len(mismatches)}/{len(queries)} queries match")
+    for query in mismatches:
+        print(f"  mismatch: {query!r}")
+    # Non-zero so a build step or CI job fails instead of shipping a snapshot that ranks differently
+    if mismatches:
+        sys.exit(1)
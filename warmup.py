@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Everything below is built once per process and shared by every Streamlit session
+_shared = {}
+_shared_lock = threading.RLock()
+
+_thread: Optional[threading.Thread] = None
+_start_lock = threading.Lock()
+
+# Seconds each cold-start phase took, in the order they finished
+phases = {}
+# Why the last attempt to get Alfred ready failed, if it did
+error: Optional[BaseException] = None
+
+
+def shared(name: str, factory):
+    """The process-wide instance called name, created by factory on first use.
+
+    Callers arriving while it is being created wait for it rather than building another.
+    A factory that raises is tried again by the next caller.
+    """
+    with _shared_lock:
+        if name not in _shared:
+            _shared[name] = factory()
+        return _shared[name]
+
+
+@contextmanager
+def phase(name: str):
+    """Time one cold-start phase into phases and the alfred_cold_start_seconds gauge."""
+    start = time.perf_counter()
+    yield
+    # Only the first run counts; a retry after an error finds most phases already done
+    if name not in phases:
+        phases[name] = time.perf_counter() - start
+    metrics.set_gauge("alfred_cold_start_seconds", phases[name], phase=name)
+
+
+def web_search_fallback(query: str) -> str:
+    """Fallback web search function for deployment environments."""
+    return f"I apologize, but web search is currently unavailable in this deployment environment. However, I can help you with guest information and weather queries. Your search query was: '{query}'"
+
+
+def web_search_tool():
+    """The web search tool, or a fallback when no search backend is available.
+
+    Shared so its result cache is too.
+    """
+    def create():
+        from langchain.tools import Tool
+        from search import search_from_env, web_search_tool_for
+
+        search = search_from_env()
+        if search is not None:
+            return web_search_tool_for(search)
+        return Tool(
+            name="web_search",
+            func=web_search_fallback,
+            description="Search the web for current information about people, events, or topics. Currently unavailable in this deployment."
+        )
+    return shared("web_search_tool", create)
+
+
+def chat():
+    """The Groq chat model shared by Alfred and the conversation summarizer."""
+    def create():
+        from langchain_groq import ChatGroq
+
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise RuntimeError("GROQ_API_KEY environment variable not set. Please set it to use Alfred.")
+        # The scheduler retries rate limits and server errors; the client retrying too
+        # would multiply the attempts and hide them from its pacing
+        return ChatGroq(model="gemma2-9b-it", api_key=api_key, temperature=0.1, max_retries=0)
+    return shared("chat", create)
+
+
+def llm_cache():
+    """The LLM response cache, or None unless ALFRED_LLM_CACHE names a SQLite file."""
+    def create():
+        from llm_cache import llm_cache_from_env
+        return llm_cache_from_env()
+    return shared("llm_cache", create)
+
+
+def scheduler():
+    """The one queue in front of Groq for every session: concurrency cap, rate limits, retries."""
+    def create():
+        from llm_scheduler import llm_scheduler_from_env
+        return llm_scheduler_from_env()
+    return shared("scheduler", create)
+
+
+def router():
+    """The intent router, or None when ALFRED_ROUTER=0."""
+    def create():
+        from router import router_from_env
+        return router_from_env()
+    return shared("router", create)
+
+
+def compactor():
+    """The tool output compactor, or None when ALFRED_COMPACT_TOOLS=0."""
+    def create():
+        from compaction import compactor_from_env
+        return compactor_from_env()
+    return shared("compactor", create)
+
+
+def context_window():
+    """The conversation window: recent turns verbatim, older ones in a rolling summary."""
+    def create():
+        from conversation import ConversationWindow, summarize_with
+
+        return ConversationWindow(
+            summarize_with(chat(), scheduler=scheduler()),
+            token_budget=int(os.getenv("ALFRED_CONTEXT_TOKENS", "3000")),
+            keep_turns=int(os.getenv("ALFRED_KEEP_TURNS", "4")),
+        )
+    return shared("context_window", create)
+
+
+def alfred():
+    """Alfred's compiled graph, built (and timed phase by phase) on first use.
+
+    Whichever attempt, the prewarm's or a session's, ran last decides what status() reports.
+    """
+    global error
+    def create():
+        with phase("total"):
+            # Loads the guest index snapshot, or downloads the dataset and builds one
+            with phase("guest_index"):
+                import tools
+            with phase("name_index"):
+                tools.guest_index.names
+            with phase("modules"):
+                from agent import build_alfred, make_checkpointer
+                from retriever import guest_info_tool
+                from weather import weather_info_tool
+            with phase("tools"):
+                alfred_tools = [guest_info_tool, web_search_tool(), weather_info_tool]
+                support = {"llm_cache": llm_cache(), "scheduler": scheduler(), "router": router(), "compactor": compactor()}
+            with phase("chat_model"):
+                chat_with_tools = chat().bind_tools(alfred_tools)
+                window = context_window()
+            # Each browser session is its own checkpointed thread
+            with phase("graph"):
+                return build_alfred(chat_with_tools, alfred_tools, checkpointer=make_checkpointer(), context_window=window, **support)
+    try:
+        graph = shared("alfred", create)
+    except Exception as e:
+        error = e
+        raise
+    error = None
+    return graph
+
+
+def ready() -> bool:
+    """True once Alfred is built and turns can be answered without waiting."""
+    return "alfred" in _shared
+
+
+def status() -> dict:
+    """Readiness, the cold-start phases finished so far and any error, for probes and the UI."""
+    return {
+        "ready": ready(),
+        "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in phases.items()},
+        "error": None if error is None else f"{type(error).__name__}: {error}",
+    }
+
+
+def _prewarm() -> None:
+    try:
+        alfred()
+    except Exception:
+        # Sessions retry on their own and show the error; the probe reports it
+        logger.exception("Alfred prewarm failed")
+
+
+class _ProbeHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/ready":
+            code = 200 if ready() else 503
+        elif self.path == "/live":
+            code = 200
+        else:
+            code = 404
+        body = json.dumps(status()).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Load balancers probe every few seconds; don't fill the log with it
+        pass
+
+
+def serve_probe(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve /ready (200 once Alfred is built, 503 until then) and /live on a side port."""
+    server = ThreadingHTTPServer((host, port), _ProbeHandler)
+    threading.Thread(target=server.serve_forever, name="alfred-probe", daemon=True).start()
+    return server
+
+
+def start(probe_port: Optional[int] = None) -> threading.Thread:
+    """Start getting Alfred ready in a background thread; later calls just return that thread.
+
+    probe_port (default: ALFRED_READY_PORT, if set) also serves the readiness probe.
+    """
+    global _thread
+    with _start_lock:
+        if _thread is None:
+            if probe_port is None and os.getenv("ALFRED_READY_PORT"):
+                probe_port = int(os.getenv("ALFRED_READY_PORT"))
+            if probe_port:
+                serve_probe(probe_port)
+            _thread = threading.Thread(target=_prewarm, name="alfred-prewarm", daemon=True)
+            _thread.start()
+        return _thread
@@ -0,0 +1,263 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from typing import Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from langchain.tools import Tool
+
+from cache import TTLCache
+from metrics import record_cache, record_http
+
+WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "292f64290fcb8e22685c42af72a3beb1")
+WEATHER_API_URL = os.getenv("WEATHER_API_URL", "http://api.openweathermap.org/data/2.5/weather")
+
+def get_fireworks_advice(condition: str, wind_kmh: float) -> str:
+    """Generate fireworks advice based on weather conditions."""
+    if condition in ["Clear", "Sunny"] and wind_kmh < 15:
+        return " Perfect conditions for fireworks! 🎆"
+    elif condition in ["Clouds"] and wind_kmh < 20:
+        return " Good conditions for fireworks with some clouds. 🌤️"
+    elif wind_kmh >= 20:
+        return f" Caution advised for fireworks due to strong winds ({wind_kmh} km/h). 💨"
+    elif condition in ["Rain", "Drizzle", "Thunderstorm"]:
+        return " Fireworks should be postponed due to precipitation. ⛈️"
+    elif condition in ["Snow", "Mist", "Fog"]:
+        return " Poor visibility conditions for fireworks. 🌫️"
+    else:
+        return " Weather conditions are marginal for fireworks. 🌤️"
+
+def get_realistic_dummy_weather(location: str) -> str:
+    """Generate realistic dummy weather data based on location."""
+    location_patterns = {
+        "london": {"base_temp": 12, "conditions": ["Cloudy", "Rainy", "Partly Cloudy", "Clear"]},
+        "paris": {"base_temp": 15, "conditions": ["Clear", "Cloudy", "Partly Cloudy", "Rainy"]},
+        "new york": {"base_temp": 18, "conditions": ["Clear", "Cloudy", "Partly Cloudy", "Windy"]},
+        "tokyo": {"base_temp": 20, "conditions": ["Clear", "Cloudy", "Humid", "Partly Cloudy"]},
+        "miami": {"base_temp": 28, "conditions": ["Sunny", "Partly Cloudy", "Thunderstorm", "Clear"]},
+        "seattle": {"base_temp": 14, "conditions": ["Rainy", "Cloudy", "Drizzle", "Partly Cloudy"]},
+        "los angeles": {"base_temp": 24, "conditions": ["Sunny", "Clear", "Partly Cloudy", "Hazy"]},
+        "chicago": {"base_temp": 16, "conditions": ["Windy", "Clear", "Cloudy", "Partly Cloudy"]},
+    }
+
+    default_pattern = {"base_temp": 18, "conditions": ["Clear", "Cloudy", "Partly Cloudy", "Rainy"]}
+    pattern = location_patterns.get(normalize_location(location), default_pattern)
+
+    temp_c = pattern["base_temp"] + random.randint(-8, 8)
+    condition = random.choice(pattern["conditions"])
+    humidity = random.randint(40, 85)
+    wind_kmh = random.randint(5, 25)
+
+    condition_descriptions = {
+        "Clear": "Clear Sky", "Sunny": "Sunny", "Cloudy": "Overcast Clouds",
+        "Partly Cloudy": "Partly Cloudy", "Rainy": "Light Rain", "Drizzle": "Light Drizzle",
+        "Thunderstorm": "Thunderstorm", "Windy": "Clear and Windy", "Humid": "Clear and Humid",
+        "Hazy": "Hazy", "Snow": "Light Snow", "Mist": "Misty"
+    }
+
+    description = condition_descriptions.get(condition, condition)
+    fireworks_advice = get_fireworks_advice(condition, wind_kmh)
+
+    return f"Weather in {location}: {description}, {temp_c}°C, Humidity: {humidity}%, Wind: {wind_kmh} km/h.{fireworks_advice} [Simulated data]"
+
+def normalize_location(location: str) -> str:
+    """Collapse whitespace and case so "London" and " london " share a cache entry."""
+    return " ".join(location.split()).casefold()
+
+class CircuitBreaker:
+    """Stops calling a failing service for a while, then lets a single probe through.
+
+    After failure_threshold consecutive failures the breaker opens and allow() returns
+    False until reset_timeout seconds have passed. The next caller is then allowed to
+    probe the service; a success closes the breaker and a failure opens it again. A
+    probe that never reports back (e.g. its caller was cancelled) is given up on after
+    probe_timeout seconds, so another caller can probe.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0, probe_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+
+    def _probing(self) -> bool:
+        return self._probe_started is not None and self._clock() - self._probe_started < self.probe_timeout
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._probing() or self._clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent to the service right now."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._probing() or self._clock() - self.opened_at < self.reset_timeout:
+                return False
+            self._probe_started = self._clock()
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probe_started = None
+
+    def release_probe(self) -> None:
+        """Give up a half-open probe that ended without an answer, without counting a failure."""
+        with self._lock:
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probe_started is not None or self.failures >= self.failure_threshold:
+                self.opened_at = self._clock()
+            self._probe_started = None
+
+class WeatherClient:
+    """OpenWeatherMap client with a shared keep-alive session, a per-location cache and a circuit breaker."""
+
+    def __init__(
+        self,
+        api_key: str = WEATHER_API_KEY,
+        base_url: str = WEATHER_API_URL,
+        timeout: float = float(os.getenv("WEATHER_TIMEOUT", "5")),
+        cache_ttl: float = float(os.getenv("WEATHER_CACHE_TTL", "600")),
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.cache = TTLCache(max_entries=256, ttl=cache_ttl)
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def _async_client(self) -> httpx.AsyncClient:
+        """Return the keep-alive async client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(limits=httpx.Limits(max_connections=16, max_keepalive_connections=16))
+            self._async_clients[loop] = client
+        return client
+
+    def _params(self, location: str) -> dict:
+        return {"q": location, "appid": self.api_key, "units": "metric"}
+
+    def _handle_response(self, key: str, status_code: int, read_json) -> Optional[dict]:
+        """Parse an API response, updating the breaker and the cache."""
+        # An unknown city is the caller's problem, not a sign the service is down
+        if status_code == 404:
+            self.breaker.record_success()
+            return None
+        if status_code != 200:
+            self.breaker.record_failure()
+            return None
+
+        try:
+            data = read_json()
+            weather = {
+                "temp_c": round(data["main"]["temp"]),
+                "condition": data["weather"][0]["main"],
+                "description": data["weather"][0]["description"].title(),
+                "humidity": data["main"]["humidity"],
+                "wind_kmh": round(data.get("wind", {}).get("speed", 0) * 3.6, 1),
+            }
+        except (ValueError, KeyError, IndexError, TypeError):
+            self.breaker.record_failure()
+            return None
+
+        self.breaker.record_success()
+        self.cache.set(key, weather)
+        return weather
+
+    def fetch(self, location: str) -> Optional[dict]:
+        """Return the current weather for a location, or None if the API can't provide it."""
+        key = normalize_location(location)
+        weather = self.cache.get(key)
+        record_cache("weather", weather is not None)
+        if weather is not None or not self.breaker.allow():
+            return weather
+
+        start = time.perf_counter()
+        try:
+            response = self.session.get(self.base_url, params=self._params(location), timeout=self.timeout)
+        except requests.RequestException:
+            record_http("openweathermap", time.perf_counter() - start, ok=False)
+            self.breaker.record_failure()
+            return None
+        except BaseException:
+            # Not an answer from the service, so not a failure; just let another caller probe
+            self.breaker.release_probe()
+            raise
+        record_http("openweathermap", time.perf_counter() - start, ok=response.status_code in (200, 404))
+        return self._handle_response(key, response.status_code, response.json)
+
+    async def afetch(self, location: str) -> Optional[dict]:
+        """Async variant of fetch built on httpx, sharing the same cache and breaker."""
+        key = normalize_location(location)
+        weather = self.cache.get(key)
+        record_cache("weather", weather is not None)
+        if weather is not None or not self.breaker.allow():
+            return weather
+
+        start = time.perf_counter()
+        try:
+            response = await self._async_client().get(self.base_url, params=self._params(location), timeout=self.timeout)
+        except httpx.HTTPError:
+            record_http("openweathermap", time.perf_counter() - start, ok=False)
+            self.breaker.record_failure()
+            return None
+        except BaseException:
+            # Cancelled (e.g. a Streamlit rerun dropped the turn): says nothing about the
+            # service, so only release a half-open probe
+            self.breaker.release_probe()
+            raise
+        record_http("openweathermap", time.perf_counter() - start, ok=response.status_code in (200, 404))
+        return self._handle_response(key, response.status_code, response.json)
+
+def format_weather(location: str, weather: dict) -> str:
+    """Format a weather reading with fireworks advice."""
+    fireworks_advice = get_fireworks_advice(weather["condition"], weather["wind_kmh"])
+    return f"Weather in {location}: {weather['description']}, {weather['temp_c']}°C, Humidity: {weather['humidity']}%, Wind: {weather['wind_kmh']} km/h.{fireworks_advice}"
+
+# Shared by every caller in the process so connections, cache and breaker state are reused
+weather_client = WeatherClient()
+
+def get_weather_info(location: str) -> str:
+    """Fetches weather information for a given location, with fallback to realistic dummy data."""
+    weather = weather_client.fetch(location)
+    if weather is not None:
+        return format_weather(location, weather)
+    return get_realistic_dummy_weather(location)
+
+async def aget_weather_info(location: str) -> str:
+    """Async variant of get_weather_info."""
+    weather = await weather_client.afetch(location)
+    if weather is not None:
+        return format_weather(location, weather)
+    return get_realistic_dummy_weather(location)
+
+weather_info_tool = Tool(
+    name="get_weather_info",
+    func=get_weather_info,
+    coroutine=aget_weather_info,
+    description="Fetches weather information for a given location and provides fireworks scheduling advice."
+)